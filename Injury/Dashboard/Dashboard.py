@@ -1,8 +1,12 @@
+import os
 import streamlit as st
-from utils import load_data
-from performance_dashboard import render_performance_tab
-from performance_prediction_dashboard import render_performance_prediction_tab
-from injury_prediction_dashboard import render_injury_prediction_tab
+from startup_profile import startup_timer
+from utils import data_registry, render_load_timings
+from model_registry import model_registry
+from metrics import span, start_run, publish
+
+# Optional live sessions feed: a JSON-lines file to tail or tcp://host:port
+SESSION_FEED = os.environ.get('DASHBOARD_SESSION_FEED')
 
 # Set page config
 st.set_page_config(
@@ -19,10 +23,8 @@ def handle_tab_click(tab_index):
     st.session_state.active_tab = tab_index
 
 def main():
+    start_run()
     try:
-        # Load all data
-        muscle_imbalance, sessions, injury_history, performance_data = load_data()
-        
         # Create two columns - left for filters, right for content
         col1, col2 = st.columns([1, 4])
         
@@ -48,27 +50,71 @@ def main():
                 st.empty()
             
             # Handle tab content and filters based on active tab
+            # Tab modules and their heavy dependencies (pandas, seaborn, sklearn, shap) are imported on first use
             if st.session_state.active_tab == 0:
-                with tabs[0]:
-                    from injury_dashboard import render_injury_tab
-                    render_injury_tab(injury_history, col1)
+                with tabs[0], span('tab', tab='injury'):
+                    from injury_dashboard import render_injury_tab, INJURY_COLUMNS
+                    from aggregates import build_injury_cubes
+                    from filter_index import build_filter_index
+                    # Each tab loads only the table and columns it reads, on first use
+                    injury_history = data_registry.get('injury_history', INJURY_COLUMNS)
+                    cubes = data_registry.derived('injury_cubes', lambda: build_injury_cubes(injury_history), sources=['injury_history'])
+                    index = data_registry.derived('injury_filter_index', lambda: build_filter_index('injury_history', injury_history), sources=['injury_history'])
+                    render_injury_tab(injury_history, col1, cubes, data_registry.version('injury_history'), index)
             elif st.session_state.active_tab == 1:
-                with tabs[1]:
-                    from muscle_dashboard import render_muscle_tab
-                    render_muscle_tab(muscle_imbalance, col1)
+                with tabs[1], span('tab', tab='muscle'):
+                    from muscle_dashboard import render_muscle_tab, build_risk_frame, MUSCLE_COLUMNS
+                    from filter_index import build_filter_index
+                    muscle_imbalance = data_registry.get('muscle_imbalance', MUSCLE_COLUMNS)
+                    risk_frame = data_registry.derived('muscle_risk', lambda: build_risk_frame(muscle_imbalance), sources=['muscle_imbalance'])
+                    index = data_registry.derived('muscle_filter_index', lambda: build_filter_index('muscle_imbalance', muscle_imbalance), sources=['muscle_imbalance'])
+                    render_muscle_tab(muscle_imbalance, col1, risk_frame, data_registry.version('muscle_imbalance'), index)
             elif st.session_state.active_tab == 2:
-                with tabs[2]:
-                    from sessions_dashboard import render_sessions_tab
-                    render_sessions_tab(sessions, col1)
+                with tabs[2], span('tab', tab='sessions'):
+                    from sessions_dashboard import render_sessions_tab, SESSION_COLUMNS
+                    from aggregates import build_session_cubes
+                    from filter_index import build_filter_index
+                    from session_stream import start_session_stream
+                    sessions = data_registry.get('sessions', SESSION_COLUMNS)
+                    cubes = data_registry.derived('session_cubes', lambda: build_session_cubes(sessions), sources=['sessions'])
+                    index = data_registry.derived('session_filter_index', lambda: build_filter_index('sessions', sessions), sources=['sessions'])
+                    data_version = data_registry.version('sessions')
+                    live_sessions = None
+                    if SESSION_FEED:
+                        # Live sessions are added into the cubes as they arrive
+                        stream = start_session_stream(SESSION_FEED, cubes, data_version)
+                        cubes, data_version = stream.cubes(), f"{data_version}+{stream.version}"
+                        live_sessions = stream.recent_sessions()
+                        with col1:
+                            status = f"Live feed: {stream.accepted} sessions received, {stream.rejected} rejected"
+                            if stream.accepted > len(live_sessions):
+                                status += f"; row-based charts and details include the latest {len(live_sessions)}"
+                            st.caption(status)
+                            if stream.feed_error is not None:
+                                st.warning(f"Live feed unavailable, retrying (attempt {stream.retries}): {stream.feed_error}")
+                            elif stream.last_error is not None:
+                                st.caption(f"Last error: {stream.last_error}")
+                    render_sessions_tab(sessions, col1, cubes, data_version, index, live_sessions)
             elif st.session_state.active_tab == 3:
-                with tabs[3]:
-                    render_performance_tab(performance_data, col1)
+                with tabs[3], span('tab', tab='performance'):
+                    from performance_dashboard import render_performance_tab
+                    from performance_store import load_performance_store
+                    performance_store = data_registry.derived('performance_store', load_performance_store, sources=['performance'])
+                    render_performance_tab(None, col1, data_version=performance_store.version, store=performance_store)
             elif st.session_state.active_tab == 4:
-                with tabs[4]:
-                    render_performance_prediction_tab()
+                with tabs[4], span('tab', tab='performance_prediction'):
+                    from performance_prediction_dashboard import render_performance_prediction_tab
+                    from clutch_features import load_clutch_store
+                    clutch_store = data_registry.derived('clutch_features', load_clutch_store, sources=['performance'])
+                    render_performance_prediction_tab(clutch_store)
             elif st.session_state.active_tab == 5:
-                with tabs[5]:
+                with tabs[5], span('tab', tab='injury_prediction'):
+                    from injury_prediction_dashboard import render_injury_prediction_tab
                     render_injury_prediction_tab()
+
+            render_load_timings(col1)
+            publish(col1)
+            startup_timer.first_paint(col1)
             
             # Tab selection buttons
             for i, tab in enumerate(tabs):
@@ -76,6 +122,10 @@ def main():
                     if st.button("Load Data", key=f"tab_{i}"):
                         handle_tab_click(i)
                         st.rerun()
+
+        # Warm the model cache in the background once the page is drawn, so the prediction tabs and
+        # model switches don't wait on unpickling and the first paint doesn't wait on sklearn
+        model_registry.preload(background=True)
                         
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from quantile_sketch import KeyedSketches
+
+# Pre-aggregated "cubes" for the dashboard KPIs and charts. Each cube holds additive
+# statistics (counts, sums, sums of squares) keyed by player and a time bucket or category,
+# so any player multiselect is answered by filtering and summing a few small frames.
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator else np.nan
+
+def _week_ending(dates):
+    # Same buckets and labels as pd.Grouper(freq='W'): weeks ending on Sunday
+    return dates.dt.to_period('W-SUN').dt.end_time.dt.normalize()
+
+def _month_ending(dates):
+    # Same buckets and labels as resample('M'): calendar months labelled by their last day
+    return dates.dt.to_period('M').dt.end_time.dt.normalize()
+
+def _sum_by(cube, keys, values):
+    return cube.groupby(keys, observed=True)[values].sum()
+
+def select(cube, column, values):
+    """Rows of a cube whose `column` is in `values`"""
+    return cube[cube[column].isin(values)]
+
+def fill_periods(series, freq):
+    """Reindex a period-end series onto every period between its first and last, filling gaps with 0"""
+    if series.empty:
+        return series
+    periods = pd.period_range(series.index.min(), series.index.max(), freq=freq)
+    return series.reindex(periods.to_timestamp(how='end').normalize(), fill_value=0)
+
+# Sessions
+
+def build_session_cubes(session_data):
+    sessions = session_data[['name', 'session_date', 'durations', 'trimp']].assign(
+        week=_week_ending(session_data['session_date']),
+        day_of_week=session_data['session_date'].dt.day_name(),
+        durations_sq=session_data['durations'].astype(float) ** 2,
+        trimp_sq=session_data['trimp'].astype(float) ** 2,
+    )
+    weekly = sessions.groupby(['name', 'week'], observed=True).agg(
+        sessions=('durations', 'size'),
+        durations_sum=('durations', 'sum'),
+        durations_sumsq=('durations_sq', 'sum'),
+        trimp_sum=('trimp', 'sum'),
+        trimp_sumsq=('trimp_sq', 'sum'),
+    ).reset_index()
+    day_of_week = sessions.groupby(['name', 'day_of_week'], observed=True).size().rename('sessions').reset_index()
+    # trimp distribution per player (and per group, when the group column was loaded) for the
+    # high-risk threshold; exact at the current data size, bounded memory as seasons accumulate
+    group_col = 'groupname' if 'groupname' in session_data.columns else None
+    trimp_sketches = KeyedSketches.from_frame(session_data, 'trimp', 'name', group_col)
+    return {'weekly': weekly, 'day_of_week': day_of_week, 'trimp_sketches': trimp_sketches}
+
+def session_kpis(cubes, players):
+    weekly = select(cubes['weekly'], 'name', players)
+    total = weekly['sessions'].sum()
+    return {
+        'total_sessions': int(total),
+        'avg_duration': ratio(weekly['durations_sum'].sum(), total),
+        'unique_players': weekly.loc[weekly['sessions'] > 0, 'name'].nunique(),
+    }
+
+def sessions_over_time(cubes, players):
+    weekly = _sum_by(select(cubes['weekly'], 'name', players), 'week', 'sessions')
+    return fill_periods(weekly, 'W-SUN')
+
+def sessions_per_player(cubes, players):
+    per_player = _sum_by(select(cubes['weekly'], 'name', players), 'name', 'sessions')
+    return per_player.sort_values(ascending=False, kind='stable')
+
+def sessions_by_day(cubes, players):
+    by_day = _sum_by(select(cubes['day_of_week'], 'name', players), 'day_of_week', 'sessions')
+    return by_day.sort_values(ascending=False, kind='stable')
+
+def trimp_threshold(cubes, players, q=0.75):
+    """The q-quantile of trimp over the selected players' sessions"""
+    return cubes['trimp_sketches'].sketch_for(players).quantile(q)
+
+def sessions_above(cubes, players, threshold):
+    return cubes['trimp_sketches'].sketch_for(players).count_above(threshold)
+
+# Injuries
+
+def build_injury_cubes(injury_data):
+    injuries = injury_data.assign(
+        month=_month_ending(injury_data['Injury Date']),
+        recovery_count=injury_data['Recovery Time (days)'].notna().astype(int),
+        recovery_sum=injury_data['Recovery Time (days)'].fillna(0),
+        recovery_sumsq=injury_data['Recovery Time (days)'].fillna(0) ** 2,
+    )
+    keys = ['Name', 'Severity']
+    totals = injuries.groupby(keys, observed=True).agg(
+        injuries=('Injury Date', 'size'),
+        recovery_count=('recovery_count', 'sum'),
+        recovery_sum=('recovery_sum', 'sum'),
+        recovery_sumsq=('recovery_sumsq', 'sum'),
+    ).reset_index()
+    monthly = injuries.groupby(keys + ['month'], observed=True).size().rename('injuries').reset_index()
+    by_type = injuries.groupby(keys + ['Injury Type'], observed=True).size().rename('injuries').reset_index()
+    by_body_part = injuries.groupby(keys + ['Body Part'], observed=True).size().rename('injuries').reset_index()
+    return {'totals': totals, 'monthly': monthly, 'by_type': by_type, 'by_body_part': by_body_part}
+
+def _select_injuries(cube, players, severities):
+    return cube[cube['Name'].isin(players) & cube['Severity'].isin(severities)]
+
+def _most_common(cube, column):
+    # Mirrors mode().iloc[0] / value_counts().iloc[0]: ties go to the first value in sort order
+    counts = _sum_by(cube, column, 'injuries')
+    counts = counts[counts > 0]
+    if counts.empty:
+        return None, 0
+    top = counts[counts == counts.max()].sort_index()
+    return top.index[0], int(top.iloc[0])
+
+def injury_kpis(cubes, players, severities):
+    totals = _select_injuries(cubes['totals'], players, severities)
+    return {
+        'total_injuries': int(totals['injuries'].sum()),
+        'avg_recovery': ratio(totals['recovery_sum'].sum(), totals['recovery_count'].sum()),
+        'most_common_injury': _most_common(_select_injuries(cubes['by_type'], players, severities), 'Injury Type'),
+        'most_affected_part': _most_common(_select_injuries(cubes['by_body_part'], players, severities), 'Body Part'),
+    }
+
+def injuries_over_time(cubes, players, severities):
+    monthly = _sum_by(_select_injuries(cubes['monthly'], players, severities), 'month', 'injuries')
+    return fill_periods(monthly, 'M')
+
+def severity_counts(cubes, players, severities):
+    counts = _sum_by(_select_injuries(cubes['totals'], players, severities), 'Severity', 'injuries')
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+# Performance
+
+def build_performance_cubes(performance_data):
+    plays = performance_data[performance_data['shooter'].notna()]
+    made = plays['shot_outcome'] == 'made'
+    three_pt = plays['three_pt'].fillna(False).astype(bool)
+    free_throw = plays['free_throw'].fillna(False).astype(bool)
+    per_date = pd.DataFrame({
+        'shooter': plays['shooter'],
+        'date': pd.to_datetime(plays['date']),
+        'plays': 1,
+        'made': made.astype(int),
+        'scoring_plays': plays['scoring_play'].astype(int),
+        'three_pt_attempts': three_pt.astype(int),
+        'three_pt_made': (three_pt & made).astype(int),
+        'free_throw_attempts': free_throw.astype(int),
+        'free_throw_made': (free_throw & made).astype(int),
+    }).groupby(['shooter', 'date'], observed=True).sum().reset_index()
+    return {'per_date': per_date}
+
+def performance_kpis(cubes, shooters):
+    totals = select(cubes['per_date'], 'shooter', shooters).sum(numeric_only=True)
+    return {
+        'total_points': int(totals.get('scoring_plays', 0)),
+        'shooting_accuracy': ratio(totals.get('made', 0), totals.get('plays', 0)) * 100,
+        'three_point_accuracy': ratio(totals.get('three_pt_made', 0), totals.get('three_pt_attempts', 0)) * 100,
+        'free_throw_accuracy': ratio(totals.get('free_throw_made', 0), totals.get('free_throw_attempts', 0)) * 100,
+    }
+
+def accuracy_over_time(cubes, shooters):
+    per_date = _sum_by(select(cubes['per_date'], 'shooter', shooters), 'date', ['made', 'plays'])
+    return per_date['made'] / per_date['plays']
+
+def shot_outcome_shares(cubes, shooters):
+    totals = select(cubes['per_date'], 'shooter', shooters)[['made', 'plays']].sum()
+    shares = pd.Series({'made': totals['made'], 'missed': totals['plays'] - totals['made']}, dtype=float)
+    shares = shares[shares > 0] / totals['plays'] if totals['plays'] else shares[shares > 0]
+    return shares.sort_values(ascending=False, kind='stable')
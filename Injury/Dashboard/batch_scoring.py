@@ -0,0 +1,94 @@
+import time
+import numpy as np
+import pandas as pd
+from injury_features import append_features, load_sources, read_cleaned_data
+from injury_risk import INJURY_FEATURES, assess_risk, predict_risk
+from model_registry import model_registry
+
+# Batch injury-risk scoring for every player-session in a file. Input is either a file that
+# already has the six model features (shaped like "Cleaned Data/test.csv") or a raw sessions
+# export, in which case the features are taken from Cleaned_data.csv: sessions already in it
+# keep their features, and new ones are appended to it with injury_features.append_features,
+# so they are projected with the fitted PCA and measured against each player's full history.
+# build_features is only for full rebuilds of Cleaned_data.csv.
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Identifying columns copied from the input next to each score, when present
+ID_COLUMNS = ['name', 'playerid', 'sessionid', 'session_date']
+
+# Identifies a player-session in Cleaned_data.csv
+SESSION_KEY = ['sessionid', 'playerid']
+
+def has_model_features(path):
+    header = pd.read_csv(path, nrows=0, encoding='ISO-8859-1').columns
+    return set(INJURY_FEATURES).issubset(header)
+
+def iter_feature_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield frames holding the model features (plus id columns) for every session in `path`"""
+    if has_model_features(path):
+        header = pd.read_csv(path, nrows=0, encoding='ISO-8859-1').columns
+        usecols = [col for col in ID_COLUMNS if col in header] + INJURY_FEATURES
+        yield from pd.read_csv(path, usecols=usecols, encoding='ISO-8859-1', chunksize=chunksize)
+        return
+
+    # Raw sessions: features depend on each player's whole history, so build them in one pass
+    sessions = pd.read_csv(path, encoding='ISO-8859-1', parse_dates=['session_date'])
+    features = session_features(sessions)
+    for start in range(0, len(features), chunksize):
+        yield features.iloc[start:start + chunksize]
+
+def session_features(sessions):
+    """Model features for raw `sessions`, in input order, consistent with the training data"""
+    cleaned = read_cleaned_data()
+    known = pd.MultiIndex.from_frame(sessions[SESSION_KEY]).isin(pd.MultiIndex.from_frame(cleaned[SESSION_KEY]))
+    existing = sessions.loc[known, SESSION_KEY].merge(cleaned, on=SESSION_KEY, how='left')
+    existing.index = np.flatnonzero(known)
+    if known.all():
+        return existing
+
+    injury_history, muscle_imbalance, _ = load_sources()
+    new = append_features(cleaned, sessions[~known], injury_history, muscle_imbalance).iloc[len(cleaned):]
+    new.index = np.flatnonzero(~known)
+    return pd.concat([existing, new]).sort_index()
+
+def score_chunks(chunks, model):
+    """Score each chunk with a single predict_proba call and yield ids plus risk columns"""
+    for chunk in chunks:
+        ids = chunk[[col for col in ID_COLUMNS if col in chunk.columns]].reset_index(drop=True)
+        scores = predict_risk(model, chunk) if len(chunk) else assess_risk(np.empty(0))
+        yield pd.concat([ids, scores], axis=1)
+
+def score_file(input_path, output_path, model_name='rf', chunksize=DEFAULT_CHUNKSIZE):
+    """Stream risk scores for every session in `input_path` to a CSV and return throughput stats"""
+    model = model_registry.get(model_name)
+    start = time.perf_counter()
+    rows, chunks = 0, 0
+    for scored in score_chunks(iter_feature_chunks(input_path, chunksize), model):
+        scored.to_csv(output_path, mode='w' if chunks == 0 else 'a', header=chunks == 0, index=False)
+        rows += len(scored)
+        chunks += 1
+    if chunks == 0:
+        # No sessions: still write the header, so downstream jobs find the file
+        header = pd.read_csv(input_path, nrows=0, encoding='ISO-8859-1').columns
+        ids = [col for col in ID_COLUMNS if col in header]
+        pd.DataFrame(columns=ids + list(assess_risk(np.empty(0)).columns)).to_csv(output_path, index=False)
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float('inf'),
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Score injury risk for every session in a file")
+    parser.add_argument('input', help="sessions CSV, raw or with the six model features")
+    parser.add_argument('output', help="CSV to write probabilities and risk levels to")
+    parser.add_argument('--model', default='rf', choices=['rf', 'gb', 'lr'])
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    stats = score_file(args.input, args.output, model_name=args.model, chunksize=args.chunksize)
+    print(f"Scored {stats['rows']} sessions in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:.0f} rows/second) -> {args.output}")
@@ -0,0 +1,197 @@
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import data_store
+from data_store import TABLES, STORE_DIR, ingest, read_table
+from synthetic_data import SCALES, write_dataset
+from headless import Container, headless_streamlit
+
+# Scaling benchmarks on synthetic copies of the source CSVs (see synthetic_data.py). For each
+# scale the dashboard is pointed at the synthetic files and times, as the median of --repeats
+# runs: ingest into Parquet, load_data, the precomputed cubes, every tab's render function
+# (with Streamlit replaced by a headless stand-in and the figure cache bypassed, so every chart
+# is drawn), the injury and clutch feature builds and both models' predictions. Results are
+# written as JSON; --compare prints two result files side by side.
+
+SYNTHETIC_DIR = os.path.join(STORE_DIR, 'synthetic')
+RESULTS_DIR = os.path.join(STORE_DIR, 'benchmarks')
+
+# The roster ranking form's defaults in the Performance Prediction tab
+GAME_CONTEXT = {
+    'time_remaining': 24,
+    'win_prob_gap': 0.1,
+    'possession_length': 30,
+    'home_team_advantage': 0,
+    'high_pressure': 0,
+    'possession_change': 0,
+}
+
+@contextmanager
+def synthetic_sources(root):
+    """Read the CSVs under `root` instead of the real ones, through a Parquet store of their own"""
+    from utils import data_registry
+    sources = {table: spec['source'] for table, spec in TABLES.items()}
+    store_dir = data_store.STORE_DIR
+    for table, source in sources.items():
+        TABLES[table]['source'] = os.path.join(root, os.path.basename(source))
+    data_store.STORE_DIR = os.path.join(root, 'store')
+    data_registry.clear()
+    try:
+        yield
+    finally:
+        for table, source in sources.items():
+            TABLES[table]['source'] = source
+        data_store.STORE_DIR = store_dir
+        data_registry.clear()
+
+def dataset_root(scale, data_dir=SYNTHETIC_DIR, regenerate=False):
+    """Directory of the synthetic CSVs at `scale`, generating them if they are not there yet"""
+    root = os.path.join(data_dir, f"x{scale}")
+    paths = [os.path.join(root, os.path.basename(spec['source'])) for spec in TABLES.values()]
+    if regenerate or not all(os.path.exists(path) for path in paths):
+        write_dataset(root, scale)
+    return root
+
+def timed(run, repeats, setup=None):
+    """Median seconds over `repeats` calls of `run`, and the last call's result"""
+    seconds = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = run()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds)), result
+
+def run_scale(root, repeats=3, log=print):
+    """Rows and median seconds of every benchmarked stage on the CSVs under `root`"""
+    from utils import data_registry, load_data
+    from aggregates import build_injury_cubes, build_session_cubes
+    from injury_dashboard import render_injury_tab
+    from muscle_dashboard import render_muscle_tab, build_risk_frame
+    from sessions_dashboard import render_sessions_tab
+    from performance_dashboard import render_performance_tab
+    from performance_store import PerformanceStore, write_partitions
+    from filter_index import build_filter_index
+    from injury_features import build_features, load_sources
+    from injury_risk import predict_risk
+    from tree_inference import fast_model
+    from model_registry import model_registry
+    from clutch_features import PLAY_COLUMNS, ClutchFeatureStore, rank_shooters
+
+    seconds = {}
+    def measure(name, run, setup=None):
+        seconds[name], result = timed(run, repeats, setup)
+        log(f"  {name}: {seconds[name] * 1000:.1f} ms")
+        return result
+
+    with synthetic_sources(root):
+        for table in TABLES:
+            measure(f"ingest.{table}", lambda: ingest(table, force=True))
+        muscle, sessions, injuries, performance = measure('load_data', load_data, setup=data_registry.clear)
+        rows = {'injury_history': len(injuries), 'muscle_imbalance': len(muscle), 'sessions': len(sessions),
+                'performance': len(performance)}
+
+        injury_cubes = measure('cubes.injury', lambda: build_injury_cubes(injuries))
+        risk_frame = measure('cubes.muscle_risk', lambda: build_risk_frame(muscle))
+        session_cubes = measure('cubes.sessions', lambda: build_session_cubes(sessions))
+        performance_root = os.path.join(data_store.STORE_DIR, 'performance')
+        measure('cubes.performance_store', lambda: write_partitions(performance, performance_root))
+        store = PerformanceStore(performance_root)
+        indexes = {table: measure(f"index.{table}", lambda: build_filter_index(table, frame))
+                   for table, frame in [('injury_history', injuries), ('muscle_imbalance', muscle), ('sessions', sessions)]}
+
+        # The render functions as Dashboard.py calls them, without a data version so nothing is cached
+        with headless_streamlit() as app:
+            filter_col = Container(app)
+            measure('render.injury', lambda: render_injury_tab(injuries, filter_col, injury_cubes,
+                                                               index=indexes['injury_history']))
+            measure('render.muscle', lambda: render_muscle_tab(muscle, filter_col, risk_frame,
+                                                               index=indexes['muscle_imbalance']))
+            measure('render.sessions', lambda: render_sessions_tab(sessions, filter_col, session_cubes,
+                                                                   index=indexes['sessions']))
+            measure('render.performance', lambda: render_performance_tab(None, filter_col, store=store))
+        if app.errors:
+            raise RuntimeError(f"A tab failed to render: {app.errors[0]}")
+
+        sources = load_sources()
+        features = measure('features.injury', lambda: build_features(*sources))
+        injury_model = fast_model(model_registry.get('rf'))
+        measure('predict.injury_risk', lambda: predict_risk(injury_model, features))
+
+        plays = read_table('performance', PLAY_COLUMNS)
+        clutch_store = measure('features.clutch', lambda: ClutchFeatureStore.build(plays))
+        winning_shot = model_registry.get('winning_shot')
+        shots = clutch_store.model_features()
+        measure('predict.winning_shot', lambda: winning_shot.predict_proba(shots))
+        measure('predict.shooter_ranking', lambda: rank_shooters(winning_shot, clutch_store, GAME_CONTEXT))
+        rows.update({'features': len(features), 'shots': len(shots)})
+    return {'rows': rows, 'seconds': seconds}
+
+def run(scales=SCALES, repeats=3, data_dir=SYNTHETIC_DIR, regenerate=False, log=print):
+    """Benchmark every scale in turn; returns the JSON-ready results"""
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeats': repeats,
+        'scales': {},
+    }
+    for scale in scales:
+        log(f"x{scale}:")
+        results['scales'][str(scale)] = run_scale(dataset_root(scale, data_dir, regenerate), repeats, log)
+    return results
+
+def save(results, path=None):
+    path = path or os.path.join(RESULTS_DIR, f"benchmark-{results['created'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+        file.write('\n')
+    return path
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def compare(old, new):
+    """Per scale and stage: old and new milliseconds and the new/old ratio"""
+    rows = []
+    for scale, result in new['scales'].items():
+        previous = old['scales'].get(scale, {}).get('seconds', {})
+        for name, seconds in result['seconds'].items():
+            before = previous.get(name)
+            rows.append({'scale': int(scale), 'stage': name,
+                         'old_ms': before * 1000 if before is not None else np.nan, 'new_ms': seconds * 1000,
+                         'ratio': seconds / before if before else np.nan})
+    return pd.DataFrame(rows, columns=['scale', 'stage', 'old_ms', 'new_ms', 'ratio'])
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Time loading, rendering and prediction on synthetic data at scale")
+    parser.add_argument('--scales', nargs='+', type=int, default=SCALES, help="dataset multiples (default: 10 100 1000)")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per stage (median is kept)")
+    parser.add_argument('--data-dir', default=SYNTHETIC_DIR, help="where the synthetic CSVs are generated")
+    parser.add_argument('--regenerate', action='store_true', help="rewrite the synthetic CSVs even if present")
+    parser.add_argument('--output', help=f"results file (default: a timestamped file in {RESULTS_DIR})")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two results files and exit")
+    args = parser.parse_args()
+    import warnings
+    warnings.simplefilter('ignore')
+
+    if args.compare:
+        old, new = [load(path) for path in args.compare]
+        with pd.option_context('display.max_rows', None, 'display.width', 120):
+            print(compare(old, new).round({'old_ms': 1, 'new_ms': 1, 'ratio': 2}).to_string(index=False))
+        sys.exit(0)
+
+    results = run(args.scales, args.repeats, args.data_dir, args.regenerate)
+    print(f"results written to {save(results, args.output)}")
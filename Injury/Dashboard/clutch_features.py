@@ -0,0 +1,252 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.preprocessing import StandardScaler
+from data_store import STORE_DIR, FINGERPRINT_KEY, read_table, source_fingerprint
+
+# Persistent store of the winning-shot features from Performance/winning_shot_player.ipynb.
+# Per-shot features are computed in one vectorized pass over the team's shots; running
+# features (scoring streak, possession length, recent performance) carry on from the stored
+# shots when a new game is appended. Shooter success rates come from made/attempt counts
+# kept per game, shooter and seconds-remaining bucket, so they never need a rescan either.
+
+TEAM = 'Syracuse'
+
+# Model inputs, in the order winning_shot_model.pkl was trained on
+WINNING_SHOT_FEATURES = [
+    'shooting_success_rate', 'recent_performance', 'win_prob_gap', 'possession_length',
+    'scoring_streak', 'time_remaining', 'home_team_advantage', 'high_pressure',
+    'possession_change', '5min_clutch_success_rate', '2min_clutch_success_rate',
+    'final_shot_success_rate'
+]
+
+# Features the notebook standardizes before training; the model only ever saw their z-scores
+SCALED_FEATURES = [
+    'shooting_success_rate', 'recent_performance', 'win_prob_gap', 'possession_length',
+    'scoring_streak', 'time_remaining', '5min_clutch_success_rate', '2min_clutch_success_rate',
+    'final_shot_success_rate'
+]
+
+# Features describing the game state rather than the shooter; the same for every shooter in a ranking
+GAME_CONTEXT = [
+    'win_prob_gap', 'possession_length', 'time_remaining', 'home_team_advantage', 'high_pressure',
+    'possession_change'
+]
+
+# Clutch windows by seconds remaining, narrowest first; every other shot is 'regular'
+CLUTCH_WINDOWS = {'final_shot': 24, '2min_clutch': 120, '5min_clutch': 300}
+SECS_BUCKETS = list(CLUTCH_WINDOWS) + ['regular']
+
+# Shots averaged by recent_performance
+RECENT_SHOTS = 5
+
+PLAY_COLUMNS = ['game_id', 'play_id', 'home', 'away', 'secs_remaining', 'home_score', 'away_score',
+                'play_length', 'scoring_play', 'win_prob', 'naive_win_prob', 'shot_team', 'shot_outcome',
+                'shooter', 'possession_before', 'possession_after']
+
+SHOTS_PATH = os.path.join(STORE_DIR, 'clutch_shots.parquet')
+COUNTS_PATH = os.path.join(STORE_DIR, 'clutch_counts.parquet')
+
+def team_shots(plays, team=TEAM):
+    """The team's shots with a known outcome and shooter, in play order"""
+    plays = plays[(plays['home'] == team) | (plays['away'] == team)]
+    return plays[plays['shot_team'] == team].dropna(subset=['shot_outcome', 'shooter'])
+
+def secs_bucket(secs_remaining):
+    secs_remaining = np.asarray(secs_remaining)
+    buckets = np.select([secs_remaining <= limit for limit in CLUTCH_WINDOWS.values()], list(CLUTCH_WINDOWS), 'regular')
+    return pd.Categorical(buckets, categories=SECS_BUCKETS)
+
+def _continue_cumsum(values, keys, prior):
+    # Cumulative sum per key, starting from each key's total in the earlier shots
+    running = values.groupby(keys).cumsum()
+    return running + keys.map(prior).astype(float).fillna(0)
+
+def shot_features(shots, history=None):
+    """Per-shot features for `shots`, continuing the running ones from `history` (earlier stored shots)"""
+    shots = shots.reset_index(drop=True)
+    made = (shots['shot_outcome'] == 'made').astype(int)
+    features = pd.DataFrame({
+        'game_id': shots['game_id'].astype('int64'),
+        'play_id': shots['play_id'].astype('int64'),
+        'shooter': shots['shooter'].astype(str),
+        'secs_remaining': shots['secs_remaining'].astype('int64'),
+        'secs_bucket': secs_bucket(shots['secs_remaining']),
+        'made': made,
+        'scoring_play': shots['scoring_play'].astype(int),
+        'play_length': shots['play_length'],
+        'possession_before': shots['possession_before'].astype(object),
+        'win_prob_gap': (shots['win_prob'] - shots['naive_win_prob']).abs(),
+        'high_pressure': (shots['win_prob'] < 0.5).astype(int),
+        'possession_change': (shots['possession_before'].astype(object) != shots['possession_after'].astype(object)).astype(int),
+        'home_team_advantage': (shots['home_score'] > shots['away_score']).astype(int),
+        'time_remaining': shots['secs_remaining'].astype('int64'),
+    })
+    if history is None:
+        history = features.iloc[:0].assign(scoring_streak=0, possession_length=0.0)
+
+    # Scoring plays so far per shooter, and play length so far per possessing team
+    streak = history.groupby('shooter')['scoring_streak'].last()
+    features['scoring_streak'] = _continue_cumsum(features['scoring_play'], features['shooter'], streak).astype(int)
+    possession = history.dropna(subset=['possession_before']).groupby('possession_before')['possession_length'].last()
+    features['possession_length'] = _continue_cumsum(
+        features['play_length'], features['possession_before'], possession
+    ).where(features['possession_before'].notna(), 0.0)
+
+    # Mean of each shooter's last RECENT_SHOTS scoring plays, including the earlier ones still in the window
+    recent = pd.concat([
+        history.groupby('shooter').tail(RECENT_SHOTS - 1)[['shooter', 'scoring_play']],
+        features[['shooter', 'scoring_play']],
+    ], ignore_index=True)
+    rolling = recent.groupby('shooter', sort=False)['scoring_play'].rolling(RECENT_SHOTS).mean().reset_index(level=0, drop=True)
+    features['recent_performance'] = rolling.sort_index().to_numpy()[-len(features):] if len(features) else []
+    features['recent_performance'] = features['recent_performance'].fillna(0)
+    return features
+
+def bucket_counts(features):
+    """Attempts and makes per game, shooter and seconds-remaining bucket"""
+    return features.groupby(['game_id', 'shooter', 'secs_bucket'], observed=True).agg(
+        attempts=('made', 'size'),
+        made=('made', 'sum'),
+    ).reset_index()
+
+def shooter_rates(counts):
+    """Overall and clutch success rates per shooter, 0 where a shooter has no shots in a window"""
+    totals = counts.groupby(['shooter', 'secs_bucket'], observed=True)[['attempts', 'made']].sum()
+    attempts = totals['attempts'].unstack('secs_bucket').reindex(columns=SECS_BUCKETS, fill_value=0).fillna(0)
+    made = totals['made'].unstack('secs_bucket').reindex(columns=SECS_BUCKETS, fill_value=0).fillna(0)
+    # Buckets are nested windows: <=24s is inside <=120s, inside <=300s, inside the whole game
+    rates = (made.cumsum(axis=1) / attempts.cumsum(axis=1)).fillna(0)
+    return pd.DataFrame({
+        'shooting_success_rate': rates['regular'],
+        '5min_clutch_success_rate': rates['5min_clutch'],
+        '2min_clutch_success_rate': rates['2min_clutch'],
+        'final_shot_success_rate': rates['final_shot'],
+    })
+
+class ClutchFeatureStore:
+    """Winning-shot features per shot, indexed by game, shooter and seconds-remaining bucket"""
+
+    def __init__(self, shots, counts):
+        self.shots = shots
+        self.counts = counts
+        self._index()
+
+    @classmethod
+    def build(cls, plays):
+        shots = shot_features(team_shots(plays))
+        return cls(shots, bucket_counts(shots))
+
+    def _index(self):
+        self.rates = shooter_rates(self.counts)
+        # Shots are in play order, so each shooter's last row holds their current running features
+        latest = self.shots.groupby('shooter')[['recent_performance', 'scoring_streak']].last()
+        self.player_features = self.rates.join(latest)
+        self.by_key = self.shots.set_index(['game_id', 'shooter', 'secs_bucket']).sort_index()
+        self.game_ids = set(self.shots['game_id'].unique())
+        # Fitted on every shot, as the notebook fits its scaler on the whole shot table
+        self.scaler = StandardScaler().fit(self.raw_features()[SCALED_FEATURES])
+
+    def append_game(self, game_plays):
+        """Add the plays of games not yet in the store, continuing every running feature"""
+        new_games = set(game_plays['game_id'].unique())
+        if new_games & self.game_ids:
+            raise ValueError(f"Games already in the store: {sorted(new_games & self.game_ids)}")
+        new = shot_features(team_shots(game_plays), self.shots)
+        self.shots = pd.concat([self.shots, new], ignore_index=True)
+        self.counts = pd.concat([self.counts, bucket_counts(new)], ignore_index=True)
+        self._index()
+        return len(new)
+
+    def query(self, game_id=None, shooter=None, secs_bucket=None):
+        """Shots matching any combination of game, shooter and bucket, from the sorted index"""
+        key = tuple(slice(None) if value is None else value for value in (game_id, shooter, secs_bucket))
+        return self.by_key.loc[key, :].reset_index()
+
+    def raw_features(self, shots=None):
+        """WINNING_SHOT_FEATURES for each shot, with the shooters' current success rates, unscaled"""
+        shots = self.shots if shots is None else shots
+        return shots.drop(columns=self.rates.columns, errors='ignore').join(self.rates, on='shooter')[WINNING_SHOT_FEATURES]
+
+    def scale(self, features):
+        """`features` with SCALED_FEATURES standardized the way the model was trained"""
+        scaled = features.astype({feature: float for feature in SCALED_FEATURES})
+        scaled[SCALED_FEATURES] = self.scaler.transform(features[SCALED_FEATURES])
+        return scaled
+
+    def model_features(self, shots=None):
+        """Model inputs for each shot, scaled like syracuse_shots.csv"""
+        return self.scale(self.raw_features(shots))
+
+    def shooter_profile(self, shooter):
+        """A shooter's success rates plus the running features as of their latest shot"""
+        profile = self.player_features.loc[shooter].to_dict()
+        profile['scoring_streak'] = int(profile['scoring_streak'])
+        return profile
+
+    def roster_features(self, game_context, shooters=None):
+        """Scaled model inputs for each shooter in the given game state, one row per shooter"""
+        missing = [feature for feature in GAME_CONTEXT if feature not in game_context]
+        if missing:
+            raise KeyError(f"Missing game context: {missing}")
+        players = self.player_features if shooters is None else self.player_features.loc[list(shooters)]
+        return self.scale(players.assign(**{feature: game_context[feature] for feature in GAME_CONTEXT})[WINNING_SHOT_FEATURES])
+
+    def shooters(self):
+        return self.rates.index.tolist()
+
+    def save(self, fingerprint):
+        os.makedirs(STORE_DIR, exist_ok=True)
+        for frame, path in [(self.shots, SHOTS_PATH), (self.counts, COUNTS_PATH)]:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), FINGERPRINT_KEY: fingerprint.encode()})
+            # Write to a temp file first so readers never see a half-written store
+            pq.write_table(table, path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls):
+        return cls(pd.read_parquet(SHOTS_PATH), pd.read_parquet(COUNTS_PATH))
+
+def rank_shooters(model, store, game_context, shooters=None):
+    """Every shooter's probability of being the winning-shot pick, from one predict_proba call"""
+    features = store.roster_features(game_context, shooters)
+    probabilities = model.predict_proba(features)[:, list(model.classes_).index(1)]
+    ranking = pd.DataFrame({'shooter': features.index, 'probability': probabilities})
+    return ranking.sort_values('probability', ascending=False, kind='stable').reset_index(drop=True)
+
+def _stored_fingerprint():
+    if not (os.path.exists(SHOTS_PATH) and os.path.exists(COUNTS_PATH)):
+        return None
+    return (pq.read_schema(SHOTS_PATH).metadata or {}).get(FINGERPRINT_KEY, b'').decode()
+
+def load_clutch_store():
+    """The feature store for the current play-by-play file, appending new games when it has grown"""
+    fingerprint = source_fingerprint('performance')
+    stored = _stored_fingerprint()
+    if stored == fingerprint:
+        return ClutchFeatureStore.load()
+
+    plays = read_table('performance', PLAY_COLUMNS)
+    if stored is not None:
+        store = ClutchFeatureStore.load()
+        # Appending is only valid if the stored games are unchanged in the new file
+        source_counts = team_shots(plays).groupby('game_id').size()
+        stored_counts = store.shots.groupby('game_id').size()
+        if source_counts.reindex(stored_counts.index).equals(stored_counts.astype(source_counts.dtype)):
+            store.append_game(plays[~plays['game_id'].isin(store.game_ids)])
+            store.save(fingerprint)
+            return store
+
+    store = ClutchFeatureStore.build(plays)
+    store.save(fingerprint)
+    return store
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    store = load_clutch_store()
+    print(f"{len(store.shots)} shots from {len(store.game_ids)} games, "
+          f"{len(store.counts)} game/shooter/bucket counts in {time.perf_counter() - start:.2f}s")
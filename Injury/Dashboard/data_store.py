@@ -0,0 +1,252 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columnar copies of the raw CSVs live next to the data they were built from
+STORE_DIR = 'Injury/Data/store'
+
+# Declared schema per table: source CSV, how to parse it, and the dtype of every column.
+# 'category' columns are dictionary-encoded in the Parquet file and come back as categoricals.
+# Integer columns are stored downcast to the smallest type that holds their values.
+# 'lazy' columns are free text no tab shows; they are only read when asked for by name.
+TABLES = {
+    'injury_history': {
+        'source': 'Injury/Data/injury_history(injury_history).csv',
+        'encoding': 'ISO-8859-1',
+        'dates': {'Injury Date': '%m/%d/%Y'},
+        'columns': {
+            'Player.ID': 'int64',
+            'Name': 'category',
+            'Group.Id': 'int64',
+            'Injury Type': 'category',
+            'Body Part': 'category',
+            'Side': 'category',
+            'Injury Date': 'datetime64[ns]',
+            'Severity': 'category',
+            'Recovery Time (days)': 'float64',
+            'Additional Notes': 'string',
+        },
+        'lazy': ['Additional Notes'],
+    },
+    'muscle_imbalance': {
+        'source': 'Injury/Data/injury_history(muscle_imbalance_data).csv',
+        'encoding': 'ISO-8859-1',
+        'dates': {'Date Recorded': '%m/%d/%Y'},
+        'columns': {
+            'Player.ID': 'int64',
+            'Session ID': 'int64',
+            'Player Name': 'category',
+            'Date Recorded': 'datetime64[ns]',
+            'Hamstring To Quad Ratio': 'float64',
+            'Quad Imbalance Percent': 'float64',
+            'HamstringImbalance Percent': 'float64',
+            'Calf Imbalance Percent': 'float64',
+            'Groin Imbalance Percent': 'float64',
+        },
+        'lazy': [],
+    },
+    'sessions': {
+        'source': 'Injury/Data/injury_history(player_sessions).csv',
+        'encoding': 'ISO-8859-1',
+        'dates': {'session_date': '%Y-%m-%d'},
+        'columns': {
+            'name': 'category',
+            'playerid': 'int64',
+            'groupid': 'int64',
+            'groupname': 'category',
+            'leagueid': 'int64',
+            'sessionid': 'int64',
+            'session_date': 'datetime64[ns]',
+            'position': 'category',
+            'distancemi': 'float64',
+            'distanceminmi': 'float64',
+            'durations': 'int64',
+            'steps': 'int64',
+            'speedofmax': 'float64',
+            'speedmaxmph': 'float64',
+            'speedmph': 'float64',
+            'times': 'int64',
+            'accumulatedaccelerationload': 'int64',
+            'anaerobicactivitydistancemi': 'float64',
+            'jumploadj': 'int64',
+            'heartratebpm': 'int64',
+            'heartrateminbpm': 'int64',
+            'heartratemaxbpm': 'int64',
+            'humancoretemperaturef': 'float64',
+            'humancoretemperaturemaxf': 'float64',
+            'trimp': 'int64',
+            'heartraterecoveries': 'int64',
+            'jumpheightmaxft': 'float64',
+            'changesoforientation': 'int64',
+            'exertions': 'int64',
+            'diskusage': 'float64',
+        },
+        'lazy': [],
+    },
+    'performance': {
+        'source': 'Performance/Syracuse_Basketball.csv',
+        'encoding': 'utf-8-sig',
+        'dates': {'date': '%m/%d/%y'},
+        'columns': {
+            'game_id': 'int64',
+            'date': 'datetime64[ns]',
+            'home': 'category',
+            'away': 'category',
+            'play_id': 'int64',
+            'half': 'int64',
+            'time_remaining_half': 'string',
+            'secs_remaining': 'int64',
+            'secs_remaining_absolute': 'int64',
+            'description': 'string',
+            'action_team': 'category',
+            'home_score': 'int64',
+            'away_score': 'int64',
+            'score_diff': 'int64',
+            'play_length': 'int64',
+            'scoring_play': 'bool',
+            'foul': 'bool',
+            'win_prob': 'float64',
+            'naive_win_prob': 'float64',
+            'home_time_out_remaining': 'int64',
+            'away_time_out_remaining': 'int64',
+            'home_favored_by': 'float64',
+            'total_line': 'float64',
+            'referees': 'category',
+            'arena_location': 'category',
+            'arena': 'category',
+            'attendance': 'int64',
+            'shot_team': 'category',
+            'shot_outcome': 'category',
+            'shooter': 'category',
+            'three_pt': 'boolean',
+            'free_throw': 'boolean',
+            'possession_before': 'category',
+            'possession_after': 'category',
+        },
+        'lazy': ['time_remaining_half', 'description'],
+    },
+}
+
+FINGERPRINT_KEY = b'source_fingerprint'
+
+# Bumped when the stored layout changes, so existing Parquet copies are rebuilt
+FORMAT_KEY = b'store_format'
+STORE_FORMAT = b'2'
+
+
+def store_path(table):
+    return os.path.join(STORE_DIR, f"{table}.parquet")
+
+
+def source_fingerprint(table):
+    """Cheap change marker for a source CSV: size and modification time"""
+    stat = os.stat(TABLES[table]['source'])
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def is_stale(table):
+    path = store_path(table)
+    if not os.path.exists(path):
+        return True
+    metadata = pq.read_schema(path).metadata or {}
+    return (metadata.get(FINGERPRINT_KEY, b'').decode() != source_fingerprint(table)
+            or metadata.get(FORMAT_KEY) != STORE_FORMAT)
+
+
+def parse_csv(table):
+    """Read a source CSV and coerce every column to its declared dtype"""
+    spec = TABLES[table]
+    df = pd.read_csv(spec['source'], encoding=spec['encoding'], usecols=list(spec['columns']))
+
+    for col, dtype in spec['columns'].items():
+        if col in spec['dates']:
+            df[col] = pd.to_datetime(df[col], format=spec['dates'][col], errors='coerce')
+        elif dtype in ('int64', 'float64') and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df[list(spec['columns'])]
+
+
+def compact_dtypes(df):
+    """Integer columns downcast to the smallest type that holds their values"""
+    # Floats stay float64: even where float32 holds every value exactly, means and sums over it would not be
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'int64':
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def ingest(table, force=False):
+    """Rebuild the Parquet copy of a table if its source CSV changed"""
+    if not force and not is_stale(table):
+        return False
+
+    df = compact_dtypes(parse_csv(table))
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(arrow_table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = source_fingerprint(table).encode()
+    metadata[FORMAT_KEY] = STORE_FORMAT
+    arrow_table = arrow_table.replace_schema_metadata(metadata)
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    # Write to a temp file first so readers never see a half-written table
+    tmp_path = store_path(table) + '.tmp'
+    pq.write_table(arrow_table, tmp_path, use_dictionary=True, compression='snappy')
+    os.replace(tmp_path, store_path(table))
+    return True
+
+
+def ingest_all(force=False):
+    return {table: ingest(table, force=force) for table in TABLES}
+
+
+def read_table(table, columns=None):
+    """Read a table from the store, optionally only the given columns; lazy columns only by name"""
+    ingest(table)
+    spec = TABLES[table]
+    if columns is not None:
+        unknown = set(columns) - set(spec['columns'])
+        if unknown:
+            raise KeyError(f"Unknown columns for {table}: {sorted(unknown)}")
+        columns = list(columns)
+    else:
+        columns = [col for col in spec['columns'] if col not in spec['lazy']]
+    return pd.read_parquet(store_path(table), columns=columns)
+
+
+def memory_report(tables=None):
+    """Per-table MB as pandas reads the raw CSV by default, with the declared dtypes, and as stored"""
+    rows = []
+    for table in tables or TABLES:
+        spec = TABLES[table]
+        raw = pd.read_csv(spec['source'], encoding=spec['encoding'])
+        typed = parse_csv(table)
+        compact = read_table(table)
+        megabytes = lambda df: df.memory_usage(index=True, deep=True).sum() / 2**20
+        rows.append({
+            'table': table,
+            'rows': len(compact),
+            'csv_mb': megabytes(raw),
+            'typed_mb': megabytes(typed),
+            'compact_mb': megabytes(compact),
+            'columns_dropped': raw.shape[1] - compact.shape[1],
+        })
+    report = pd.DataFrame(rows)
+    report['reduction'] = report['csv_mb'] / report['compact_mb']
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert the raw CSVs into typed Parquet files")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the source CSV is unchanged")
+    parser.add_argument('--memory', action='store_true', help="report each table's in-memory size before and after")
+    args = parser.parse_args()
+    if args.memory:
+        print(memory_report().round(2).to_string(index=False))
+    else:
+        for table, rebuilt in ingest_all(force=args.force).items():
+            print(f"{table}: {'rebuilt' if rebuilt else 'up to date'} -> {store_path(table)}")
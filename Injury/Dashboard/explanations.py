@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from model_registry import model_registry
+from injury_risk import INJURY_FEATURES
+from clutch_features import WINNING_SHOT_FEATURES, load_clutch_store
+
+# TreeSHAP explanations for the forest models. shap takes seconds to import, so it is only
+# imported when the first explanation is asked for. Each model gets one explainer, built
+# over a fixed background sample, and explanations are cached by the rounded input row so a
+# repeated slider setting or roster is answered without running SHAP again.
+
+BACKGROUND_ROWS = 100
+ROUND_DECIMALS = 3
+MAX_CACHED_ROWS = 4096
+
+def injury_background():
+    from injury_features import TRAIN_PATH
+    return pd.read_csv(TRAIN_PATH, usecols=INJURY_FEATURES)[INJURY_FEATURES]
+
+def winning_shot_background():
+    # Scaled like the model's training data, the space every explained row is in
+    return load_clutch_store().model_features()
+
+# Model inputs and the rows explanations are measured against, by model registry name
+MODEL_FEATURES = {
+    'rf': INJURY_FEATURES,
+    'gb': INJURY_FEATURES,
+    'winning_shot': WINNING_SHOT_FEATURES,
+}
+BACKGROUNDS = {
+    'rf': injury_background,
+    'gb': injury_background,
+    'winning_shot': winning_shot_background,
+}
+
+def _split_pipeline(model):
+    # Scale inputs with the pipeline's transformers and explain the final estimator in that
+    # space; per-feature scaling keeps one attribution per original feature
+    steps = getattr(model, 'steps', None)
+    if steps is None:
+        return [], model
+    transformers = [step for _, step in steps[:-1] if not hasattr(step, 'fit_resample') and hasattr(step, 'transform')]
+    return transformers, steps[-1][1]
+
+def _transform(transformers, X):
+    for step in transformers:
+        X = step.transform(X)
+    return np.asarray(X, dtype=float)
+
+def _positive_class(shap_values, entry):
+    # Forests give one output per class, (rows, features, classes); binary boosting gives a
+    # single (rows, features) output that already is the positive class
+    if shap_values.ndim == 2:
+        return shap_values
+    return shap_values[..., entry['classes'].index(1)]
+
+class ExplanationService:
+    """Per-model TreeSHAP explainers and an LRU cache of explained rows"""
+
+    def __init__(self, max_rows=MAX_CACHED_ROWS):
+        self.max_rows = max_rows
+        self._explainers = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.explained = 0
+        self.explain_seconds = 0.0
+        self.build_seconds = 0.0
+
+    def _explainer(self, name):
+        model = model_registry.get(name)
+        entry = self._explainers.get(name)
+        if entry is not None and entry['model'] is model:
+            return entry
+
+        import shap
+        start = time.perf_counter()
+        transformers, estimator = _split_pipeline(model)
+        if not hasattr(estimator, 'estimators_') and not hasattr(estimator, 'tree_'):
+            raise TypeError(f"{type(estimator).__name__} is not a tree model, so it has no TreeSHAP explanation")
+        features = MODEL_FEATURES[name]
+        background = BACKGROUNDS[name]()[features]
+        background = background.sample(min(BACKGROUND_ROWS, len(background)), random_state=0)
+        explainer = shap.TreeExplainer(estimator, data=_transform(transformers, background),
+                                       feature_perturbation='interventional', model_output='probability')
+        entry = {'model': model, 'explainer': explainer, 'transformers': transformers, 'features': features,
+                 'classes': list(estimator.classes_), 'background_bytes': int(background.memory_usage(index=False).sum())}
+        self.build_seconds += time.perf_counter() - start
+        # A reloaded model invalidates the rows explained with the old one
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+        self._explainers[name] = entry
+        return entry
+
+    def explain(self, name, X):
+        """Positive-class SHAP values, one row per input row and one column per feature"""
+        entry = self._explainer(name)
+        X = pd.DataFrame(X)[entry['features']].round(ROUND_DECIMALS)
+        keys = [(name, tuple(row)) for row in X.itertuples(index=False)]
+
+        values = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    values[key] = self._entries[key]
+            self.hits += sum(key in values for key in keys)
+
+        # Everything not cached is explained in one batch
+        missing = list(dict.fromkeys(key for key in keys if key not in values))
+        if missing:
+            start = time.perf_counter()
+            rows = pd.DataFrame([key[1] for key in missing], columns=entry['features'])
+            shap_values = np.asarray(entry['explainer'].shap_values(_transform(entry['transformers'], rows)))
+            positive = _positive_class(shap_values, entry)
+            if positive.shape != rows.shape:
+                raise ValueError(f"SHAP values of shape {shap_values.shape} don't match {rows.shape} explained rows")
+            with self._lock:
+                self.misses += len(missing)
+                self.explained += len(missing)
+                self.explain_seconds += time.perf_counter() - start
+                for key, row in zip(missing, positive):
+                    values[key] = row
+                    self._entries[key] = row
+                while len(self._entries) > self.max_rows:
+                    self._entries.popitem(last=False)
+        return pd.DataFrame([values[key] for key in keys], columns=entry['features'], index=X.index)
+
+    def base_value(self, name):
+        """Mean positive-class probability over the background rows"""
+        entry = self._explainer(name)
+        expected = np.atleast_1d(entry['explainer'].expected_value)
+        # Binary boosting explains a single output, which is already the positive class
+        return float(expected[0] if len(expected) == 1 else expected[entry['classes'].index(1)])
+
+    def stats(self):
+        with self._lock:
+            cached_bytes = sum(row.nbytes for row in self._entries.values())
+            return {
+                'cached_rows': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ms_per_row': self.explain_seconds * 1000 / self.explained if self.explained else 0.0,
+                'build_seconds': self.build_seconds,
+                'memory_bytes': cached_bytes + sum(entry['background_bytes'] for entry in self._explainers.values()),
+            }
+
+explanation_service = ExplanationService()
+
+def top_factors(contributions, inputs, n=3):
+    """The `n` largest contributions of one explained row (both Series by feature), largest first"""
+    order = contributions.abs().sort_values(ascending=False, kind='stable').index[:n]
+    return pd.DataFrame({
+        'Feature': order,
+        'Value': inputs[order].to_numpy(),
+        'Contribution': contributions[order].to_numpy(),
+    })
@@ -0,0 +1,78 @@
+import streamlit as st
+import threading
+from collections import OrderedDict
+from plotting import render
+from vega_charts import CHART_BACKEND, show_vega_chart
+from metrics import dashboard_metrics, span
+
+# Rendered charts are cached as image bytes, keyed by tab, chart, filter selection and data
+# version, so reruns with an unchanged selection skip matplotlib entirely.
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+class FigureCache:
+    """Thread-safe LRU cache of rendered figures, bounded by total bytes"""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, draw, fmt='png', style=None, **savefig_kwargs):
+        key = key + (fmt,)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                hit = self._entries[key]
+            else:
+                hit = None
+                self.misses += 1
+        dashboard_metrics.inc('dashboard_chart_requests_total', tab=key[0], chart=key[1], result='hit' if hit else 'miss')
+        if hit is not None:
+            return hit
+
+        # Render outside the lock; two sessions racing on the same key just render twice
+        image = render(draw, fmt, style, **savefig_kwargs)
+        with self._lock:
+            if key not in self._entries and len(image) <= self.max_bytes:
+                self._entries[key] = image
+                self.bytes += len(image)
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= len(evicted)
+                    self.evictions += 1
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+figure_cache = FigureCache()
+
+def selection_key(*selections):
+    # Multiselect values as hashable tuples, keeping the user's order
+    return tuple(tuple(selection) for selection in selections)
+
+def show_figure(tab, chart_id, selection, data_version, draw, vega=None, style=None, **savefig_kwargs):
+    """Display the chart `draw(fig)` draws, reusing the cached image for the same selection and data"""
+    with span('chart', chart=chart_id) as chart:
+        if vega is not None and CHART_BACKEND == 'vega':
+            # Browser-rendered charts are cheap to rebuild and aren't cached
+            dashboard_metrics.inc('dashboard_chart_requests_total', tab=tab, chart=chart_id, result='vega')
+            show_vega_chart(vega)
+            return
+        if data_version is None:
+            # Unversioned data (e.g. ad-hoc frames) can't be cached safely
+            dashboard_metrics.inc('dashboard_chart_requests_total', tab=tab, chart=chart_id, result='uncached')
+            image = render(draw, style=style, **savefig_kwargs)
+        else:
+            image = figure_cache.get_or_render((tab, chart_id, selection, data_version), draw, style=style, **savefig_kwargs)
+        chart.bytes = len(image)
+        st.image(image, use_container_width=True)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Filter options and selections without scanning the table on every rerun. For each filter
+# column the index keeps the sorted list of values offered in the multiselect and, per value,
+# the ascending row positions holding it. A selection is the union of its values' positions,
+# and selections on several columns are intersected, so resolving a filter costs the size of
+# the selected rows rather than the size of the table.
+
+# Columns each table is filtered by in the tabs
+FILTER_COLUMNS = {
+    'injury_history': ['Name', 'Severity'],
+    'muscle_imbalance': ['Player Name'],
+    'sessions': ['name'],
+    'performance': ['shooter'],
+}
+
+class FilterIndex:
+    """Sorted options and per-value row positions for the filter columns of one frame"""
+
+    def __init__(self, df, columns):
+        self.rows = len(df)
+        self._options = {}
+        self._positions = {}
+        for col in columns:
+            # Missing values get code -1 and are never offered or selected
+            codes, uniques = pd.factorize(df[col])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            positions = {value: order[start:end] for value, start, end in zip(uniques, bounds[:-1], bounds[1:])}
+            # Same order as sorted(df[col].unique()), which the multiselects have always shown
+            self._options[col] = sorted(positions)
+            self._positions[col] = positions
+
+    def options(self, col):
+        return self._options[col]
+
+    def positions(self, col, values):
+        """Ascending row positions whose `col` is any of `values`"""
+        index = self._positions[col]
+        arrays = [index[value] for value in dict.fromkeys(values) if value in index]
+        if not arrays:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(arrays)) if len(arrays) > 1 else arrays[0]
+
+    def select(self, selections):
+        """Ascending row positions matching every `{column: values}` selection"""
+        positions = None
+        for col, values in selections.items():
+            matched = self.positions(col, values)
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return np.arange(self.rows) if positions is None else positions
+
+    def take(self, df, selections):
+        """The rows of `df` (the frame the index was built on) matching `selections`, in table order"""
+        return df.iloc[self.select(selections)]
+
+def build_filter_index(table, df):
+    return FilterIndex(df, [col for col in FILTER_COLUMNS[table] if col in df.columns])
@@ -1,12 +1,12 @@
 import streamlit as st
 
-def injury_filters(injury_data, filter_col):
+def injury_filters(injury_data, filter_col, index=None):
     with filter_col:
         st.header("Injury History Filters")
         
         # Player filter
         st.subheader("Select Players")
-        all_players = sorted(injury_data['Name'].unique())
+        all_players = index.options('Name') if index is not None else sorted(injury_data['Name'].unique())
         selected_players = st.multiselect(
             "",
             options=all_players,
@@ -16,7 +16,7 @@ def injury_filters(injury_data, filter_col):
         
         # Severity filter
         st.subheader("Select Severity Levels")
-        severity_options = sorted(injury_data['Severity'].unique())
+        severity_options = index.options('Severity') if index is not None else sorted(injury_data['Severity'].unique())
         selected_severity = st.multiselect(
             "",
             options=severity_options,
@@ -26,13 +26,13 @@ def injury_filters(injury_data, filter_col):
         
     return selected_players, selected_severity
 
-def muscle_filters(muscle_data, filter_col):
+def muscle_filters(muscle_data, filter_col, index=None):
     with filter_col:
         st.header("Muscle Imbalance Filters")
         
         # Player filter
         st.subheader("Select Players")
-        all_players = sorted(muscle_data['Player Name'].unique())
+        all_players = index.options('Player Name') if index is not None else sorted(muscle_data['Player Name'].unique())
         selected_players = st.multiselect(
             "",
             options=all_players,
@@ -53,13 +53,13 @@ def muscle_filters(muscle_data, filter_col):
         
     return selected_players, selected_metrics
 
-def session_filters(session_data, filter_col):
+def session_filters(session_data, filter_col, index=None):
     with filter_col:
         st.header("Session Filters")
         
         # Player filter
         st.subheader("Select Players")
-        all_players = sorted(session_data['name'].unique())
+        all_players = index.options('name') if index is not None else sorted(session_data['name'].unique())
         selected_players = st.multiselect(
             "",
             options=all_players,
@@ -69,13 +69,14 @@ def session_filters(session_data, filter_col):
         
     return selected_players, session_data
 
-def performance_filters(performance_data, filter_col):
+def performance_filters(performance_data, filter_col, all_shooters=None):
     with filter_col:
         st.header("Performance Filters")
         
         # Shooter filter
         st.subheader("Select Shooters")
-        all_shooters = sorted(performance_data['shooter'].dropna().unique())
+        if all_shooters is None:
+            all_shooters = sorted(performance_data['shooter'].dropna().unique())
         selected_shooters = st.multiselect(
             "",
             options=all_shooters,
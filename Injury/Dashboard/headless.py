@@ -0,0 +1,140 @@
+import sys
+from contextlib import contextmanager
+import streamlit
+
+# A stand-in for the streamlit module, so the tab render functions can run outside a Streamlit
+# server (benchmarks, batch jobs). Widgets return their defaults, or the value preset for their
+# key, layout calls return containers usable as context managers, and every call is recorded
+# with the named container it was made in; st.error calls are kept in `errors` because the
+# tabs report failures through st.error instead of raising.
+
+class SessionState(dict):
+    """Dict with attribute access, like st.session_state"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+class Container:
+    """A column, tab, expander or form: a context manager whose methods are the app's own"""
+
+    def __init__(self, app, name=None):
+        self._app = app
+        self._name = name
+
+    def __enter__(self):
+        self._app._containers.append(self._name)
+        return self
+
+    def __exit__(self, *exc):
+        self._app._containers.pop()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+class HeadlessStreamlit:
+    """Records calls instead of drawing them; widgets return `selections[key]` or the value they would start with"""
+
+    def __init__(self, selections=None):
+        self.selections = dict(selections or {})
+        self.calls = []
+        self.errors = []
+        self.session_state = SessionState()
+        self._containers = []
+
+    def _record(self, name, args, kwargs):
+        where = next((container for container in reversed(self._containers) if container is not None), None)
+        self.calls.append((name, args, kwargs, where))
+
+    def _widget(self, kind, label, kwargs, default):
+        self._record(kind, (label,), kwargs)
+        key = kwargs.get('key')
+        return self.selections[key] if key in self.selections else default
+
+    # Widgets
+    def multiselect(self, label, options=(), default=None, **kwargs):
+        return list(self._widget('multiselect', label, kwargs, default if default is not None else []))
+
+    def selectbox(self, label, options=(), index=0, **kwargs):
+        options = list(options)
+        return self._widget('selectbox', label, kwargs, options[index] if options and index is not None else None)
+
+    def radio(self, label, options=(), index=0, **kwargs):
+        return self.selectbox(label, options, index, **kwargs)
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self._widget('slider', label, kwargs, value if value is not None else min_value)
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self._widget('number_input', label, kwargs,
+                            value if value is not None else (min_value if min_value is not None else 0.0))
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self._widget('checkbox', label, kwargs, value)
+
+    def text_input(self, label, value='', **kwargs):
+        return self._widget('text_input', label, kwargs, value)
+
+    def button(self, label, **kwargs):
+        return self._widget('button', label, kwargs, False)
+
+    def form_submit_button(self, label='Submit', **kwargs):
+        return self.button(label, **kwargs)
+
+    # Layout
+    def columns(self, spec, **kwargs):
+        self._record('columns', (spec,), kwargs)
+        return [Container(self) for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def tabs(self, labels):
+        self._record('tabs', (labels,), {})
+        return [Container(self) for _ in labels]
+
+    def container(self, *args, **kwargs):
+        self._record('container', args, kwargs)
+        return Container(self)
+
+    expander = form = empty = spinner = container
+
+    @property
+    def sidebar(self):
+        return Container(self)
+
+    # Messages
+    def error(self, body, *args, **kwargs):
+        self._record('error', (body,), kwargs)
+        self.errors.append(str(body))
+
+    def rerun(self):
+        pass
+
+    def __getattr__(self, name):
+        # Every other element (metric, image, dataframe, markdown...) is recorded and draws nothing
+        if name.startswith('_'):
+            raise AttributeError(name)
+        def element(*args, **kwargs):
+            self._record(name, args, kwargs)
+        return element
+
+    def count(self, name):
+        """How many times element `name` was called"""
+        return sum(call[0] == name for call in self.calls)
+
+@contextmanager
+def headless_streamlit(app=None):
+    """Swap `st` for `app` (a new HeadlessStreamlit by default) in every imported module using streamlit"""
+    app = app if app is not None else HeadlessStreamlit()
+    patched = [module for module in list(sys.modules.values()) if getattr(module, 'st', None) is streamlit]
+    for module in patched:
+        module.st = app
+    try:
+        yield app
+    finally:
+        for module in patched:
+            module.st = streamlit
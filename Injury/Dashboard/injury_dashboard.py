@@ -1,14 +1,57 @@
 import streamlit as st
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from filters import injury_filters
+from utils import drop_unused_categories
+from aggregates import build_injury_cubes, injury_kpis, injuries_over_time, severity_counts
+from figure_cache import show_figure, selection_key
+from metrics import span
+from vega_charts import injury_frequency_chart
 
-def render_injury_tab(injury_data, filter_col):
+# Columns of the injury_history table this tab reads
+INJURY_COLUMNS = ['Name', 'Injury Date', 'Injury Type', 'Body Part', 'Severity', 'Recovery Time (days)']
+
+def draw_injury_types(fig, filtered_data):
+    fig.set_size_inches(4, 3)
+    ax = fig.subplots()
+    sns.countplot(data=filtered_data, x='Injury Type', palette='Set2', ax=ax)
+    ax.tick_params(axis='x', rotation=45)
+    ax.set_xlabel('Injury Type')
+    ax.set_ylabel('Count')
+    fig.tight_layout()
+
+def draw_recovery_by_body_part(fig, filtered_data):
+    fig.set_size_inches(4, 3)
+    ax = fig.subplots()
+    sns.boxplot(data=filtered_data, x='Body Part', y='Recovery Time (days)', palette='Set2', ax=ax)
+    ax.tick_params(axis='x', rotation=45)
+    ax.set_xlabel('Body Part')
+    ax.set_ylabel('Recovery Time (days)')
+    fig.tight_layout()
+
+def draw_injury_frequency(fig, injury_freq):
+    fig.set_size_inches(4, 3)
+    ax = fig.subplots()
+    ax.plot(injury_freq.index, injury_freq.values, marker='o')
+    ax.tick_params(axis='x', rotation=45)
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Number of Injuries')
+    fig.tight_layout()
+
+def draw_severity_distribution(fig, severity_share):
+    fig.set_size_inches(4, 3)
+    ax = fig.subplots()
+    ax.pie(severity_share.values, 
+           labels=severity_share.index, 
+           autopct='%1.1f%%',
+           colors=sns.color_palette('Set2'))
+    ax.axis('equal')
+
+def render_injury_tab(injury_data, filter_col, cubes=None, data_version=None, index=None):
     try:
-        # Get filter selections
-        selected_players, selected_severity = injury_filters(injury_data, filter_col)
+        # Filter options and selections come from the index built at load time when one is given
+        selected_players, selected_severity = injury_filters(injury_data, filter_col, index)
         
         # Ensure we have valid data
         if injury_data is None or len(injury_data) == 0:
@@ -16,10 +59,22 @@ def render_injury_tab(injury_data, filter_col):
             return
             
         # Filter data based on selections
-        filtered_data = injury_data[
-            (injury_data['Name'].isin(selected_players)) &
-            (injury_data['Severity'].isin(selected_severity))
-        ]
+        with span('filter') as filtered:
+            if index is not None:
+                filtered_data = index.take(injury_data, {'Name': selected_players, 'Severity': selected_severity})
+            else:
+                filtered_data = injury_data[
+                    (injury_data['Name'].isin(selected_players)) &
+                    (injury_data['Severity'].isin(selected_severity))
+                ]
+            filtered_data = filtered_data.pipe(drop_unused_categories)
+            filtered.count(filtered_data)
+
+        # KPIs and the time/severity charts come from pre-aggregated cubes, not the raw rows
+        with span('aggregate'):
+            if cubes is None:
+                cubes = build_injury_cubes(injury_data)
+            kpis = injury_kpis(cubes, selected_players, selected_severity)
         
         # Display KPIs in a row
         kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
@@ -27,20 +82,19 @@ def render_injury_tab(injury_data, filter_col):
         with kpi_col1:
             st.metric(
                 label="Total Injuries",
-                value=len(filtered_data)
+                value=kpis['total_injuries']
             )
             
         with kpi_col2:
-            avg_recovery = filtered_data['Recovery Time (days)'].mean()
+            avg_recovery = kpis['avg_recovery']
             st.metric(
                 label="Average Recovery Time",
                 value=f"{avg_recovery:.1f} days" if not pd.isna(avg_recovery) else "N/A"
             )
             
         with kpi_col3:
-            if len(filtered_data) > 0:
-                most_common_injury = filtered_data['Injury Type'].mode().iloc[0]
-                injury_count = filtered_data['Injury Type'].value_counts().iloc[0]
+            most_common_injury, injury_count = kpis['most_common_injury']
+            if most_common_injury is not None:
                 st.metric(
                     label="Most Common Injury",
                     value=most_common_injury,
@@ -53,9 +107,8 @@ def render_injury_tab(injury_data, filter_col):
                 )
                 
         with kpi_col4:
-            if len(filtered_data) > 0:
-                most_affected = filtered_data['Body Part'].mode().iloc[0]
-                part_count = filtered_data['Body Part'].value_counts().iloc[0]
+            most_affected, part_count = kpis['most_affected_part']
+            if most_affected is not None:
                 st.metric(
                     label="Most Affected Body Part",
                     value=most_affected,
@@ -71,61 +124,42 @@ def render_injury_tab(injury_data, filter_col):
         row1_col1, row1_col2 = st.columns(2)
         row2_col1, row2_col2 = st.columns(2)
         
+        selection = selection_key(selected_players, selected_severity)
+
         # Injury Type Distribution
         with row1_col1:
             st.subheader("Injury Type Distribution")
-            fig1 = plt.figure(figsize=(4, 3))
-            sns.countplot(data=filtered_data, x='Injury Type', palette='Set2')
-            plt.xticks(rotation=45)
-            plt.xlabel('Injury Type')
-            plt.ylabel('Count')
-            plt.tight_layout()
-            st.pyplot(fig1)
-            plt.close()
+            show_figure('injury', 'type_distribution', selection, data_version,
+                        lambda fig: draw_injury_types(fig, filtered_data))
         
         # Recovery Time by Body Part
         with row1_col2:
             st.subheader("Recovery Time by Body Part")
-            fig2 = plt.figure(figsize=(4, 3))
-            sns.boxplot(data=filtered_data, x='Body Part', y='Recovery Time (days)', palette='Set2')
-            plt.xticks(rotation=45)
-            plt.xlabel('Body Part')
-            plt.ylabel('Recovery Time (days)')
-            plt.tight_layout()
-            st.pyplot(fig2)
-            plt.close()
+            show_figure('injury', 'recovery_by_body_part', selection, data_version,
+                        lambda fig: draw_recovery_by_body_part(fig, filtered_data))
         
         # Injury Frequency Over Time
         with row2_col1:
             st.subheader("Injury Frequency Over Time")
-            fig3 = plt.figure(figsize=(4, 3))
-            injury_freq = filtered_data.set_index('Injury Date').resample('M')['Injury Type'].count()
-            plt.plot(injury_freq.index, injury_freq.values, marker='o')
-            plt.xticks(rotation=45)
-            plt.xlabel('Date')
-            plt.ylabel('Number of Injuries')
-            plt.tight_layout()
-            st.pyplot(fig3)
-            plt.close()
+            with span('aggregate', chart='frequency_over_time'):
+                injury_freq = injuries_over_time(cubes, selected_players, selected_severity)
+            show_figure('injury', 'frequency_over_time', selection, data_version,
+                        lambda fig: draw_injury_frequency(fig, injury_freq),
+                        vega=lambda: injury_frequency_chart(injury_freq))
             
         # Severity Distribution
         with row2_col2:
             st.subheader("Severity Distribution")
-            fig4 = plt.figure(figsize=(4, 3))
-            severity_counts = filtered_data['Severity'].value_counts()
-            plt.pie(severity_counts.values, 
-                   labels=severity_counts.index, 
-                   autopct='%1.1f%%',
-                   colors=sns.color_palette('Set2'))
-            plt.axis('equal')
-            st.pyplot(fig4)
-            plt.close()
+            with span('aggregate', chart='severity_distribution'):
+                severity_share = severity_counts(cubes, selected_players, selected_severity)
+            show_figure('injury', 'severity_distribution', selection, data_version,
+                        lambda fig: draw_severity_distribution(fig, severity_share))
         
         # Display detailed injury table
         st.subheader("Injury Details")
-        st.dataframe(
-            filtered_data[['Name', 'Injury Date', 'Injury Type', 'Body Part', 'Severity', 'Recovery Time (days)']],
-            use_container_width=True
-        )
+        with span('table') as table:
+            details = filtered_data[['Name', 'Injury Date', 'Injury Type', 'Body Part', 'Severity', 'Recovery Time (days)']]
+            table.count(details)
+            st.dataframe(details, use_container_width=True)
     except Exception as e:
         st.error(f"An error occurred in render_injury_tab: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+from data_store import read_table
+
+# Vectorized version of the feature engineering in "Injury Prediction/DataPreprocessing.ipynb".
+# Session/injury windows are resolved with searchsorted over (player, date) keys instead of
+# iterrows, so the cost is O((sessions + injuries) log injuries) rather than O(sessions x injuries).
+
+CLEANED_DATA_PATH = 'Injury/Data/Cleaned Data/Cleaned_data.csv'
+TRAIN_PATH = 'Injury/Data/Cleaned Data/train.csv'
+TEST_PATH = 'Injury/Data/Cleaned Data/test.csv'
+TEST_PLAYER_ID = 115
+
+SEVERITY_MAPPING = {'Grade 1': 1, 'Grade 2': 2, 'Grade 3': 3}
+RISK_WINDOW_DAYS = 7
+PAST_INJURY_WINDOW_DAYS = 90
+MUSCLE_FEATURES = ['Hamstring To Quad Ratio', 'Quad Imbalance Percent', 'HamstringImbalance Percent',
+                   'Calf Imbalance Percent', 'Groin Imbalance Percent']
+
+# Player code and day number packed into one sortable int64 key
+_DAY_OFFSET = 1 << 31
+
+
+def load_sources():
+    """Read the three raw tables from the data store"""
+    injury_history = read_table('injury_history', ['Player.ID', 'Injury Date', 'Severity', 'Recovery Time (days)'])
+    muscle_imbalance = read_table('muscle_imbalance')
+    sessions = read_table('sessions')
+    return injury_history, muscle_imbalance, sessions
+
+
+def _day_numbers(dates):
+    return dates.values.astype('datetime64[D]').astype(np.int64)
+
+
+def _keys(codes, days):
+    return codes.astype(np.int64) * (1 << 32) + (days + _DAY_OFFSET)
+
+
+def prepare_injuries(injury_history):
+    """Injuries sorted by (player, date) with their Severity_Score and original order"""
+    injuries = injury_history.rename(columns={'Player.ID': 'playerid'})
+    injuries = injuries[injuries['Injury Date'].notna()].copy()
+    injuries['Severity_Score'] = injuries['Severity'].astype(object).map(SEVERITY_MAPPING)
+    injuries['order'] = np.arange(len(injuries))
+    return injuries.sort_values(['playerid', 'Injury Date'], kind='stable').reset_index(drop=True)
+
+
+def injury_window_features(sessions, injuries):
+    """Risk_Label, Severity_Score, Days_Since_Last_Injury and Past_Injuries_3m for each session"""
+    if injuries.empty:
+        return pd.DataFrame({'Risk_Label': 0, 'Severity_Score': np.nan, 'Days_Since_Last_Injury': -1,
+                             'Past_Injuries_3m': 0}, index=sessions.index)
+
+    player_ids = pd.Index(injuries['playerid'].unique())
+    injury_codes = player_ids.get_indexer(injuries['playerid'])
+    injury_days = _day_numbers(injuries['Injury Date'])
+    injury_keys = _keys(injury_codes, injury_days)
+
+    # Sessions of players without injuries get a code no injury key can match
+    session_codes = player_ids.get_indexer(sessions['playerid'])
+    session_codes = np.where(session_codes < 0, len(player_ids), session_codes)
+    session_days = _day_numbers(sessions['session_date'])
+    session_keys = _keys(session_codes, session_days)
+
+    # Risk window: injuries on the session day or up to 7 days after it
+    lo = np.searchsorted(injury_keys, session_keys, side='left')
+    hi = np.searchsorted(injury_keys, session_keys + RISK_WINDOW_DAYS, side='right')
+    in_window = hi - lo
+    risk_label = (in_window > 0).astype(int)
+
+    # When several injuries fall in the window, the one listed last in injury_history wins
+    severity = np.full(len(sessions), np.nan)
+    best_order = np.full(len(sessions), -1)
+    orders = injuries['order'].to_numpy()
+    scores = injuries['Severity_Score'].to_numpy(dtype=float)
+    for offset in range(int(in_window.max(initial=0))):
+        idx = np.minimum(lo + offset, len(orders) - 1)
+        candidate = np.where(lo + offset < hi, orders[idx], -1)
+        better = candidate > best_order
+        best_order = np.where(better, candidate, best_order)
+        severity = np.where(better, scores[idx], severity)
+
+    # Most recent injury strictly before the session (a backward as-of join)
+    previous = np.maximum(lo - 1, 0)
+    has_previous = (lo > 0) & (injury_codes[previous] == session_codes)
+    days_since = np.where(has_previous, session_days - injury_days[previous], -1)
+
+    # Injuries in the 90 days before the session
+    window_start = np.searchsorted(injury_keys, session_keys - PAST_INJURY_WINDOW_DAYS, side='left')
+    past_injuries = lo - window_start
+
+    return pd.DataFrame({
+        'Risk_Label': risk_label,
+        'Severity_Score': severity,
+        'Days_Since_Last_Injury': days_since.astype(int),
+        'Past_Injuries_3m': past_injuries.astype(int),
+    }, index=sessions.index)
+
+
+def merge_sessions_imbalance(sessions, muscle_imbalance):
+    """Attach the same-month muscle imbalance record to every session"""
+    sessions = sessions.copy()
+    sessions['Year'] = sessions['session_date'].dt.year
+    sessions['Month'] = sessions['session_date'].dt.month
+    muscle = muscle_imbalance.rename(columns={'Player.ID': 'playerid'}).drop(columns=['Month'], errors='ignore')
+    muscle['Year'] = muscle['Date Recorded'].dt.year
+    muscle['Month'] = muscle['Date Recorded'].dt.month
+    return pd.merge(sessions, muscle, on=['playerid', 'Year', 'Month'], how='left')
+
+
+def _fill_muscle_features(df, player_means, overall_means):
+    for feature in MUSCLE_FEATURES:
+        df[feature] = df[feature].fillna(df['playerid'].map(player_means[feature])).fillna(overall_means[feature])
+
+
+def build_features(injury_history, muscle_imbalance, sessions):
+    """Build the full Cleaned_data.csv frame from the raw tables"""
+    injuries = prepare_injuries(injury_history)
+    merged = merge_sessions_imbalance(sessions, muscle_imbalance)
+    merged = merged.join(injury_window_features(merged, injuries))
+
+    avg_recovery_time = injuries.groupby('playerid')['Recovery Time (days)'].mean()
+    merged['Average_Recovery_Time'] = merged['playerid'].map(avg_recovery_time)
+
+    by_player = merged.groupby('playerid', sort=False)
+    merged['Exertion_Deviation_7d'] = by_player['exertions'].rolling(window=3, min_periods=1).std().reset_index(level=0, drop=True)
+    merged['Baseline_Exertion'] = by_player['exertions'].transform('mean')
+    merged['Baseline_Exertion_Deviation'] = merged['exertions'] - merged['Baseline_Exertion']
+    high_intensity_threshold = merged['exertions'].quantile(0.75)
+    merged['High_Intensity_Session'] = (merged['exertions'] > high_intensity_threshold).astype(int)
+    merged['Heart_Rate_Recovery'] = merged['heartratemaxbpm'] - merged['heartrateminbpm']
+    merged['TRIMP_Change'] = by_player['trimp'].diff()
+
+    # Missing values, as in the notebook; muscle features are filled before the PCA so it never sees NaN
+    merged['Exertion_Deviation_7d'] = merged['Exertion_Deviation_7d'].fillna(0)
+    merged['Baseline_Exertion_Deviation'] = merged['Baseline_Exertion_Deviation'].fillna(0)
+    merged['Heart_Rate_Recovery'] = merged['Heart_Rate_Recovery'].fillna(0)
+    merged['TRIMP_Change'] = merged['TRIMP_Change'].fillna(0)
+    merged['Average_Recovery_Time'] = merged['Average_Recovery_Time'].fillna(merged['Average_Recovery_Time'].mean())
+    _fill_muscle_features(merged, merged.groupby('playerid')[MUSCLE_FEATURES].mean(), merged[MUSCLE_FEATURES].mean())
+    merged['Severity_Score'] = merged['Severity_Score'].fillna(0).astype(int)
+
+    merged['Muscle_Imbalance'] = PCA(n_components=1).fit_transform(merged[MUSCLE_FEATURES])[:, 0]
+    return merged
+
+
+def append_features(cleaned, new_sessions, injury_history, muscle_imbalance):
+    """Compute features only for newly appended sessions and append them to `cleaned`
+
+    New sessions must be later than the existing ones of the same player. Rolling and
+    differenced features continue from each player's latest existing sessions. Global
+    statistics are taken from the existing rows plus the new ones; the PCA projection is
+    the one fitted on the existing rows, so Muscle_Imbalance stays on the same scale.
+    Rows already in `cleaned` are not recomputed.
+    """
+    injuries = prepare_injuries(injury_history)
+    new = merge_sessions_imbalance(new_sessions, muscle_imbalance)
+    new.index = pd.RangeIndex(len(cleaned), len(cleaned) + len(new))
+    new = new.join(injury_window_features(new, injuries))
+
+    avg_recovery_time = injuries.groupby('playerid')['Recovery Time (days)'].mean()
+    new['Average_Recovery_Time'] = new['playerid'].map(avg_recovery_time)
+
+    # Continue rolling/diff features from the last two existing sessions of each player
+    history = cleaned.groupby('playerid', sort=False).tail(2)[['playerid', 'exertions', 'trimp']]
+    combined = pd.concat([history, new[['playerid', 'exertions', 'trimp']]])
+    by_player = combined.groupby('playerid', sort=False)
+    rolling_std = by_player['exertions'].rolling(window=3, min_periods=1).std().reset_index(level=0, drop=True)
+    new['Exertion_Deviation_7d'] = rolling_std.loc[new.index]
+    new['TRIMP_Change'] = by_player['trimp'].diff().loc[new.index]
+
+    # Per-player baselines from running sums over existing and new sessions
+    totals = pd.concat([
+        cleaned.groupby('playerid')['exertions'].agg(['sum', 'count']),
+        new.groupby('playerid')['exertions'].agg(['sum', 'count']),
+    ]).groupby(level=0).sum()
+    new['Baseline_Exertion'] = new['playerid'].map(totals['sum'] / totals['count'])
+    new['Baseline_Exertion_Deviation'] = new['exertions'] - new['Baseline_Exertion']
+    high_intensity_threshold = pd.concat([cleaned['exertions'], new['exertions']]).quantile(0.75)
+    new['High_Intensity_Session'] = (new['exertions'] > high_intensity_threshold).astype(int)
+    new['Heart_Rate_Recovery'] = new['heartratemaxbpm'] - new['heartrateminbpm']
+
+    new['Exertion_Deviation_7d'] = new['Exertion_Deviation_7d'].fillna(0)
+    new['Baseline_Exertion_Deviation'] = new['Baseline_Exertion_Deviation'].fillna(0)
+    new['Heart_Rate_Recovery'] = new['Heart_Rate_Recovery'].fillna(0)
+    new['TRIMP_Change'] = new['TRIMP_Change'].fillna(0)
+    all_players = pd.concat([cleaned['playerid'], new['playerid']])
+    new['Average_Recovery_Time'] = new['Average_Recovery_Time'].fillna(all_players.map(avg_recovery_time).mean())
+    muscle_rows = pd.concat([cleaned[['playerid'] + MUSCLE_FEATURES], new[['playerid'] + MUSCLE_FEATURES]])
+    _fill_muscle_features(new, muscle_rows.groupby('playerid')[MUSCLE_FEATURES].mean(), muscle_rows[MUSCLE_FEATURES].mean())
+    new['Severity_Score'] = new['Severity_Score'].fillna(0).astype(int)
+
+    pca = PCA(n_components=1).fit(cleaned[MUSCLE_FEATURES])
+    new['Muscle_Imbalance'] = pca.transform(new[MUSCLE_FEATURES])[:, 0]
+    return pd.concat([cleaned, new[cleaned.columns]])
+
+
+def save_cleaned_data(cleaned):
+    """Write Cleaned_data.csv and the player-based train/test split, as the notebook does"""
+    cleaned.to_csv(CLEANED_DATA_PATH)
+    cleaned[cleaned['playerid'] != TEST_PLAYER_ID].to_csv(TRAIN_PATH, index=False)
+    cleaned[cleaned['playerid'] == TEST_PLAYER_ID].to_csv(TEST_PATH, index=False)
+
+
+def read_cleaned_data():
+    return pd.read_csv(CLEANED_DATA_PATH, index_col=0, parse_dates=['session_date', 'Date Recorded'])
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the injury prediction features (Cleaned_data.csv)")
+    parser.add_argument('--append', metavar='SESSIONS_CSV',
+                        help="only compute features for these new sessions and append them to Cleaned_data.csv")
+    args = parser.parse_args()
+
+    injury_history, muscle_imbalance, sessions = load_sources()
+    if args.append:
+        new_sessions = pd.read_csv(args.append, encoding='ISO-8859-1', parse_dates=['session_date'])
+        cleaned = append_features(read_cleaned_data(), new_sessions, injury_history, muscle_imbalance)
+    else:
+        cleaned = build_features(injury_history, muscle_imbalance, sessions)
+    save_cleaned_data(cleaned)
+    print(f"Wrote {len(cleaned)} rows to {CLEANED_DATA_PATH}")
@@ -1,16 +1,35 @@
 import streamlit as st
 import pandas as pd
-import pickle
+import os
+import time
+from model_registry import model_registry, INJURY_MODELS, MODEL_PATHS
+from injury_risk import predict_risk
+from tree_inference import fast_model
+from explanations import explanation_service, top_factors
 
 def render_injury_prediction_tab():
     st.header("Injury Prediction")
 
-    # Load the trained Random Forest model
+    # Pick one of the trained models; all of them are kept loaded by the model registry, and
+    # artifacts that fail to load with the installed libraries are not offered
+    available = model_registry.available(INJURY_MODELS)
+    unavailable = [INJURY_MODELS[name] for name in INJURY_MODELS if name not in available]
+    if not available:
+        st.error(f"No injury model could be loaded: {'; '.join(model_registry.errors.values())}")
+        return
+    model_name = st.sidebar.selectbox(
+        "Prediction Model",
+        options=available,
+        format_func=INJURY_MODELS.get,
+        key="injury_model"
+    )
+    if unavailable:
+        st.sidebar.caption(f"Not available with the installed libraries: {', '.join(unavailable)}")
     try:
-        with open('Injury/Injury Prediction/rf_best_model.pkl', 'rb') as file:
-            model = pickle.load(file)
+        # Random forests are scored through their flattened form, without sklearn's per-call overhead
+        model = fast_model(model_registry.get(model_name))
     except FileNotFoundError:
-        st.error("Model file not found. Please ensure 'rf_best_model.pkl' is in the correct directory.")
+        st.error(f"Model file not found. Please ensure '{os.path.basename(MODEL_PATHS[model_name])}' is in the correct directory.")
         return
     except Exception as e:
         st.error(f"An error occurred while loading the model: {e}")
@@ -41,25 +60,12 @@ def render_injury_prediction_tab():
             'Days_Since_Last_Injury': [days_since_last_injury]
         })
 
-        # Define risk levels and recommendations mapping
-        risk_bins = [0, 20, 40, 60, 80, 100]
-        risk_labels = ['Very Low', 'Low', 'Moderate', 'High', 'Very High']
-        recommendations = {
-            'Very Low': "Continue normal training routine",
-            'Low': "Monitor and maintain current approach",
-            'Moderate': "Consider reducing training intensity",
-            'High': "Implement preventive measures immediately",
-            'Very High': "Immediate attention required - high risk of injury"
-        }
-        
         # Calculate probability and detailed risk assessment
-        probability = model.predict_proba(input_data)[0][1] * 100
-        risk_status = "High Risk" if probability >= 50 else "Low Risk"
-        confidence = abs(probability - 50) * 2
-    
-        # Classify risk level based on probability
-        risk_level = pd.cut([probability], bins=risk_bins, labels=risk_labels)[0]
-        recommendation = recommendations[risk_level]
+        assessment = predict_risk(model, input_data).iloc[0]
+        probability = assessment['Injury_Probability']
+        risk_status = assessment['Risk_Status']
+        confidence = assessment['Confidence']
+        recommendation = assessment['Recommendation']
     
         st.markdown("### Prediction Results")
         st.write(f"**Injury Probability:** {probability:.2f}%")
@@ -70,6 +76,22 @@ def render_injury_prediction_tab():
         st.markdown("### Recommendation")
         st.write(f"{recommendation}")
 
+        # Which inputs pushed this player's probability up or down
+        try:
+            start = time.perf_counter()
+            contributions = explanation_service.explain(model_name, input_data).iloc[0] * 100
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except TypeError:
+            st.info("Explanations are only available for the tree-based models.")
+        except Exception as e:
+            st.warning(f"Could not explain this prediction: {str(e)}")
+        else:
+            st.markdown("### Why This Risk Level")
+            factors = top_factors(contributions, input_data.iloc[0], n=len(contributions))
+            st.dataframe(factors.rename(columns={'Contribution': 'Contribution (pp)'}), use_container_width=True, hide_index=True)
+            st.caption(f"Percentage points added to the average injury probability of "
+                       f"{explanation_service.base_value(model_name) * 100:.2f}%, explained in {elapsed_ms:.0f} ms")
+
     # Footer
     st.markdown("---")
     st.write("**Disclaimer:** This tool provides an injury risk assessment based on inputted metrics. Consult with a medical professional for comprehensive health advice.")
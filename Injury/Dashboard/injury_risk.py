@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+# Model inputs, in the order the injury models were trained on
+INJURY_FEATURES = [
+    'Average_Recovery_Time',
+    'Severity_Score',
+    'Baseline_Exertion',
+    'Muscle_Imbalance',
+    'trimp',
+    'Days_Since_Last_Injury'
+]
+
+# Define risk levels and recommendations mapping
+RISK_BINS = [0, 20, 40, 60, 80, 100]
+RISK_LABELS = ['Very Low', 'Low', 'Moderate', 'High', 'Very High']
+RECOMMENDATIONS = {
+    'Very Low': "Continue normal training routine",
+    'Low': "Monitor and maintain current approach",
+    'Moderate': "Consider reducing training intensity",
+    'High': "Implement preventive measures immediately",
+    'Very High': "Immediate attention required - high risk of injury"
+}
+
+def assess_risk(probabilities):
+    """Risk status, confidence, level and recommendation for injury probabilities in percent"""
+    probabilities = np.asarray(probabilities, dtype=float)
+    risk_level = pd.cut(probabilities, bins=RISK_BINS, labels=RISK_LABELS, include_lowest=True)
+    return pd.DataFrame({
+        'Injury_Probability': probabilities,
+        'Risk_Status': np.where(probabilities >= 50, "High Risk", "Low Risk"),
+        'Confidence': np.abs(probabilities - 50) * 2,
+        'Risk_Level': risk_level,
+        'Recommendation': pd.Series(risk_level).map(RECOMMENDATIONS).astype(object).to_numpy(),
+    })
+
+def predict_risk(model, features):
+    """Score a frame of model features in one vectorized predict_proba call"""
+    probabilities = model.predict_proba(features[INJURY_FEATURES])[:, 1] * 100
+    return assess_risk(probabilities)
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.preprocessing import RobustScaler
+from imblearn.combine import SMOTETomek
+from imblearn.pipeline import Pipeline
+from injury_features import TRAIN_PATH, TEST_PATH
+from injury_risk import INJURY_FEATURES
+from model_registry import MODEL_PATHS
+
+# Scriptable version of the grid search in "Injury Prediction/InjuryPredictionModel.ipynb".
+# GridSearchCV refits RobustScaler + SMOTETomek for every grid point of every fold, although
+# both only depend on the fold and the sampling strategy. Here each (fold, strategy) is
+# resampled once and cached on disk, every (model, grid point, fold) fit runs in a process
+# pool, and each finished fit is appended to a JSON-lines checkpoint so an interrupted
+# search picks up where it stopped. Scores and chosen parameters match GridSearchCV's.
+
+TARGET = 'Risk_Label'
+MODEL_TYPES = ['rf', 'gb', 'lr']
+N_SPLITS = 5
+RANDOM_STATE = 42
+TRAINING_DIR = 'Injury/Data/store/training'
+CHECKPOINT_PATH = os.path.join(TRAINING_DIR, 'grid_checkpoint.jsonl')
+
+def base_classifier(model_type):
+    if model_type == 'rf':
+        # One job per fit: the process pool already uses every core
+        return RandomForestClassifier(max_depth=3, min_samples_split=20, min_samples_leaf=10, max_features='sqrt',
+                                      random_state=RANDOM_STATE, class_weight='balanced_subsample', n_jobs=1)
+    if model_type == 'gb':
+        return GradientBoostingClassifier(random_state=RANDOM_STATE)
+    if model_type == 'lr':
+        return LogisticRegression(random_state=RANDOM_STATE, max_iter=2000, solver='liblinear')
+    raise ValueError(f"Unknown model type: {model_type!r}")
+
+PARAM_GRIDS = {
+    'rf': {
+        'classifier__max_depth': [2, 3],
+        'classifier__min_samples_split': [15, 20],
+        'classifier__min_samples_leaf': [8, 10],
+        'classifier__n_estimators': [50, 100],
+        'classifier__max_features': ['sqrt', 'log2'],
+        'classifier__max_samples': [0.6, 0.7],
+        'smote_tomek__sampling_strategy': [0.1, 0.2],
+    },
+    'gb': {
+        'classifier__n_estimators': [50],
+        'classifier__learning_rate': [0.01],
+        'classifier__max_depth': [2],
+        'classifier__min_samples_leaf': [15],
+        'classifier__subsample': [0.6],
+        'smote_tomek__sampling_strategy': [0.1],
+    },
+    'lr': {
+        'classifier__C': [0.001],
+        'classifier__penalty': ['l2'],
+        'classifier__class_weight': ['balanced'],
+        'smote_tomek__sampling_strategy': [0.1],
+    },
+}
+
+def create_pipeline(model_type, params=None):
+    """The notebook's scaler -> SMOTETomek -> classifier pipeline, with `params` applied"""
+    pipeline = Pipeline([
+        ('scaler', RobustScaler()),
+        ('smote_tomek', SMOTETomek(sampling_strategy=0.1, random_state=RANDOM_STATE)),
+        ('classifier', base_classifier(model_type)),
+    ])
+    return pipeline.set_params(**(params or {}))
+
+def _split_params(params):
+    strategy = params.get('smote_tomek__sampling_strategy', 0.1)
+    classifier = {key[len('classifier__'):]: value for key, value in params.items() if key.startswith('classifier__')}
+    return strategy, classifier
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def data_fingerprint(X, y, n_splits=N_SPLITS):
+    """Hash of the training data and CV setup; checkpoints and fold caches are only reused under it"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f"{n_splits}:{RANDOM_STATE}".encode())
+    return digest.hexdigest()[:16]
+
+def resample_fold(X, y, train_index, valid_index, strategy, path):
+    """Scale and resample one fold's training rows once, saving them for every fit on this fold"""
+    if not os.path.exists(path):
+        scaler = RobustScaler().fit(X[train_index])
+        X_resampled, y_resampled = SMOTETomek(sampling_strategy=strategy, random_state=RANDOM_STATE).fit_resample(
+            scaler.transform(X[train_index]), y[train_index])
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, X_train=X_resampled, y_train=y_resampled,
+                 X_valid=scaler.transform(X[valid_index]), y_valid=y[valid_index])
+        os.replace(tmp_path, path)
+    return path
+
+def score_fit(model_type, params, fold, path):
+    """Validation ROC-AUC of one grid point on one cached fold"""
+    data = np.load(path)
+    _, classifier_params = _split_params(params)
+    classifier = clone(base_classifier(model_type)).set_params(**classifier_params)
+    classifier.fit(data['X_train'], data['y_train'])
+    score = roc_auc_score(data['y_valid'], classifier.predict_proba(data['X_valid'])[:, 1])
+    return {'model_type': model_type, 'params': params, 'fold': fold, 'score': float(score)}
+
+def read_checkpoint(path, fingerprint):
+    """Scores already computed for this data, keyed by (model type, params, fold)"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as checkpoint:
+        for line in checkpoint:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut off by an interrupted write
+                continue
+            if record.get('data') == fingerprint:
+                done[(record['model_type'], _params_key(record['params']), record['fold'])] = record['score']
+    return done
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b'\n'
+
+def grid_search(X, y, model_types=MODEL_TYPES, n_splits=N_SPLITS, workers=None,
+                checkpoint_path=CHECKPOINT_PATH, cache_dir=TRAINING_DIR):
+    """Mean CV ROC-AUC of every grid point, resuming from and appending to the checkpoint"""
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y)
+    fingerprint = data_fingerprint(X, y, n_splits)
+    fold_dir = os.path.join(cache_dir, f"folds-{fingerprint}")
+    os.makedirs(fold_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    grids = {model_type: list(ParameterGrid(PARAM_GRIDS[model_type])) for model_type in model_types}
+    done = read_checkpoint(checkpoint_path, fingerprint)
+
+    pending = [(model_type, params, fold) for model_type, grid in grids.items() for params in grid
+               for fold in range(n_splits) if (model_type, _params_key(params), fold) not in done]
+    strategies = sorted({_split_params(params)[0] for _, params, _ in pending})
+    fold_paths = {(fold, strategy): os.path.join(fold_dir, f"fold{fold}-ss{strategy}.npz")
+                  for fold in range(n_splits) for strategy in strategies}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # SMOTETomek once per (fold, strategy), then every fit that needs it
+        resampled = [pool.submit(resample_fold, X, y, *folds[fold], strategy, path)
+                     for (fold, strategy), path in fold_paths.items()]
+        for future in resampled:
+            future.result()
+        fits = [pool.submit(score_fit, model_type, params, fold, fold_paths[(fold, _split_params(params)[0])])
+                for model_type, params, fold in pending]
+        with open(checkpoint_path, 'a+', encoding='utf-8') as checkpoint:
+            # Start on a fresh line if the last run was killed mid-write
+            if checkpoint.tell() and not _ends_with_newline(checkpoint_path):
+                checkpoint.write('\n')
+            for future in as_completed(fits):
+                record = future.result()
+                checkpoint.write(json.dumps({**record, 'data': fingerprint}) + '\n')
+                checkpoint.flush()
+                done[(record['model_type'], _params_key(record['params']), record['fold'])] = record['score']
+
+    results = []
+    for model_type, grid in grids.items():
+        for params in grid:
+            scores = [done[(model_type, _params_key(params), fold)] for fold in range(n_splits)]
+            results.append({'model_type': model_type, 'params': params,
+                            'mean_score': float(np.mean(scores)), 'std_score': float(np.std(scores))})
+    return pd.DataFrame(results)
+
+def best_params(results):
+    """Best grid point per model type; ties go to the earliest point, as in GridSearchCV"""
+    best = {}
+    for model_type, group in results.groupby('model_type', sort=False):
+        best[model_type] = group.loc[group['mean_score'].idxmax(), 'params']
+    return best
+
+def _refit(model_type, params, X_train, y_train):
+    return model_type, create_pipeline(model_type, params).fit(X_train, y_train)
+
+def train_models(train_data, test_data, model_types=MODEL_TYPES, workers=None, output_dir=None,
+                 checkpoint_path=CHECKPOINT_PATH, cache_dir=TRAINING_DIR):
+    """Search every model type, refit the best pipelines on all training rows and save them"""
+    X_train, y_train = train_data[INJURY_FEATURES], train_data[TARGET]
+    results = grid_search(X_train, y_train, model_types, workers=workers,
+                          checkpoint_path=checkpoint_path, cache_dir=cache_dir)
+    chosen = best_params(results)
+
+    summary = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        refits = [pool.submit(_refit, model_type, params, X_train, y_train) for model_type, params in chosen.items()]
+        for future in as_completed(refits):
+            model_type, model = future.result()
+            cv_score = results.loc[results['model_type'] == model_type, 'mean_score'].max()
+            test_score = roc_auc_score(test_data[TARGET], model.predict_proba(test_data[INJURY_FEATURES])[:, 1])
+            summary[model_type] = {'params': chosen[model_type], 'cv_roc_auc': cv_score, 'test_roc_auc': test_score}
+            if output_dir is not None:
+                path = os.path.join(output_dir, os.path.basename(MODEL_PATHS[model_type]))
+                with open(path + '.tmp', 'wb') as file:
+                    pickle.dump(model, file)
+                os.replace(path + '.tmp', path)
+                summary[model_type]['path'] = path
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Grid-search and train the injury risk models")
+    parser.add_argument('--models', nargs='+', default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--output-dir', default=os.path.dirname(MODEL_PATHS['rf']),
+                        help="where to write <model>_best_model.pkl")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="JSON-lines file of finished fits")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = train_models(pd.read_csv(TRAIN_PATH), pd.read_csv(TEST_PATH), args.models, args.workers,
+                           args.output_dir, args.checkpoint)
+    for model_type in args.models:
+        result = summary[model_type]
+        print(f"{model_type}: CV ROC-AUC {result['cv_roc_auc']:.3f}, test ROC-AUC {result['test_roc_auc']:.3f} "
+              f"-> {result['path']}")
+        print(f"  {result['params']}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import streamlit as st
+
+# Timing of every stage of a tab render (filtering, aggregation, drawing, serialization) as
+# named spans. Spans nest, inheriting their parent's labels, so a chart drawn inside the
+# Injury tab is counted under tab="injury". Each span feeds a latency histogram plus row and
+# byte counters, exported in Prometheus text format to DASHBOARD_METRICS_FILE and/or served
+# on DASHBOARD_METRICS_PORT; DASHBOARD_DEBUG_METRICS=1 lists the current run's spans in the sidebar.
+
+METRICS_FILE = os.environ.get('DASHBOARD_METRICS_FILE')
+METRICS_PORT = os.environ.get('DASHBOARD_METRICS_PORT')
+DEBUG_PANEL = os.environ.get('DASHBOARD_DEBUG_METRICS') == '1'
+
+# Histogram bucket upper bounds in seconds
+SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Type and help text of each exported metric
+METRIC_HELP = {
+    'dashboard_span_seconds': ('histogram', "Time spent in each render stage"),
+    'dashboard_span_rows_total': ('counter', "Rows handled by each render stage"),
+    'dashboard_span_bytes_total': ('counter', "Bytes handled by each render stage"),
+    'dashboard_chart_requests_total': ('counter', "Charts shown, by figure cache result"),
+}
+
+class Span:
+    """One timed stage; set `rows` and `bytes` (or call count()) inside the block to record them"""
+
+    def __init__(self, name, labels, depth):
+        self.name = name
+        self.labels = labels
+        self.depth = depth
+        self.rows = None
+        self.bytes = None
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def count(self, frame):
+        """Record the rows and in-memory bytes of `frame` against this span"""
+        self.rows = len(frame)
+        self.bytes = int(frame.memory_usage(index=True).sum())
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """Process-wide counters and histograms, plus the spans of each thread's current script run"""
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._server = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the block as stage `name`, with `labels` added to those of the enclosing span"""
+        stack = self._stack()
+        current = Span(name, {**(stack[-1].labels if stack else {}), **labels}, len(stack))
+        stack.append(current)
+        try:
+            yield current
+        finally:
+            current.seconds = time.perf_counter() - current.started
+            stack.pop()
+            labels = {**current.labels, 'span': name}
+            self.observe('dashboard_span_seconds', current.seconds, **labels)
+            if current.rows is not None:
+                self.inc('dashboard_span_rows_total', current.rows, **labels)
+            if current.bytes is not None:
+                self.inc('dashboard_span_bytes_total', current.bytes, **labels)
+            run = getattr(self._local, 'run', None)
+            if run is not None:
+                run.append(current)
+
+    def start_run(self):
+        # Spans are listed per script run, which Streamlit executes on one thread
+        self._local.run = []
+        self._local.stack = []
+
+    def run_spans(self):
+        """Finished spans of this thread's current run, in start order"""
+        return sorted(getattr(self._local, 'run', None) or [], key=lambda span: span.started)
+
+    def summary(self):
+        """Span count and total milliseconds per tab and stage since the process started"""
+        import pandas as pd
+        with self._lock:
+            rows = [{'tab': dict(labels).get('tab', ''), 'span': dict(labels)['span'], 'count': histogram['count'],
+                     'total_ms': histogram['sum'] * 1000}
+                    for (name, labels), histogram in self._histograms.items() if name == 'dashboard_span_seconds']
+        if not rows:
+            return pd.DataFrame(columns=['tab', 'span', 'count', 'total_ms'])
+        return pd.DataFrame(rows).groupby(['tab', 'span'], as_index=False)[['count', 'total_ms']].sum()
+
+    def prometheus_text(self):
+        """Every counter and histogram in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, {**value, 'buckets': list(value['buckets'])})
+                                for key, value in self._histograms.items())
+        lines = []
+        described = set()
+        def describe(name):
+            if name not in described and name in METRIC_HELP:
+                kind, help_text = METRIC_HELP[name]
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            for bound, count in zip(self.buckets, histogram['buckets']):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """Write the Prometheus text to `path`, replacing it atomically (e.g. for a textfile collector)"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the Prometheus text at http://host:port/metrics from a daemon thread, once per process"""
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = metrics.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            return self._server
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+dashboard_metrics = Metrics()
+
+def span(name, **labels):
+    """Time a render stage; see Metrics.span"""
+    return dashboard_metrics.span(name, **labels)
+
+def start_run():
+    """Reset the run's span list and start the /metrics endpoint when one is configured"""
+    dashboard_metrics.start_run()
+    if METRICS_PORT:
+        dashboard_metrics.serve(int(METRICS_PORT))
+
+def publish(filter_col):
+    """Write the metrics file when one is configured and show this run's spans in the debug panel"""
+    if METRICS_FILE:
+        dashboard_metrics.export(METRICS_FILE)
+    spans = dashboard_metrics.run_spans()
+    if not DEBUG_PANEL or not spans:
+        return
+    import pandas as pd
+    with filter_col:
+        with st.expander("Render timings"):
+            st.dataframe(pd.DataFrame([{
+                'stage': '· ' * span.depth + span.name,
+                'labels': ', '.join(f"{key}={value}" for key, value in span.labels.items() if key != 'tab'),
+                'ms': round(span.seconds * 1000, 1),
+                'rows': span.rows,
+                'bytes': span.bytes,
+            } for span in spans]), hide_index=True, use_container_width=True)
+            # Where time has gone in this process so far
+            summary = dashboard_metrics.summary().sort_values('total_ms', ascending=False)
+            for row in summary[summary['span'] != 'tab'].head(5).itertuples(index=False):
+                st.caption(f"{row.tab} {row.span}: {row.total_ms:.0f} ms over {row.count} span(s)")
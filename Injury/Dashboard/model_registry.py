@@ -0,0 +1,99 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+# Pickled predictors the dashboard can serve, by registry name
+MODEL_PATHS = {
+    'rf': 'Injury/Injury Prediction/rf_best_model.pkl',
+    'gb': 'Injury/Injury Prediction/gb_best_model.pkl',
+    'lr': 'Injury/Injury Prediction/lr_best_model.pkl',
+    'winning_shot': 'Performance/winning_shot_model.pkl',
+}
+
+# Injury models users can switch between in the Injury Prediction tab
+INJURY_MODELS = {
+    'rf': 'Random Forest',
+    'gb': 'Gradient Boosting',
+    'lr': 'Logistic Regression',
+}
+
+class ModelRegistry:
+    """Loads each model artifact once per process and reloads it only when the file changes"""
+
+    def __init__(self, paths=MODEL_PATHS):
+        self.paths = dict(paths)
+        self._entries = {}
+        self._locks = {name: threading.Lock() for name in self.paths}
+        self._preload_thread = None
+        self.load_times = {}
+        self.errors = {}
+        # (signature, exception) of artifacts that failed to load, so they aren't retried until they change
+        self._failures = {}
+
+    def get(self, name):
+        path = self.paths[name]
+        with self._locks[name]:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            entry = self._entries.get(name)
+            if entry is not None and entry['signature'] == signature:
+                return entry['model']
+            failure = self._failures.get(name)
+            if failure is not None and failure[0] == signature:
+                raise failure[1].with_traceback(None)
+
+            # The file was touched or replaced: only unpickle again if its content changed
+            with open(path, 'rb') as file:
+                payload = file.read()
+            digest = hashlib.sha256(payload).hexdigest()
+            if entry is not None and entry['sha256'] == digest:
+                entry['signature'] = signature
+                return entry['model']
+
+            start = time.perf_counter()
+            try:
+                model = pickle.loads(payload)
+            except Exception as e:
+                self.errors[name] = str(e)
+                self._failures[name] = (signature, e)
+                raise
+            self.load_times[name] = time.perf_counter() - start
+            self._entries[name] = {'model': model, 'signature': signature, 'sha256': digest}
+            self.errors.pop(name, None)
+            self._failures.pop(name, None)
+            return model
+
+    def preload(self, names=None, background=False):
+        """Warm the cache; with background=True this runs once per process in a daemon thread"""
+        names = list(names or self.paths)
+        if not background:
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    self.errors[name] = str(e)
+            return self.errors
+
+        if self._preload_thread is None:
+            self._preload_thread = threading.Thread(target=self.preload, args=(names,), daemon=True)
+            self._preload_thread.start()
+        return self._preload_thread
+
+    def available(self, names):
+        """Those of `names` whose artifact loads, loading them if needed; failures go to `errors`"""
+        loadable = []
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                self.errors[name] = str(e)
+                continue
+            loadable.append(name)
+        return loadable
+
+    def is_loaded(self, name):
+        return name in self._entries
+
+model_registry = ModelRegistry()
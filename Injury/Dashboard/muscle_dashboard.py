@@ -1,14 +1,21 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import seaborn as sns
-import matplotlib.pyplot as plt
 from filters import muscle_filters
-from io import BytesIO
+from utils import drop_unused_categories
+from figure_cache import show_figure, selection_key
+from metrics import span
+from plotting import chart_style
+from vega_charts import hq_ratio_trends_chart
 
-# Set a consistent style for the plots and apply custom color palette
-sns.set_theme(style="whitegrid")
+# Columns of the muscle_imbalance table this tab reads
+MUSCLE_COLUMNS = ['Player Name', 'Date Recorded', 'Hamstring To Quad Ratio', 'Quad Imbalance Percent',
+                  'HamstringImbalance Percent', 'Calf Imbalance Percent', 'Groin Imbalance Percent']
+
+# Consistent style for the plots with a custom color palette, applied while they are drawn
 custom_palette = ["#E74C3C", "#D35400", "#2980B9", "#8E44AD", "#BDC3C7"]
-plt.rcParams.update({
+CHART_STYLE = chart_style(theme="whitegrid", palette=custom_palette, rc={
     'font.size': 14,
     'axes.labelsize': 14,
     'axes.titlesize': 16,
@@ -20,7 +27,6 @@ plt.rcParams.update({
     'axes.edgecolor': '#333333',
     'text.color': '#333333'
 })
-sns.set_palette(custom_palette)
 
 def calculate_risk_score(row):
     risk_score = 0
@@ -36,13 +42,80 @@ def calculate_risk_score(row):
             risk_score += (imbalance - 5) * 0.5
     return risk_score
 
-def render_muscle_tab(muscle_data, filter_col):
+IMBALANCE_COLUMNS = ['Quad Imbalance Percent', 'HamstringImbalance Percent', 'Calf Imbalance Percent', 'Groin Imbalance Percent']
+
+def calculate_risk_scores(muscle_data):
+    # Vectorized calculate_risk_score over a whole frame. Terms are added in the same order
+    # as the row-wise version so the results are identical, not just close.
+    hq_ratio = muscle_data['Hamstring To Quad Ratio'].to_numpy(dtype=float)
+    risk_score = np.where(hq_ratio < 0.6, (0.6 - hq_ratio) * 10, np.where(hq_ratio > 0.8, (hq_ratio - 0.8) * 10, 0.0))
+    for col in IMBALANCE_COLUMNS:
+        imbalance = np.abs(muscle_data[col].to_numpy(dtype=float))
+        risk_score = risk_score + np.where(imbalance > 5, (imbalance - 5) * 0.5, 0.0)
+    return pd.Series(risk_score, index=muscle_data.index, name='Risk Score')
+
+def build_risk_frame(muscle_data):
+    # Risk Score per player and assessment date, sharing the index of muscle_data
+    risk_frame = muscle_data[['Player Name', 'Date Recorded']].copy()
+    risk_frame['Risk Score'] = calculate_risk_scores(muscle_data)
+    return risk_frame
+
+def draw_metric_distribution(fig, filtered_data, metric):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    sns.histplot(filtered_data[metric], kde=True, color=custom_palette[2], edgecolor="black", alpha=0.8, ax=ax)
+    if metric == 'Hamstring To Quad Ratio':
+        ax.axvline(x=0.6, color=custom_palette[3], linestyle='--', label='Ideal Min')
+        ax.axvline(x=0.8, color=custom_palette[3], linestyle='--', label='Ideal Max')
+    else:
+        ax.axvline(x=-5, color=custom_palette[3], linestyle='--', label='Ideal Min')
+        ax.axvline(x=5, color=custom_palette[3], linestyle='--', label='Ideal Max')
+    ax.set_xlabel(metric)
+    ax.set_ylabel('Frequency')
+    ax.legend()
+    sns.despine(ax=ax, left=True, bottom=True)  # Remove left and bottom borders
+
+def draw_hq_ratio_trends(fig, filtered_data):
+    fig.set_size_inches(6, 4)
+    ax = fig.subplots()
+    for player in filtered_data['Player Name'].unique():
+        player_data = filtered_data[filtered_data['Player Name'] == player]
+        sns.lineplot(x='Date Recorded', y='Hamstring To Quad Ratio', data=player_data, label=player, ax=ax)
+
+    ax.axhline(y=0.6, color=custom_palette[3], linestyle='--', label='Ideal Min')
+    ax.axhline(y=0.8, color=custom_palette[3], linestyle='--', label='Ideal Max')
+    ax.set_xlabel("Date")
+    ax.set_ylabel("H/Q Ratio")
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize='small')
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def draw_correlation_heatmap(fig, filtered_data):
+    corr = filtered_data[['Hamstring To Quad Ratio', 'Quad Imbalance Percent', 'HamstringImbalance Percent', 'Calf Imbalance Percent', 'Groin Imbalance Percent']].corr()
+    fig.set_size_inches(5.5, 4)
+    fig.set_dpi(100)
+    ax = fig.subplots()
+    sns.heatmap(corr, annot=True, cmap='coolwarm', cbar=False, ax=ax, annot_kws={"size": 8}, fmt=".2f", linewidths=0.5)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=90, ha='center', fontsize=8)
+    ax.set_yticklabels(ax.get_yticklabels(), fontsize=8)
+    ax.set_title("Correlation Heatmap", fontsize=10)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def render_muscle_tab(muscle_data, filter_col, risk_frame=None, data_version=None, index=None):
     try:
-        selected_players, selected_metrics = muscle_filters(muscle_data, filter_col)
-        filtered_data = muscle_data[(muscle_data['Player Name'].isin(selected_players))]
+        selected_players, selected_metrics = muscle_filters(muscle_data, filter_col, index)
+        with span('filter') as filtered:
+            if index is not None:
+                filtered_data = index.take(muscle_data, {'Player Name': selected_players})
+            else:
+                filtered_data = muscle_data[(muscle_data['Player Name'].isin(selected_players))]
+            filtered_data = filtered_data.pipe(drop_unused_categories)
+            filtered.count(filtered_data)
         
-        # Calculate Risk Score for each player
-        filtered_data['Risk Score'] = filtered_data.apply(calculate_risk_score, axis=1)
+        # Risk Score for each player, from the frame precomputed at load time when one is given
+        with span('aggregate'):
+            if risk_frame is None:
+                risk_frame = build_risk_frame(muscle_data)
+            filtered_data = filtered_data.assign(**{'Risk Score': risk_frame.loc[filtered_data.index, 'Risk Score']})
         
         # Calculate KPIs
         st.write("### Key Performance Indicators")
@@ -60,6 +133,8 @@ def render_muscle_tab(muscle_data, filter_col):
             avg_risk = filtered_data['Risk Score'].mean()
             st.metric(label="Average Risk Score", value=f"{avg_risk:.1f}", delta=f"Max: {filtered_data['Risk Score'].max():.1f}")
 
+        selection = selection_key(selected_players)
+
         # Muscle Imbalance Metrics Distributions
         metrics = ['Hamstring To Quad Ratio', 'Quad Imbalance Percent', 'HamstringImbalance Percent', 'Calf Imbalance Percent', 'Groin Imbalance Percent']
         st.write("### Muscle Imbalance Metrics Distributions")
@@ -68,52 +143,27 @@ def render_muscle_tab(muscle_data, filter_col):
             for j, metric in enumerate(metrics[i:i + 2]):
                 with cols[j]:
                     st.subheader(f"Distribution of {metric}")
-                    fig, ax = plt.subplots(figsize=(5, 3))
-                    sns.histplot(filtered_data[metric], kde=True, color=custom_palette[2], edgecolor="black", alpha=0.8, ax=ax)
-                    if metric == 'Hamstring To Quad Ratio':
-                        ax.axvline(x=0.6, color=custom_palette[3], linestyle='--', label='Ideal Min')
-                        ax.axvline(x=0.8, color=custom_palette[3], linestyle='--', label='Ideal Max')
-                    else:
-                        ax.axvline(x=-5, color=custom_palette[3], linestyle='--', label='Ideal Min')
-                        ax.axvline(x=5, color=custom_palette[3], linestyle='--', label='Ideal Max')
-                    ax.set_xlabel(metric)
-                    ax.set_ylabel('Frequency')
-                    ax.legend()
-                    sns.despine(left=True, bottom=True)  # Remove left and bottom borders
-                    st.pyplot(fig)
+                    show_figure('muscle', f'distribution:{metric}', selection, data_version,
+                                lambda fig, metric=metric: draw_metric_distribution(fig, filtered_data, metric),
+                                style=CHART_STYLE)
 
         # Trends in H/Q Ratio Over Time
         st.write("### Trends in H/Q Ratio Over Time")
-        fig, ax = plt.subplots(figsize=(6, 4))
-        for player in filtered_data['Player Name'].unique():
-            player_data = filtered_data[filtered_data['Player Name'] == player]
-            sns.lineplot(x='Date Recorded', y='Hamstring To Quad Ratio', data=player_data, label=player, ax=ax)
-
-        ax.axhline(y=0.6, color=custom_palette[3], linestyle='--', label='Ideal Min')
-        ax.axhline(y=0.8, color=custom_palette[3], linestyle='--', label='Ideal Max')
-        ax.set_xlabel("Date")
-        ax.set_ylabel("H/Q Ratio")
-        ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize='small')
-        sns.despine(left=True, bottom=True)
-        st.pyplot(fig)
+        show_figure('muscle', 'hq_ratio_trends', selection, data_version,
+                    lambda fig: draw_hq_ratio_trends(fig, filtered_data),
+                    vega=lambda: hq_ratio_trends_chart(filtered_data), style=CHART_STYLE)
 
         # Correlation Heatmap for Muscle Imbalance Metrics
         st.write("### Correlation Between Key Imbalance Metrics")
-        corr = filtered_data[['Hamstring To Quad Ratio', 'Quad Imbalance Percent', 'HamstringImbalance Percent', 'Calf Imbalance Percent', 'Groin Imbalance Percent']].corr()
-        fig, ax = plt.subplots(figsize=(5.5, 4), dpi=100)
-        sns.heatmap(corr, annot=True, cmap='coolwarm', cbar=False, ax=ax, annot_kws={"size": 8}, fmt=".2f", linewidths=0.5)
-        ax.set_xticklabels(ax.get_xticklabels(), rotation=90, ha='center', fontsize=8)
-        ax.set_yticklabels(ax.get_yticklabels(), fontsize=8)
-        ax.set_title("Correlation Heatmap", fontsize=10)
-        sns.despine(left=True, bottom=True)
-        buf = BytesIO()
-        fig.savefig(buf, format="png", bbox_inches="tight")
-        buf.seek(0)
-        st.image(buf, use_container_width=True)
+        show_figure('muscle', 'correlation_heatmap', selection, data_version,
+                    lambda fig: draw_correlation_heatmap(fig, filtered_data), dpi='figure', style=CHART_STYLE)
 
         # Muscle Imbalance Details Table
         st.write("### Muscle Imbalance Details")
-        st.dataframe(filtered_data[['Player Name', 'Date Recorded', 'Hamstring To Quad Ratio', 'Risk Score']], use_container_width=True)
+        with span('table') as table:
+            details = filtered_data[['Player Name', 'Date Recorded', 'Hamstring To Quad Ratio', 'Risk Score']]
+            table.count(details)
+            st.dataframe(details, use_container_width=True)
 
     except Exception as e:
         st.error(f"An error occurred in render_muscle_tab: {str(e)}")
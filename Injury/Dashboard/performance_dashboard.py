@@ -1,114 +1,161 @@
 import streamlit as st
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
 from filters import performance_filters
-from sklearn.ensemble import RandomForestClassifier
-import shap
-import numpy as np
+from utils import drop_unused_categories
+from filter_index import build_filter_index
+from aggregates import build_performance_cubes, performance_kpis, accuracy_over_time, shot_outcome_shares
+from figure_cache import show_figure, selection_key
+from metrics import span
+from plotting import chart_style
+from vega_charts import accuracy_over_time_chart
 
-def render_performance_tab(performance_data, filter_col):
-    # Set plot styles
-    sns.set_palette("Set2")
-    plt.rcParams['font.family'] = 'sans-serif'
-    plt.rcParams['font.size'] = 12
-    plt.rcParams['axes.labelcolor'] = '#333333'
-    plt.rcParams['xtick.color'] = '#333333'
-    plt.rcParams['ytick.color'] = '#333333'
-    plt.rcParams['text.color'] = '#333333'
-    plt.rcParams['axes.titlecolor'] = '#333333'
-    
+# Columns of the performance table this tab reads
+PERFORMANCE_COLUMNS = ['shooter', 'date', 'shot_outcome', 'three_pt', 'free_throw', 'scoring_play']
+
+# Plot styles, applied while this tab's charts are drawn
+CHART_STYLE = chart_style(palette="Set2", rc={
+    'font.family': 'sans-serif',
+    'font.size': 12,
+    'axes.labelcolor': '#333333',
+    'xtick.color': '#333333',
+    'ytick.color': '#333333',
+    'text.color': '#333333',
+    'axes.titlecolor': '#333333',
+})
+
+def draw_shot_accuracy_distribution(fig, filtered_data):
+    fig.set_size_inches(5, 4)
+    ax = fig.subplots()
+    sns.histplot(filtered_data['shot_outcome'] == 'made', bins=10, kde=True, ax=ax)
+    ax.set_xlabel("Shot Made")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Distribution of Shot Accuracy")
+
+def draw_accuracy_over_time(fig, daily_accuracy):
+    fig.set_size_inches(5, 4)
+    ax = fig.subplots()
+    ax.plot(daily_accuracy.index, daily_accuracy.values, marker='o')
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Average Shot Accuracy")
+    ax.set_title("Shot Accuracy Over Time")
+    ax.tick_params(axis='x', rotation=45)
+
+def draw_game_flow(fig, filtered_data):
+    fig.set_size_inches(5, 4)
+    ax = fig.subplots()
+    score_progression = filtered_data.groupby('date')['scoring_play'].cumsum()
+    ax.plot(score_progression.index, score_progression.values, marker='o')
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Cumulative Score")
+    ax.set_title("Score Progression Over Time")
+    ax.tick_params(axis='x', rotation=45)
+
+def draw_shot_distribution(fig, shot_types):
+    fig.set_size_inches(5, 4)
+    ax = fig.subplots()
+    sns.barplot(x=shot_types.index, y=shot_types.values, ax=ax)
+    ax.set_xlabel("Shot Outcome")
+    ax.set_ylabel("Proportion")
+    ax.set_title("Distribution of Shot Types")
+
+def render_performance_tab(performance_data, filter_col, cubes=None, data_version=None, store=None, index=None):
     try:
-        # Get filter selections
-        selected_shooters = performance_filters(performance_data, filter_col)
+        # Get filter selections; the store's shooter index or the filter index provides the options
+        if store is None and index is None:
+            index = build_filter_index('performance', performance_data)
+        selected_shooters = performance_filters(performance_data, filter_col,
+                                                store.shooters() if store else index.options('shooter'))
+        
+        # With the partitioned store, only the selected shooters' plays are read
+        if store is not None:
+            with span('query') as queried:
+                performance_data = store.query(selected_shooters, PERFORMANCE_COLUMNS)
+                queried.count(performance_data)
         
         # Ensure we have valid data
-        if performance_data is None or len(performance_data) == 0:
+        if performance_data is None or (len(performance_data) == 0 and store is None):
             st.error("No valid performance data available")
             return
             
         # Filter data based on selections
-        filtered_data = performance_data[performance_data['shooter'].isin(selected_shooters)]
+        with span('filter') as filtered:
+            if store is None:
+                filtered_data = index.take(performance_data, {'shooter': selected_shooters})
+            else:
+                filtered_data = performance_data[performance_data['shooter'].isin(selected_shooters)]
+            filtered_data = filtered_data.pipe(drop_unused_categories)
+            filtered.count(filtered_data)
+        
+        # KPIs and the accuracy/outcome charts come from pre-aggregated cubes, not the raw rows
+        with span('aggregate'):
+            if cubes is None and store is not None:
+                # Each shooter's cube is built once and kept with the store across reruns
+                cubes = store.cubes(selected_shooters, performance_data)
+            elif cubes is None:
+                cubes = build_performance_cubes(performance_data)
+            kpis = performance_kpis(cubes, selected_shooters)
         
         # Display KPIs in a row
         kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
         
         with kpi_col1:
-            total_points = filtered_data['scoring_play'].sum()
+            total_points = kpis['total_points']
             st.metric(label="Total Points", value=total_points)
         
         with kpi_col2:
-            shooting_accuracy = (filtered_data['shot_outcome'] == 'made').mean() * 100
+            shooting_accuracy = kpis['shooting_accuracy']
             st.metric(label="Shooting Accuracy", value=f"{shooting_accuracy:.2f}%")
         
         with kpi_col3:
-            three_point_accuracy = filtered_data[filtered_data['three_pt']]['shot_outcome'].eq('made').mean() * 100
+            three_point_accuracy = kpis['three_point_accuracy']
             st.metric(label="Three-Point Accuracy", value=f"{three_point_accuracy:.2f}%")
         
         with kpi_col4:
-            free_throw_accuracy = filtered_data[filtered_data['free_throw']]['shot_outcome'].eq('made').mean() * 100
+            free_throw_accuracy = kpis['free_throw_accuracy']
             st.metric(label="Free Throw Accuracy", value=f"{free_throw_accuracy:.2f}%")
         
         # Create two rows with two columns each for visualizations
         row1_col1, row1_col2 = st.columns(2)
         row2_col1, row2_col2 = st.columns(2)
         
+        selection = selection_key(selected_shooters)
+
         # Shot Accuracy Distribution
         with row1_col1:
             st.subheader("Shot Accuracy Distribution")
-            fig1 = plt.figure(figsize=(5, 4))
-            sns.histplot(filtered_data['shot_outcome'] == 'made', bins=10, kde=True)
-            plt.xlabel("Shot Made")
-            plt.ylabel("Frequency")
-            plt.title("Distribution of Shot Accuracy")
-            st.pyplot(fig1)
-            plt.close()
+            show_figure('performance', 'shot_accuracy_distribution', selection, data_version,
+                        lambda fig: draw_shot_accuracy_distribution(fig, filtered_data), style=CHART_STYLE)
         
         # Shooting Accuracy Over Time
         with row2_col1:
             st.subheader("Shooting Accuracy Over Time")
-            fig3 = plt.figure(figsize=(5, 4))
-            filtered_data['date'] = pd.to_datetime(filtered_data['date'])
-            accuracy_over_time = filtered_data.groupby('date')['shot_outcome'].apply(lambda x: (x == 'made').mean())
-            plt.plot(accuracy_over_time.index, accuracy_over_time.values, marker='o')
-            plt.xlabel("Date")
-            plt.ylabel("Average Shot Accuracy")
-            plt.title("Shot Accuracy Over Time")
-            plt.xticks(rotation=45)
-            st.pyplot(fig3)
-            plt.close()
+            with span('aggregate', chart='accuracy_over_time'):
+                daily_accuracy = accuracy_over_time(cubes, selected_shooters)
+            show_figure('performance', 'accuracy_over_time', selection, data_version,
+                        lambda fig: draw_accuracy_over_time(fig, daily_accuracy),
+                        vega=lambda: accuracy_over_time_chart(daily_accuracy), style=CHART_STYLE)
         
         # Game Flow Analysis
         with row1_col2:
             st.subheader("Game Flow Analysis")
-            fig2 = plt.figure(figsize=(5, 4))
-            score_progression = filtered_data.groupby('date')['scoring_play'].cumsum()
-            plt.plot(score_progression.index, score_progression.values, marker='o')
-            plt.xlabel("Date")
-            plt.ylabel("Cumulative Score")
-            plt.title("Score Progression Over Time")
-            plt.xticks(rotation=45)
-            st.pyplot(fig2)
-            plt.close()
+            show_figure('performance', 'game_flow', selection, data_version,
+                        lambda fig: draw_game_flow(fig, filtered_data), style=CHART_STYLE)
         
         # Shot Distribution
         with row2_col2:
             st.subheader("Shot Distribution")
-            fig4 = plt.figure(figsize=(5, 4))
-            shot_types = filtered_data['shot_outcome'].value_counts(normalize=True)
-            sns.barplot(x=shot_types.index, y=shot_types.values)
-            plt.xlabel("Shot Outcome")
-            plt.ylabel("Proportion")
-            plt.title("Distribution of Shot Types")
-            st.pyplot(fig4)
-            plt.close()
+            with span('aggregate', chart='shot_distribution'):
+                shot_types = shot_outcome_shares(cubes, selected_shooters)
+            show_figure('performance', 'shot_distribution', selection, data_version,
+                        lambda fig: draw_shot_distribution(fig, shot_types), style=CHART_STYLE)
             
             # Display detailed performance table
         st.subheader("Performance Details")
-        st.dataframe(
-            filtered_data[['shooter', 'date', 'shot_outcome', 'three_pt', 'free_throw', 'scoring_play']],
-            use_container_width=True
-        )
+        with span('table') as table:
+            details = filtered_data[['shooter', 'date', 'shot_outcome', 'three_pt', 'free_throw', 'scoring_play']]
+            table.count(details)
+            st.dataframe(details, use_container_width=True)
                     
     except Exception as e:
         st.error(f"An error occurred in render_performance_tab: {str(e)}")
\ No newline at end of file
@@ -1,14 +1,34 @@
+import time
 import streamlit as st
 import numpy as np
-import pickle
+import pandas as pd
+from model_registry import model_registry
+from clutch_features import load_clutch_store, rank_shooters, WINNING_SHOT_FEATURES
+from tree_inference import fast_model
+from explanations import explanation_service, top_factors
 
-def render_performance_prediction_tab():
+# Slider starting values when no shooter is picked
+DEFAULT_INPUTS = {
+    'shooting_success_rate': 0.5,
+    'recent_performance': 0.5,
+    'scoring_streak': 0,
+    '5min_clutch_success_rate': 0.5,
+    '2min_clutch_success_rate': 0.5,
+    'final_shot_success_rate': 0.5,
+}
+
+def render_performance_prediction_tab(clutch_store=None):
     st.header("Performance Prediction")
 
-    # Load the pre-trained model
+    # Player features come from the precomputed clutch feature store
+    if clutch_store is None:
+        clutch_store = load_clutch_store()
+    shooter = st.selectbox("Pre-fill from shooter", ["Manual input"] + clutch_store.shooters(), key="prefill_shooter")
+    defaults = DEFAULT_INPUTS if shooter == "Manual input" else clutch_store.shooter_profile(shooter)
+
+    # Load the pre-trained model (cached for the whole process by the model registry)
     try:
-        with open('Performance/winning_shot_model.pkl', 'rb') as file:
-            model = pickle.load(file)
+        model = fast_model(model_registry.get('winning_shot'))
     except FileNotFoundError:
         st.error("Model file not found. Please ensure 'winning_shot_model.pkl' is in the correct directory.")
         return
@@ -17,11 +37,11 @@ def render_performance_prediction_tab():
     with st.form("performance_prediction_form"):
         st.markdown("### Input Player Performance Metrics")
         
-        shooting_success_rate = st.slider("Shooting Success Rate", 0.0, 1.0, 0.5)
-        recent_performance = st.slider("Recent Performance", 0.0, 1.0, 0.5)
+        shooting_success_rate = st.slider("Shooting Success Rate", 0.0, 1.0, float(defaults['shooting_success_rate']))
+        recent_performance = st.slider("Recent Performance", 0.0, 1.0, float(defaults['recent_performance']))
         win_prob_gap = st.slider("Win Probability Gap", 0.0, 1.0, 0.1)
         possession_length = st.slider("Possession Length", 0, 100, 30)
-        scoring_streak = st.slider("Scoring Streak", 0, 10, 0)
+        scoring_streak = st.slider("Scoring Streak", 0, max(10, defaults['scoring_streak']), defaults['scoring_streak'])
         time_remaining = st.slider("Time Remaining (seconds)", 0, 300, 120)
         
         # Use descriptive labels for binary options
@@ -29,9 +49,9 @@ def render_performance_prediction_tab():
         high_pressure = st.radio("High Pressure", ["No", "Yes"], index=0)
         possession_change = st.radio("Possession Change", ["No", "Yes"], index=0)
         
-        clutch_5min_success_rate = st.slider("5-Min Clutch Success Rate", 0.0, 1.0, 0.5)
-        clutch_2min_success_rate = st.slider("2-Min Clutch Success Rate", 0.0, 1.0, 0.5)
-        final_shot_success_rate = st.slider("Final Shot Success Rate", 0.0, 1.0, 0.5)
+        clutch_5min_success_rate = st.slider("5-Min Clutch Success Rate", 0.0, 1.0, float(defaults['5min_clutch_success_rate']))
+        clutch_2min_success_rate = st.slider("2-Min Clutch Success Rate", 0.0, 1.0, float(defaults['2min_clutch_success_rate']))
+        final_shot_success_rate = st.slider("Final Shot Success Rate", 0.0, 1.0, float(defaults['final_shot_success_rate']))
         
         submitted = st.form_submit_button("Predict")
     
@@ -41,19 +61,76 @@ def render_performance_prediction_tab():
         high_pressure = 1 if high_pressure == "Yes" else 0
         possession_change = 1 if possession_change == "Yes" else 0
 
-        # Prepare input data for prediction
+        # Prepare input data for prediction, scaled like the model's training data
         input_data = np.array([[
             shooting_success_rate, recent_performance, win_prob_gap, possession_length,
             scoring_streak, time_remaining, home_team_advantage, high_pressure,
             possession_change, clutch_5min_success_rate, clutch_2min_success_rate,
             final_shot_success_rate
         ]])
+        inputs = pd.DataFrame(input_data, columns=WINNING_SHOT_FEATURES)
+        scaled = clutch_store.scale(inputs)
         
         # Predict the winning shot player
-        prediction = model.predict(input_data)
+        prediction = model.predict(scaled)
         
         # Display the predicted player
         if prediction[0] == 1:
             st.success("The recommended player for the winning shot is: Judah Mintz")
         else:
-            st.warning("No player was predicted as the best choice for the winning shot.")
\ No newline at end of file
+            st.warning("No player was predicted as the best choice for the winning shot.")
+
+        # The inputs that mattered most for this prediction, shown with the values as entered
+        try:
+            start = time.perf_counter()
+            contributions = explanation_service.explain('winning_shot', scaled).iloc[0]
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            st.caption(f"Could not explain this prediction: {str(e)}")
+        else:
+            st.dataframe(top_factors(contributions, inputs.iloc[0]), use_container_width=True, hide_index=True)
+            st.caption(f"Top factors by SHAP contribution to the winning-shot probability, explained in {elapsed_ms:.0f} ms")
+
+    # Score every shooter against one game state with a single batched prediction
+    with st.form("roster_ranking_form"):
+        st.markdown("### Rank the Roster for the Final Shot")
+
+        ranking_time_remaining = st.slider("Time Remaining (seconds)", 0, 300, 24, key="ranking_time_remaining")
+        ranking_win_prob_gap = st.slider("Win Probability Gap", 0.0, 1.0, 0.1, key="ranking_win_prob_gap")
+        ranking_possession_length = st.slider("Possession Length", 0, 100, 30, key="ranking_possession_length")
+        ranking_home = st.radio("Home Team Advantage", ["No", "Yes"], index=0, key="ranking_home")
+        ranking_pressure = st.radio("High Pressure", ["No", "Yes"], index=0, key="ranking_pressure")
+        ranking_possession_change = st.radio("Possession Change", ["No", "Yes"], index=0, key="ranking_possession_change")
+
+        ranked = st.form_submit_button("Rank Shooters")
+
+    if ranked:
+        game_context = {
+            'time_remaining': ranking_time_remaining,
+            'win_prob_gap': ranking_win_prob_gap,
+            'possession_length': ranking_possession_length,
+            'home_team_advantage': 1 if ranking_home == "Yes" else 0,
+            'high_pressure': 1 if ranking_pressure == "Yes" else 0,
+            'possession_change': 1 if ranking_possession_change == "Yes" else 0,
+        }
+        start = time.perf_counter()
+        ranking = rank_shooters(model, clutch_store, game_context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # The whole roster is explained in one batch; show each shooter's strongest positive factor
+        roster = clutch_store.roster_features(game_context, ranking['shooter'])
+        try:
+            ranking['Main Factor'] = explanation_service.explain('winning_shot', roster).idxmax(axis=1).to_numpy()
+        except Exception as e:
+            explain_error = str(e)
+        else:
+            explain_error = None
+
+        st.dataframe(
+            ranking.rename(columns={'shooter': 'Shooter', 'probability': 'Winning Shot Probability'}),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Scored {len(ranking)} shooters in {elapsed_ms:.0f} ms")
+        if explain_error is not None:
+            st.caption(f"Could not explain the ranking: {explain_error}")
\ No newline at end of file
@@ -0,0 +1,255 @@
+import os
+import shutil
+import threading
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_store import STORE_DIR, FINGERPRINT_KEY, STORE_FORMAT, read_table, source_fingerprint
+
+# Play-by-play laid out for multi-season, multi-team archives. There is one Parquet file per
+# season and shooting team, with rows sorted by shooter, game and play, so each shooter's plays
+# sit in a few consecutive row groups. The shooter index records those row groups, so a query
+# opens only the selected shooters' partitions and reads only their row groups and the
+# requested columns.
+
+PARTITIONED_DIR = os.path.join(STORE_DIR, 'performance')
+INDEX_FILE = 'shooter_index.parquet'
+ROW_GROUP_ROWS = 8192
+
+# Plays without a shooting team (fouls, turnovers, timeouts) are kept in their own partition
+NO_TEAM = '__none__'
+
+# Columns the performance cubes are built from
+PERFORMANCE_CUBE_COLUMNS = ['shooter', 'date', 'shot_outcome', 'three_pt', 'free_throw', 'scoring_play']
+
+# Position of each play in the source table, so query results keep the source's row order
+SOURCE_ROW = 'source_row'
+
+def season_of(dates):
+    # Seasons run November to April and are named by the year they end in
+    return (dates.dt.year + (dates.dt.month >= 7)).astype('int64')
+
+def _row_groups(first, last):
+    return list(range(first // ROW_GROUP_ROWS, last // ROW_GROUP_ROWS + 1))
+
+def write_partitions(plays, root=PARTITIONED_DIR, fingerprint=''):
+    """Write `plays` as season/team partitions plus the shooter index, replacing `root`"""
+    plays = plays.assign(**{
+        SOURCE_ROW: np.arange(len(plays), dtype='int64'),
+        'season': season_of(plays['date']),
+        'team': plays['shot_team'].astype(object).fillna(NO_TEAM),
+    })
+    tmp_root = root + '.tmp'
+    shutil.rmtree(tmp_root, ignore_errors=True)
+
+    entries = []
+    for (season, team), part in plays.groupby(['season', 'team'], sort=True):
+        part = part.sort_values(['shooter', 'game_id', 'play_id'], kind='stable').drop(columns=['season', 'team'])
+        path = os.path.join(f"season={season}", f"team={quote(team)}", 'part-0.parquet')
+        os.makedirs(os.path.dirname(os.path.join(tmp_root, path)), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), os.path.join(tmp_root, path),
+                       row_group_size=ROW_GROUP_ROWS, compression='snappy')
+
+        # First and last sorted position of each shooter in this file
+        positions = pd.DataFrame({'shooter': part['shooter'].astype(object).to_numpy(), 'row': np.arange(len(part))})
+        spans = positions.dropna().groupby('shooter')['row'].agg(['min', 'max', 'size'])
+        for shooter, span in spans.iterrows():
+            entries.append((shooter, season, team, path, span['min'] // ROW_GROUP_ROWS,
+                            span['max'] // ROW_GROUP_ROWS, span['size']))
+
+    index = pd.DataFrame(entries, columns=['shooter', 'season', 'team', 'path', 'first_row_group',
+                                           'last_row_group', 'plays'])
+    table = pa.Table.from_pandas(index, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), FINGERPRINT_KEY: fingerprint.encode()})
+    os.makedirs(tmp_root, exist_ok=True)
+    pq.write_table(table, os.path.join(tmp_root, INDEX_FILE))
+
+    # Swap the finished tree in so readers never see a half-written store
+    old_root = root + '.old'
+    shutil.rmtree(old_root, ignore_errors=True)
+    if os.path.exists(root):
+        os.replace(root, old_root)
+    os.replace(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+    return index
+
+class PerformanceStore:
+    """Partitioned play-by-play, queried by shooter through the shooter index"""
+
+    def __init__(self, root=PARTITIONED_DIR):
+        self.root = root
+        index_path = os.path.join(root, INDEX_FILE)
+        self.index = pd.read_parquet(index_path)
+        self.version = (pq.read_schema(index_path).metadata or {}).get(FINGERPRINT_KEY, b'').decode()
+        self._files = {}
+        self._schema = None
+        # Per-date cubes by shooter, built the first time a shooter is selected
+        self._cubes = {}
+        self._lock = threading.Lock()
+
+    def shooters(self):
+        return sorted(self.index['shooter'].unique())
+
+    def partitions(self, shooters, seasons=None, teams=None):
+        """Index entries for `shooters`, optionally only in some seasons or teams"""
+        entries = self.index[self.index['shooter'].isin(shooters)]
+        if seasons is not None:
+            entries = entries[entries['season'].isin(seasons)]
+        if teams is not None:
+            entries = entries[entries['team'].isin(teams)]
+        return entries
+
+    def _file(self, path):
+        if path not in self._files:
+            self._files[path] = pq.ParquetFile(os.path.join(self.root, path))
+        return self._files[path]
+
+    def _empty(self, columns):
+        if self._schema is None:
+            first = self.index['path'].iloc[0] if len(self.index) else None
+            self._schema = self._file(first).schema_arrow if first else pa.schema([])
+        frame = self._schema.empty_table().to_pandas()
+        return frame.drop(columns=[SOURCE_ROW]) if columns is None else frame[list(columns)]
+
+    def query(self, shooters, columns=None, seasons=None, teams=None):
+        """Plays by `shooters` in source order, reading only their row groups and `columns`"""
+        entries = self.partitions(shooters, seasons, teams)
+        if entries.empty:
+            return self._empty(columns)
+        read_columns = None if columns is None else list(dict.fromkeys([*columns, 'shooter', SOURCE_ROW]))
+
+        tables = []
+        for path, spans in entries.groupby('path', sort=False):
+            row_groups = sorted({group for span in spans.itertuples(index=False)
+                                 for group in range(span.first_row_group, span.last_row_group + 1)})
+            tables.append(self._file(path).read_row_groups(row_groups, columns=read_columns))
+        plays = pa.concat_tables(tables).to_pandas()
+
+        # Row groups can hold neighbouring shooters too
+        plays = plays[plays['shooter'].isin(shooters)]
+        plays = plays.set_index(SOURCE_ROW).sort_index().rename_axis(None)
+        return plays if columns is None else plays[list(columns)]
+
+    def cubes(self, shooters, plays=None):
+        """Performance cubes for `shooters`, merged from per-shooter cubes built once each
+
+        Shooters seen for the first time are aggregated from `plays` when it holds their
+        plays (a query result), otherwise from a query of their partitions.
+        """
+        from aggregates import build_performance_cubes
+        missing = [shooter for shooter in dict.fromkeys(shooters) if shooter not in self._cubes]
+        if missing:
+            if plays is None or not set(missing).issubset(plays['shooter'].unique()):
+                plays = self.query(missing, PERFORMANCE_CUBE_COLUMNS)
+            plays = plays[plays['shooter'].isin(missing)]
+            per_date = build_performance_cubes(plays)['per_date']
+            per_date['shooter'] = per_date['shooter'].astype(object)
+            built = dict(tuple(per_date.groupby('shooter', sort=False)))
+            with self._lock:
+                for shooter in missing:
+                    # Shooters without plays get an empty cube so they aren't queried again
+                    self._cubes[shooter] = built.get(shooter, per_date.iloc[:0])
+        parts = [self._cubes[shooter] for shooter in dict.fromkeys(shooters)]
+        per_date = pd.concat(parts, ignore_index=True) if parts else self._cubes_empty()
+        return {'per_date': per_date}
+
+    def _cubes_empty(self):
+        from aggregates import build_performance_cubes
+        per_date = build_performance_cubes(self._empty(PERFORMANCE_CUBE_COLUMNS))['per_date']
+        per_date['shooter'] = per_date['shooter'].astype(object)
+        return per_date
+
+def _stored_fingerprint(root=PARTITIONED_DIR):
+    index_path = os.path.join(root, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    return (pq.read_schema(index_path).metadata or {}).get(FINGERPRINT_KEY, b'').decode()
+
+def load_performance_store():
+    """The partitioned store for the current play-by-play file, rebuilt when the file changes"""
+    # Partitions keep the stored table's dtypes, so a new store format rebuilds them as well
+    fingerprint = f"{source_fingerprint('performance')}:{STORE_FORMAT.decode()}"
+    if _stored_fingerprint() != fingerprint:
+        write_partitions(read_table('performance'), fingerprint=fingerprint)
+    return PerformanceStore()
+
+def synthetic_plays(n_plays, seasons=10, teams=30, shooters_per_team=15, plays_per_game=400, seed=0):
+    """Play-by-play with the columns the Performance tab reads, for benchmarking at archive scale"""
+    rng = np.random.default_rng(seed)
+    game = np.arange(n_plays) // plays_per_game
+    n_games = game[-1] + 1
+    game_season = rng.integers(0, seasons, n_games)
+    game_team = rng.integers(0, teams, (n_games, 2))
+    season = game_season[game]
+    # Half the plays are shots, by either team's roster for that season
+    is_shot = rng.random(n_plays) < 0.5
+    side = rng.integers(0, 2, n_plays)
+    team = game_team[game, side]
+    player = rng.integers(0, shooters_per_team, n_plays)
+    shooter = pd.Categorical.from_codes(
+        np.where(is_shot, (season * teams + team) * shooters_per_team + player, -1),
+        categories=[f"Player {i}" for i in range(seasons * teams * shooters_per_team)],
+    )
+    made = rng.random(n_plays) < 0.45
+    kind = rng.random(n_plays)
+    return pd.DataFrame({
+        'game_id': game.astype('int64'),
+        'play_id': (np.arange(n_plays) % plays_per_game).astype('int64'),
+        'date': pd.Timestamp('2015-11-01') + pd.to_timedelta(season * 365 + game % 150, unit='D'),
+        'shot_team': pd.Categorical.from_codes(np.where(is_shot, team, -1), [f"Team {i}" for i in range(teams)]),
+        'shooter': shooter,
+        'shot_outcome': pd.Categorical(np.where(is_shot, np.where(made, 'made', 'missed'), None)),
+        'three_pt': pd.array(np.where(is_shot, kind < 0.35, None), dtype='boolean'),
+        'free_throw': pd.array(np.where(is_shot, kind > 0.8, None), dtype='boolean'),
+        'scoring_play': is_shot & made,
+    })
+
+def benchmark(sizes, repeats=20, root='/tmp/performance_store_benchmark'):
+    """KPI latency for three shooters: pruned store queries against filtering the whole table"""
+    import time
+    import tempfile
+    from aggregates import build_performance_cubes, performance_kpis
+    columns = ['shooter', 'date', 'shot_outcome', 'three_pt', 'free_throw', 'scoring_play']
+
+    for n_plays in sizes:
+        plays = synthetic_plays(n_plays)
+        start = time.perf_counter()
+        write_partitions(plays, root)
+        build_seconds = time.perf_counter() - start
+        store = PerformanceStore(root)
+        with tempfile.TemporaryDirectory() as tmp:
+            flat_path = os.path.join(tmp, 'performance.parquet')
+            plays.to_parquet(flat_path, index=False)
+            del plays
+
+            rng = np.random.default_rng(1)
+            all_shooters = store.shooters()
+            pruned, full = [], []
+            for _ in range(repeats):
+                shooters = list(rng.choice(all_shooters, 3, replace=False))
+                start = time.perf_counter()
+                performance_kpis(build_performance_cubes(store.query(shooters, columns)), shooters)
+                pruned.append(time.perf_counter() - start)
+                # The previous path: read every play, then filter
+                start = time.perf_counter()
+                performance_data = pd.read_parquet(flat_path, columns=columns)
+                performance_kpis(build_performance_cubes(performance_data[performance_data['shooter'].isin(shooters)]), shooters)
+                full.append(time.perf_counter() - start)
+        print(f"{n_plays:>10,} plays: built {len(store.index['path'].unique())} partitions in {build_seconds:.1f}s; "
+              f"KPI p50 {np.median(pruned) * 1000:.0f} ms pruned vs {np.median(full) * 1000:.0f} ms full scan")
+    shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the partitioned performance store")
+    parser.add_argument('--benchmark', nargs='*', type=int, metavar='PLAYS',
+                        help="benchmark KPI latency on synthetic archives of these sizes (default 1M and 10M plays)")
+    args = parser.parse_args()
+    if args.benchmark is not None:
+        benchmark(args.benchmark or [1_000_000, 10_000_000])
+    else:
+        store = load_performance_store()
+        print(f"{store.index['plays'].sum()} shots by {len(store.shooters())} shooters "
+              f"in {store.index['path'].nunique()} partitions -> {store.root}")
@@ -0,0 +1,117 @@
+import threading
+import time
+from io import BytesIO
+from metrics import span
+
+# All dashboard charts are drawn through render(). Figures come from a small pool of
+# matplotlib Figure objects that pyplot never sees, so nothing accumulates in its global
+# figure registry and memory stays flat no matter how many reruns a server handles.
+# matplotlib is imported on the first render rather than at startup, and each tab's look
+# is an rcParams style applied only while its charts are drawn, never set globally.
+
+MAX_IDLE_FIGURES = 4
+
+# Same output st.pyplot produces
+SAVEFIG_KWARGS = {'bbox_inches': 'tight', 'dpi': 200}
+
+SUBPLOT_PARAMS = ['left', 'bottom', 'right', 'top', 'wspace', 'hspace']
+
+class FigurePool:
+    """Hands out cleared Figure objects and takes them back for reuse"""
+
+    def __init__(self, max_idle=MAX_IDLE_FIGURES):
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.alive = 0
+        self.renders = 0
+        self.bytes_rendered = 0
+        self.render_seconds = 0.0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                fig = self._idle.pop()
+                self.reused += 1
+            else:
+                from matplotlib.figure import Figure
+                fig = Figure()
+                self.created += 1
+                self.alive += 1
+        self._reset(fig)
+        return fig
+
+    def release(self, fig):
+        fig.clear()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(fig)
+            else:
+                self.alive -= 1
+
+    def record(self, image, seconds):
+        with self._lock:
+            self.renders += 1
+            self.bytes_rendered += len(image)
+            self.render_seconds += seconds
+
+    def _reset(self, fig):
+        # A reused figure must look like a new one: drop artists and restore size and layout
+        import matplotlib as mpl
+        fig.clear()
+        fig.set_size_inches(mpl.rcParams['figure.figsize'])
+        fig.set_dpi(mpl.rcParams['figure.dpi'])
+        fig.set_facecolor(mpl.rcParams['figure.facecolor'])
+        fig.set_edgecolor(mpl.rcParams['figure.edgecolor'])
+        fig.subplotpars.update(**{param: mpl.rcParams[f'figure.subplot.{param}'] for param in SUBPLOT_PARAMS})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'figures_created': self.created,
+                'figures_reused': self.reused,
+                'figures_alive': self.alive,
+                'renders': self.renders,
+                'bytes_rendered': self.bytes_rendered,
+                'render_seconds': self.render_seconds,
+            }
+
+figure_pool = FigurePool()
+
+# rcParams are process-wide, so styled renders take turns
+_style_lock = threading.Lock()
+
+def chart_style(theme=None, palette=None, rc=None):
+    """rcParams that differ from matplotlib's defaults after seaborn's `theme`, `palette` and `rc` overrides"""
+    import matplotlib as mpl
+    import seaborn as sns
+    with _style_lock, mpl.rc_context():
+        mpl.rc_file_defaults()
+        defaults = dict(mpl.rcParams)
+        if theme is not None:
+            sns.set_theme(style=theme)
+        if palette is not None:
+            sns.set_palette(palette)
+        mpl.rcParams.update(rc or {})
+        return {key: value for key, value in mpl.rcParams.items() if value != defaults[key]}
+
+def render(draw, fmt='png', style=None, **savefig_kwargs):
+    """Call `draw(fig)` on a pooled figure under the rcParams `style` and return the saved image bytes"""
+    import matplotlib as mpl
+    start = time.perf_counter()
+    with _style_lock, mpl.rc_context(style):
+        fig = figure_pool.acquire()
+        try:
+            with span('draw'):
+                draw(fig)
+            with span('savefig') as saved:
+                buf = BytesIO()
+                fig.savefig(buf, format=fmt, **{**SAVEFIG_KWARGS, **savefig_kwargs})
+                saved.bytes = buf.tell()
+        finally:
+            figure_pool.release(fig)
+    image = buf.getvalue()
+    figure_pool.record(image, time.perf_counter() - start)
+    return image
@@ -0,0 +1,210 @@
+import math
+import random
+from collections import Counter
+import numpy as np
+
+# Mergeable quantile sketches for thresholds like the 75th-percentile trimp. A sketch keeps
+# exact value counts while it has few distinct values (integer load scores usually do), so
+# quantiles match Series.quantile exactly; past EXACT_LIMIT distinct values it switches to a
+# KLL sketch (Karnin, Lang & Liberty) whose memory is O(k) however many sessions it has seen.
+
+DEFAULT_K = 200
+EXACT_LIMIT = 4096
+CAPACITY_DECAY = 2 / 3
+
+def _lerp_quantile(values, counts, q):
+    # Series.quantile(q) (linear interpolation) from sorted distinct values and their counts
+    positions = np.cumsum(counts)
+    # pandas goes through np.percentile, which scales q to a percent and back
+    h = (positions[-1] - 1) * (q * 100 / 100)
+    lower = values[np.searchsorted(positions, np.floor(h), side='right')]
+    upper = values[np.searchsorted(positions, np.ceil(h), side='right')]
+    t = h - np.floor(h)
+    # numpy's lerp, so the result matches pandas to the last bit
+    return upper - (upper - lower) * (1 - t) if t >= 0.5 else lower + (upper - lower) * t
+
+class QuantileSketch:
+    """Streaming quantiles: exact while small, KLL with rank error rank_error() once large"""
+
+    def __init__(self, k=DEFAULT_K, exact_limit=EXACT_LIMIT, seed=0):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.n = 0
+        self._exact = Counter()
+        self._levels = None
+        self._random = random.Random(seed)
+
+    @property
+    def is_exact(self):
+        return self._levels is None
+
+    def update(self, value, count=1):
+        self.n += count
+        if self.is_exact:
+            self._exact[value] += count
+            if len(self._exact) > self.exact_limit:
+                self._to_kll()
+        else:
+            self._insert(value, count)
+            self._compress()
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=float)
+        self.n += len(values)
+        if self.is_exact:
+            distinct, counts = np.unique(values, return_counts=True)
+            self._exact.update(dict(zip(distinct.tolist(), counts.tolist())))
+            if len(self._exact) > self.exact_limit:
+                self._to_kll()
+            return
+        # Fill the bottom level one capacity's worth at a time
+        step = self._capacity(0)
+        for start in range(0, len(values), step):
+            self._levels[0].extend(values[start:start + step].tolist())
+            self._compress()
+
+    def merge(self, other):
+        """Add everything `other` has seen into this sketch"""
+        self.n += other.n
+        if self.is_exact and other.is_exact:
+            self._exact.update(other._exact)
+            if len(self._exact) > self.exact_limit:
+                self._to_kll()
+            return self
+        if self.is_exact:
+            self._to_kll()
+        if other.is_exact:
+            for value, count in other._exact.items():
+                self._insert(value, count)
+        else:
+            while len(self._levels) < len(other._levels):
+                self._levels.append([])
+            for level, items in zip(self._levels, other._levels):
+                level.extend(items)
+        self._compress()
+        return self
+
+    def copy(self):
+        sketch = QuantileSketch(self.k, self.exact_limit)
+        return sketch.merge(self)
+
+    def _weighted(self):
+        # Sorted distinct values and their (possibly estimated) counts
+        if self.is_exact:
+            pairs = sorted(self._exact.items())
+            return np.array([v for v, _ in pairs], dtype=float), np.array([c for _, c in pairs])
+        values = np.concatenate([np.asarray(items, dtype=float) for items in self._levels])
+        weights = np.concatenate([np.full(len(items), 2 ** h) for h, items in enumerate(self._levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        if self.n == 0:
+            return np.nan
+        values, counts = self._weighted()
+        return float(_lerp_quantile(values, counts, q))
+
+    def count_above(self, threshold):
+        values, counts = self._weighted()
+        return int(counts[values > threshold].sum())
+
+    def rank_error(self):
+        """Normalized rank error of quantile() at ~99% confidence; 0 while the sketch is exact"""
+        if self.is_exact:
+            return 0.0
+        # Empirical single-quantile bound for KLL with capacity decay 2/3 (Apache DataSketches)
+        return 2.296 / self.k ** 0.9723
+
+    # KLL internals: level h holds items that each stand for 2**h values
+
+    def _to_kll(self):
+        exact, self._exact = self._exact, Counter()
+        self._levels = [[]]
+        for value, count in exact.items():
+            self._insert(value, count)
+        self._compress()
+
+    def _insert(self, value, count):
+        # A count is a sum of powers of two: put one copy of the value on each matching level
+        h = 0
+        while count:
+            if count & 1:
+                while len(self._levels) <= h:
+                    self._levels.append([])
+                self._levels[h].append(value)
+            count >>= 1
+            h += 1
+
+    def _capacity(self, h):
+        depth = len(self._levels) - h - 1
+        return max(2, int(math.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def _compress(self):
+        while sum(len(items) for items in self._levels) > sum(self._capacity(h) for h in range(len(self._levels))):
+            for h, items in enumerate(self._levels):
+                if len(items) >= self._capacity(h):
+                    if h + 1 == len(self._levels):
+                        self._levels.append([])
+                    items.sort()
+                    # Keep every other item, starting at a random offset, at double the weight
+                    odd = items.pop() if len(items) % 2 else None
+                    self._levels[h + 1].extend(items[self._random.randint(0, 1)::2])
+                    self._levels[h] = [] if odd is None else [odd]
+                    break
+
+class KeyedSketches:
+    """One sketch per key (e.g. player) and per group of keys (e.g. team), mergeable on demand"""
+
+    def __init__(self, k=DEFAULT_K, exact_limit=EXACT_LIMIT):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.by_key = {}
+        self.by_group = {}
+        self.group_keys = {}
+
+    @classmethod
+    def from_frame(cls, df, value_col, key_col, group_col=None, **kwargs):
+        sketches = cls(**kwargs)
+        by = [key_col] if group_col is None else [key_col, group_col]
+        counts = df.groupby(by + [value_col], observed=True).size()
+        for index, count in counts.items():
+            key, group = (index[0], None) if group_col is None else index[:2]
+            sketches.update(key, index[-1], group, count)
+        return sketches
+
+    def _new(self):
+        return QuantileSketch(self.k, self.exact_limit)
+
+    def update(self, key, value, group=None, count=1):
+        self.by_key.setdefault(key, self._new()).update(value, count)
+        if group is not None:
+            self.by_group.setdefault(group, self._new()).update(value, count)
+            self.group_keys.setdefault(group, set()).add(key)
+
+    def sketch_for(self, keys):
+        """Merged sketch over `keys`, using a group's own sketch when the keys are exactly that group"""
+        keys = set(keys)
+        for group, members in self.group_keys.items():
+            if members == keys:
+                return self.by_group[group]
+        merged = self._new()
+        for key in keys:
+            if key in self.by_key:
+                merged.merge(self.by_key[key])
+        return merged
+
+    def merge(self, other):
+        """Add everything `other` has seen into these sketches, key by key and group by group"""
+        for key, sketch in other.by_key.items():
+            self.by_key.setdefault(key, self._new()).merge(sketch)
+        for group, sketch in other.by_group.items():
+            self.by_group.setdefault(group, self._new()).merge(sketch)
+            self.group_keys.setdefault(group, set()).update(other.group_keys[group])
+        return self
+
+    def copy(self):
+        sketches = KeyedSketches(self.k, self.exact_limit)
+        sketches.by_key = {key: sketch.copy() for key, sketch in self.by_key.items()}
+        sketches.by_group = {group: sketch.copy() for group, sketch in self.by_group.items()}
+        sketches.group_keys = {group: set(keys) for group, keys in self.group_keys.items()}
+        return sketches
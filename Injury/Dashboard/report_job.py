@@ -0,0 +1,281 @@
+import html
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from data_store import STORE_DIR
+from headless import Container, HeadlessStreamlit, headless_streamlit
+
+# Static reports for the views staff open every morning. The four data tabs are rendered
+# through their own render functions with Streamlit replaced by a headless stand-in, once
+# for every player and once for every training group and position, with the tab's player
+# multiselect preset to that selection. Each report is a directory holding an index.html
+# plus its chart PNGs. Reports are rendered in a process pool, each worker loading the data
+# once, and the finished set replaces the previous one in a single rename.
+
+REPORT_DIR = os.path.join(STORE_DIR, 'reports')
+
+# Per tab: heading, source table, and the key of its player multiselect
+REPORT_TABS = {
+    'injury': {'title': "Injury History", 'table': 'injury_history', 'key': 'injury_players'},
+    'muscle': {'title': "Muscle Imbalance", 'table': 'muscle_imbalance', 'key': 'muscle_players'},
+    'sessions': {'title': "Sessions", 'table': 'sessions', 'key': 'session_players'},
+    'performance': {'title': "Performance", 'table': 'performance', 'key': 'performance_shooters'},
+}
+
+# Player groupings reported as a whole, by sessions column
+GROUP_COLUMNS = {'groups': 'groupname', 'positions': 'position'}
+
+REPORT_STYLE = """
+body { font-family: sans-serif; color: #333333; margin: 2em; }
+.metrics { display: flex; gap: 1em; flex-wrap: wrap; }
+.metric { border: 1px solid #dddddd; border-radius: 6px; padding: 0.6em 1em; min-width: 10em; }
+.metric .value { font-size: 1.6em; }
+.metric .delta, .caption { color: #777777; font-size: 0.85em; }
+.charts { display: flex; flex-wrap: wrap; gap: 1em; }
+.charts figure { width: 48%; margin: 0; }
+.charts img { width: 100%; }
+table { border-collapse: collapse; font-size: 0.85em; }
+td, th { border: 1px solid #dddddd; padding: 0.2em 0.5em; }
+.error { color: #b00020; }
+"""
+
+_state = None
+
+def _load_tabs():
+    # Each tab's data, cubes and filter index, loaded as Dashboard.py loads them
+    import figure_cache
+    from utils import data_registry
+    from aggregates import build_injury_cubes, build_session_cubes
+    from filter_index import build_filter_index
+    from injury_dashboard import render_injury_tab, INJURY_COLUMNS
+    from muscle_dashboard import render_muscle_tab, build_risk_frame, MUSCLE_COLUMNS
+    from sessions_dashboard import render_sessions_tab, SESSION_COLUMNS
+    from performance_dashboard import render_performance_tab
+    from performance_store import load_performance_store
+
+    # Reports are static files, so every chart is drawn as an image
+    figure_cache.CHART_BACKEND = 'matplotlib'
+    injury_history = data_registry.get('injury_history', INJURY_COLUMNS)
+    injury_cubes = build_injury_cubes(injury_history)
+    injury_index = build_filter_index('injury_history', injury_history)
+    muscle_imbalance = data_registry.get('muscle_imbalance', MUSCLE_COLUMNS)
+    risk_frame = build_risk_frame(muscle_imbalance)
+    muscle_index = build_filter_index('muscle_imbalance', muscle_imbalance)
+    sessions = data_registry.get('sessions', SESSION_COLUMNS)
+    session_cubes = build_session_cubes(sessions)
+    session_index = build_filter_index('sessions', sessions)
+    store = load_performance_store()
+    # The figure cache is bypassed: no two reports show the same selection
+    return {
+        'injury': (injury_index.options('Name'),
+                   lambda col: render_injury_tab(injury_history, col, injury_cubes, None, injury_index)),
+        'muscle': (muscle_index.options('Player Name'),
+                   lambda col: render_muscle_tab(muscle_imbalance, col, risk_frame, None, muscle_index)),
+        'sessions': (session_index.options('name'),
+                     lambda col: render_sessions_tab(sessions, col, session_cubes, None, session_index)),
+        'performance': (store.shooters(), lambda col: render_performance_tab(None, col, store=store)),
+    }
+
+def _tabs():
+    global _state
+    if _state is None:
+        _state = _load_tabs()
+    return _state
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'unnamed'
+
+def plan_reports(tabs=list(REPORT_TABS)):
+    """(kind, name, path, {tab: players}) for every player and every group and position"""
+    from utils import data_registry
+    loaded = _tabs()
+    reports = {}
+    for tab in tabs:
+        for player in loaded[tab][0]:
+            reports.setdefault(player, {})[tab] = [player]
+    planned = [('players', player, selections) for player, selections in sorted(reports.items())]
+
+    # Groups and positions come from the sessions roster; performance has no such grouping
+    roster = data_registry.get('sessions', ['name'] + list(GROUP_COLUMNS.values()))
+    for kind, column in GROUP_COLUMNS.items():
+        for value, players in roster.groupby(column, observed=True)['name'].unique().items():
+            players = set(players)
+            selections = {tab: sorted(players & set(loaded[tab][0])) for tab in tabs if tab != 'performance'}
+            selections = {tab: selected for tab, selected in selections.items() if selected}
+            if selections:
+                planned.append((kind, value, selections))
+
+    # Names differing only in case or punctuation share a slug; later ones get -2, -3, ...
+    paths, reports = set(), []
+    for kind, name, selections in planned:
+        path = base = os.path.join(kind, slug(name))
+        suffix = 2
+        while path in paths:
+            path, suffix = f"{base}-{suffix}", suffix + 1
+        paths.add(path)
+        reports.append((kind, name, path, selections))
+    return reports
+
+def _metric_html(args, kwargs):
+    label = kwargs.get('label', args[0] if args else '')
+    value = kwargs.get('value', args[1] if len(args) > 1 else '')
+    delta = kwargs.get('delta', args[2] if len(args) > 2 else None)
+    delta_html = f'<div class="delta">{html.escape(str(delta))}</div>' if delta is not None else ''
+    return (f'<div class="metric"><div class="label">{html.escape(str(label))}</div>'
+            f'<div class="value">{html.escape(str(value))}</div>{delta_html}</div>')
+
+def section_html(app, tab, directory):
+    """HTML for one rendered tab, writing its charts as PNGs into `directory`; returns (html, charts)"""
+    parts, metrics, figures, charts = [f"<h2>{html.escape(REPORT_TABS[tab]['title'])}</h2>"], [], [], 0
+    title = None
+
+    def flush():
+        # Metrics and charts drawn side by side in columns stay together
+        nonlocal title
+        if metrics:
+            parts.append(f'<div class="metrics">{"".join(metrics)}</div>')
+            metrics.clear()
+        if figures:
+            parts.append(f'<div class="charts">{"".join(figures)}</div>')
+            figures.clear()
+        if title is not None:
+            parts.append(f"<h3>{html.escape(title)}</h3>")
+            title = None
+
+    for name, args, kwargs, where in app.calls:
+        if where == 'filters':
+            continue
+        if name == 'metric':
+            metrics.append(_metric_html(args, kwargs))
+        elif name == 'subheader':
+            # A subheader titles the chart below it, or the table or message after it
+            if title is not None:
+                parts.append(f"<h3>{html.escape(title)}</h3>")
+            title = str(args[0])
+        elif name == 'image':
+            charts += 1
+            file_name = f"{tab}-{charts}.png"
+            with open(os.path.join(directory, file_name), 'wb') as file:
+                file.write(args[0])
+            caption = html.escape(title if title is not None else f"{tab} chart {charts}")
+            figures.append(f'<figure><figcaption>{caption}</figcaption><img src="{file_name}" alt="{caption}"></figure>')
+            title = None
+        elif name in ('write', 'markdown') and isinstance(args[0], str):
+            flush()
+            heading = re.match(r'^#+\s*(.*)$', args[0].strip())
+            parts.append(f"<h3>{html.escape(heading.group(1))}</h3>" if heading else f"<p>{html.escape(args[0])}</p>")
+        elif name == 'dataframe':
+            flush()
+            parts.append(args[0].to_html(index=False, na_rep=''))
+        elif name == 'caption':
+            flush()
+            parts.append(f'<p class="caption">{html.escape(str(args[0]))}</p>')
+        elif name in ('error', 'warning', 'info'):
+            flush()
+            parts.append(f'<p class="error">{html.escape(str(args[0]))}</p>')
+    flush()
+    return '\n'.join(parts), charts
+
+def render_report(kind, name, path, selections, output_dir):
+    """Render one report into output_dir/path; returns its summary"""
+    start = time.perf_counter()
+    loaded = _tabs()
+    directory = os.path.join(output_dir, path)
+    os.makedirs(directory, exist_ok=True)
+    sections, charts, errors = [], 0, []
+    for tab, players in selections.items():
+        app = HeadlessStreamlit({REPORT_TABS[tab]['key']: players})
+        with headless_streamlit(app):
+            loaded[tab][1](Container(app, 'filters'))
+        section, tab_charts = section_html(app, tab, directory)
+        sections.append(section)
+        charts += tab_charts
+        errors.extend(app.errors)
+
+    title = html.escape(f"{name} ({kind[:-1]})")
+    with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title>"
+                   f"<style>{REPORT_STYLE}</style></head>\n<body><p><a href=\"../../index.html\">All reports</a></p>"
+                   f"<h1>{title}</h1>\n" + '\n'.join(sections) + "\n</body></html>\n")
+    return {'kind': kind, 'name': str(name), 'path': path,
+            'tabs': list(selections), 'charts': charts, 'errors': errors, 'seconds': time.perf_counter() - start}
+
+def _write_index(output_dir, results):
+    sections = []
+    for kind in ['players'] + list(GROUP_COLUMNS):
+        links = [f'<li><a href="{html.escape(result["path"])}/index.html">{html.escape(result["name"])}</a></li>'
+                 for result in sorted(results, key=lambda result: result['name']) if result['kind'] == kind]
+        if links:
+            sections.append(f"<h2>{kind.capitalize()}</h2><ul>{''.join(links)}</ul>")
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>SlamCuse reports</title>"
+                   f"<style>{REPORT_STYLE}</style></head>\n<body><h1>SlamCuse reports</h1>\n"
+                   + '\n'.join(sections) + "\n</body></html>\n")
+
+def run_reports(output_dir=REPORT_DIR, tabs=list(REPORT_TABS), workers=None, log=print):
+    """Render every report in parallel and swap the finished set in at `output_dir`; returns the summary"""
+    start = time.perf_counter()
+    planned = plan_reports(tabs)
+    tmp_dir = output_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers == 1:
+        for report in planned:
+            results.append(render_report(*report, tmp_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_report, *report, tmp_dir) for report in planned]
+            for future in as_completed(futures):
+                results.append(future.result())
+    for result in results:
+        for error in result['errors']:
+            log(f"{result['kind']}/{result['name']}: {error}")
+
+    seconds = time.perf_counter() - start
+    players = sum(result['kind'] == 'players' for result in results)
+    summary = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'workers': workers,
+        'seconds': seconds,
+        'reports': len(results),
+        'players': players,
+        'charts': sum(result['charts'] for result in results),
+        'players_per_minute': players * 60 / seconds if seconds else 0.0,
+        'errors': sum(len(result['errors']) for result in results),
+        'results': sorted(results, key=lambda result: (result['kind'], result['name'])),
+    }
+    _write_index(tmp_dir, results)
+    with open(os.path.join(tmp_dir, 'summary.json'), 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+
+    # Swap the finished reports in so nobody opens a half-written set
+    old_dir = output_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+    import warnings
+    parser = argparse.ArgumentParser(description="Render static per-player, group and position reports of the dashboard tabs")
+    parser.add_argument('--output-dir', default=REPORT_DIR, help="where to write the reports")
+    parser.add_argument('--tabs', nargs='+', default=list(REPORT_TABS), choices=list(REPORT_TABS))
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    summary = run_reports(args.output_dir, args.tabs, args.workers)
+    print(f"{summary['reports']} reports ({summary['players']} players) with {summary['charts']} charts "
+          f"in {summary['seconds']:.1f}s on {summary['workers']} worker(s): "
+          f"{summary['players_per_minute']:.0f} players/minute -> {os.path.join(args.output_dir, 'index.html')}")
+    if summary['errors']:
+        print(f"{summary['errors']} tab(s) reported errors")
@@ -0,0 +1,238 @@
+import json
+import socket
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+import pandas as pd
+from data_store import TABLES
+from quantile_sketch import KeyedSketches
+
+# Live wearable sessions. Devices append one JSON object per session, with the same fields
+# as the sessions table, to a file or a local TCP feed. Each accepted session is added into
+# the session cubes in place of re-reading the history, so the Sessions tab KPIs, weekly
+# charts and the trimp high-risk threshold stay current; the latest sessions are also kept as
+# rows for the charts and table drawn from rows. Memory is bounded by players x weeks (cubes),
+# the trimp quantile sketches and that fixed window of rows. A missing file or a dropped
+# connection is retried until the stream is stopped, and a file feed resumes where it left off.
+# Live sessions are kept apart from the history's cubes, so when the sessions CSV is edited the
+# stream is reseeded with the new history and keeps everything received so far on top of it.
+
+SESSION_SCHEMA = TABLES['sessions']
+RECENT_SESSIONS = 1000
+POLL_SECONDS = 1.0
+RETRY_SECONDS = 5.0
+
+WEEKLY_STATS = ['sessions', 'durations_sum', 'durations_sumsq', 'trimp_sum', 'trimp_sumsq']
+
+def validate_session(record):
+    """Coerce a feed record to the sessions schema, raising ValueError if it doesn't fit"""
+    if not isinstance(record, dict):
+        raise ValueError("session must be a JSON object")
+    missing = [col for col in SESSION_SCHEMA['columns'] if col not in record]
+    if missing:
+        raise ValueError(f"missing fields: {missing}")
+
+    session = {}
+    for col, dtype in SESSION_SCHEMA['columns'].items():
+        value = record[col]
+        if col in SESSION_SCHEMA['dates']:
+            session[col] = pd.Timestamp(datetime.strptime(value, SESSION_SCHEMA['dates'][col]))
+        elif dtype == 'int64':
+            if isinstance(value, bool) or not float(value).is_integer():
+                raise ValueError(f"{col} must be an integer, got {value!r}")
+            session[col] = int(value)
+        elif dtype == 'float64':
+            session[col] = float(value)
+        else:
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"{col} must be a non-empty string, got {value!r}")
+            session[col] = value
+    return session
+
+def tail_file(path, stop, offset=0, poll_seconds=POLL_SECONDS):
+    """Yield complete lines appended to `path` after byte `offset` until `stop` is set"""
+    # Line endings are kept as written, so the bytes of the yielded lines add up to the offset
+    with open(path, 'r', encoding='utf-8', newline='') as feed:
+        feed.seek(offset)
+        partial = ''
+        while not stop.is_set():
+            chunk = feed.readline()
+            if not chunk:
+                time.sleep(poll_seconds)
+                continue
+            partial += chunk
+            # A writer may be mid-line; wait for the newline before parsing
+            if partial.endswith('\n'):
+                yield partial
+                partial = ''
+
+def socket_lines(host, port, stop):
+    """Yield lines sent on a local TCP feed until it closes or `stop` is set"""
+    with socket.create_connection((host, port)) as conn:
+        conn.settimeout(POLL_SECONDS)
+        buffer = b''
+        while not stop.is_set():
+            try:
+                data = conn.recv(65536)
+            except socket.timeout:
+                continue
+            if not data:
+                if buffer:
+                    yield buffer.decode('utf-8')
+                return
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line.decode('utf-8')
+
+def feed_lines(source, stop, offset=0):
+    # 'tcp://host:port' for a socket feed, anything else is a file path read from byte `offset`
+    if source.startswith('tcp://'):
+        host, port = source[len('tcp://'):].rsplit(':', 1)
+        return socket_lines(host, int(port), stop)
+    return tail_file(source, stop, offset)
+
+class SessionStream:
+    """Session cubes kept current from a live feed, starting from the cubes of the history"""
+
+    def __init__(self, cubes, recent_size=RECENT_SESSIONS, base_version=None):
+        self._lock = threading.Lock()
+        self._base = cubes
+        self.base_version = base_version
+        # Live sessions only; added to the base cubes when cubes() is asked for
+        self._weekly = {}
+        self._day_of_week = Counter()
+        base_sketches = cubes['trimp_sketches']
+        self._trimp_sketches = KeyedSketches(base_sketches.k, base_sketches.exact_limit)
+        self.recent = deque(maxlen=recent_size)
+        self.accepted = 0
+        self.rejected = 0
+        self.last_error = None
+        # Why the feed is currently unavailable, cleared when lines arrive again
+        self.feed_error = None
+        self.retries = 0
+        self._offset = 0
+        self.version = 0
+        self._cubes = None
+        self._cubes_version = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, session):
+        """Add one validated session to the cubes"""
+        name, date = session['name'], session['session_date']
+        # Same bucket as aggregates._week_ending: the Sunday that ends the week
+        week = date.normalize() + timedelta(days=6 - date.weekday())
+        durations, trimp = session['durations'], session['trimp']
+        with self._lock:
+            stats = self._weekly.setdefault((name, week), [0] * len(WEEKLY_STATS))
+            for i, value in enumerate([1, durations, float(durations) ** 2, trimp, float(trimp) ** 2]):
+                stats[i] += value
+            self._day_of_week[(name, date.day_name())] += 1
+            self._trimp_sketches.update(name, trimp, session['groupname'])
+            self.recent.append(session)
+            self.accepted += 1
+            self.version += 1
+
+    def reseed(self, cubes, base_version):
+        """Replace the history's cubes, e.g. after the sessions CSV was reloaded, keeping live sessions"""
+        with self._lock:
+            self._base = cubes
+            self.base_version = base_version
+            self.version += 1
+
+    def consume(self, lines):
+        """Validate and add each JSON line; bad lines are counted and skipped"""
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                session = validate_session(json.loads(line))
+            except (ValueError, TypeError) as e:
+                # json.JSONDecodeError is a ValueError too
+                with self._lock:
+                    self.rejected += 1
+                    self.last_error = str(e)
+                continue
+            self.add(session)
+
+    def cubes(self):
+        """Current cubes, in the same shape as aggregates.build_session_cubes"""
+        with self._lock:
+            if self._cubes_version != self.version:
+                weekly = {
+                    (row.name, row.week): [getattr(row, stat) for stat in WEEKLY_STATS]
+                    for row in self._base['weekly'].itertuples(index=False)
+                }
+                for key, stats in self._weekly.items():
+                    weekly[key] = [base + live for base, live in zip(weekly.get(key, [0] * len(WEEKLY_STATS)), stats)]
+                day_of_week = Counter({
+                    (row.name, row.day_of_week): row.sessions
+                    for row in self._base['day_of_week'].itertuples(index=False)
+                })
+                day_of_week.update(self._day_of_week)
+                weekly = pd.DataFrame(
+                    [(name, week, *stats) for (name, week), stats in weekly.items()],
+                    columns=['name', 'week'] + WEEKLY_STATS,
+                )
+                day_of_week = pd.DataFrame(
+                    [(name, day, count) for (name, day), count in day_of_week.items()],
+                    columns=['name', 'day_of_week', 'sessions'],
+                )
+                # A new object, so readers never see the sketches change under them
+                self._cubes = {'weekly': weekly, 'day_of_week': day_of_week,
+                               'trimp_sketches': self._base['trimp_sketches'].copy().merge(self._trimp_sketches)}
+                self._cubes_version = self.version
+            return self._cubes
+
+    def recent_sessions(self):
+        with self._lock:
+            return pd.DataFrame(list(self.recent), columns=list(SESSION_SCHEMA['columns']))
+
+    def start(self, source):
+        """Consume `source` (a file path or tcp://host:port) on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(source,), daemon=True)
+        self._thread.start()
+
+    def _lines(self, source):
+        for line in feed_lines(source, self._stop, self._offset):
+            # Bytes read so far, so a reopened file feed skips what was already consumed
+            self._offset += len(line.encode('utf-8'))
+            if self.feed_error is not None:
+                with self._lock:
+                    self.feed_error = None
+            yield line
+
+    def _run(self, source):
+        while not self._stop.is_set():
+            try:
+                self.consume(self._lines(source))
+                error = "feed closed"
+            except OSError as e:
+                error = str(e)
+            if self._stop.is_set():
+                return
+            with self._lock:
+                self.last_error = self.feed_error = error
+                self.retries += 1
+            self._stop.wait(RETRY_SECONDS)
+
+    def stop(self):
+        self._stop.set()
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+def start_session_stream(source, cubes, base_version=None):
+    """The process-wide stream for `source`, started from `cubes` and reseeded when `base_version` changes"""
+    with _streams_lock:
+        if source not in _streams:
+            _streams[source] = SessionStream(cubes, base_version=base_version)
+            _streams[source].start(source)
+        elif _streams[source].base_version != base_version:
+            _streams[source].reseed(cubes, base_version)
+        return _streams[source]
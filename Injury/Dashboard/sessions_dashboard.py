@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 from filters import session_filters
+from utils import drop_unused_categories
+from aggregates import (build_session_cubes, session_kpis, sessions_over_time, sessions_per_player, sessions_by_day,
+                        trimp_threshold, sessions_above)
+from figure_cache import show_figure, selection_key
+from metrics import span
+from plotting import chart_style
+from vega_charts import sessions_over_time_chart, duration_distribution_chart
 
-# Set consistent style for plots and custom color palette
-sns.set_theme(style="whitegrid")
+# Columns of the sessions table this tab reads
+SESSION_COLUMNS = ['name', 'session_date', 'durations', 'trimp', 'groupname']
+
+# Consistent style for plots with a custom color palette, applied while they are drawn
 custom_palette = ["#E74C3C", "#D35400", "#2980B9", "#8E44AD", "#BDC3C7"]
-plt.rcParams.update({
+CHART_STYLE = chart_style(theme="whitegrid", palette=custom_palette, rc={
     'font.size': 14,
     'axes.labelsize': 14,
     'axes.titlesize': 16,
@@ -19,44 +27,111 @@ plt.rcParams.update({
     'axes.edgecolor': '#333333',
     'text.color': '#333333'
 })
-sns.set_palette(custom_palette)
 
-def render_sessions_tab(session_data, filter_col):
+def draw_sessions_over_time(fig, weekly_sessions):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    weekly_sessions.plot(kind='line', ax=ax, color=custom_palette[0])
+    ax.set_title("Sessions Over Time", fontsize=16, weight='bold')
+    ax.set_xlabel("Date", fontsize=13)
+    ax.set_ylabel("Number of Sessions", fontsize=13)
+    ax.tick_params(axis='x', rotation=45)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def draw_duration_distribution(fig, filtered_data):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    sns.histplot(filtered_data['durations'], kde=True, ax=ax, color=custom_palette[1], edgecolor="black", alpha=0.8)
+    ax.set_title("Session Duration", fontsize=16, weight='bold')
+    ax.set_xlabel("Duration (mins)", fontsize=13)
+    ax.set_ylabel("Frequency", fontsize=13)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def draw_high_risk_over_time(fig, high_risk_sessions_over_time):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    high_risk_sessions_over_time.plot(kind='area', ax=ax, color=custom_palette[2], alpha=0.4)
+    ax.set_title("High-Risk Sessions Over Time", fontsize=16, weight='bold')
+    ax.set_xlabel("Date", fontsize=13)
+    ax.set_ylabel("High-Risk Sessions", fontsize=13)
+    ax.tick_params(axis='x', rotation=45)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def draw_sessions_per_player(fig, attendance_count):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    sns.barplot(x=attendance_count.index, y=attendance_count.values, ax=ax, palette=custom_palette)
+    ax.set_title("Sessions per Player", fontsize=16, weight='bold')
+    ax.set_xlabel("Player", fontsize=13)
+    ax.set_ylabel("Sessions", fontsize=13)
+    ax.tick_params(axis='x', rotation=45)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def draw_sessions_by_day(fig, day_counts):
+    fig.set_size_inches(5, 3)
+    ax = fig.subplots()
+    sns.barplot(x=day_counts.index, y=day_counts.values, ax=ax, palette=custom_palette)
+    ax.set_title("Sessions by Day of the Week", fontsize=16, weight='bold')
+    ax.set_xlabel("Day", fontsize=13)
+    ax.set_ylabel("Sessions", fontsize=13)
+    ax.tick_params(axis='x', rotation=45)
+    sns.despine(ax=ax, left=True, bottom=True)
+
+def render_sessions_tab(session_data, filter_col, cubes=None, data_version=None, index=None, live_sessions=None):
     try:
         # Ensure data is available
         if session_data is None or len(session_data) == 0:
             st.error("No valid session data available")
             return
 
-        # Convert 'session_date' to datetime format
-        session_data['session_date'] = pd.to_datetime(session_data['session_date'])
+        # Convert 'session_date' to datetime format if it was not parsed on load
+        if not pd.api.types.is_datetime64_any_dtype(session_data['session_date']):
+            session_data = session_data.assign(session_date=pd.to_datetime(session_data['session_date']))
 
         # Get filter selections
-        selected_players, filtered_data = session_filters(session_data, filter_col)
+        selected_players, filtered_data = session_filters(session_data, filter_col, index)
 
         # Filter data based on selections
-        filtered_data = filtered_data[filtered_data['name'].isin(selected_players)]
+        with span('filter') as filtered:
+            if index is not None:
+                filtered_data = index.take(filtered_data, {'name': selected_players})
+            else:
+                filtered_data = filtered_data[filtered_data['name'].isin(selected_players)]
+            if live_sessions is not None and len(live_sessions):
+                # Streamed sessions are in the cubes already; add them to the row-based charts and table too
+                live = live_sessions[live_sessions['name'].isin(selected_players)]
+                live.index = pd.RangeIndex(len(session_data), len(session_data) + len(live))
+                filtered_data = pd.concat([filtered_data, live[list(filtered_data.columns)]])
+            filtered_data = filtered_data.pipe(drop_unused_categories)
+            filtered.count(filtered_data)
 
-        # Calculate high-risk threshold using the 75th percentile
-        high_risk_threshold = filtered_data['trimp'].quantile(0.75)
+        # KPIs and the count charts come from pre-aggregated cubes, not the raw rows
+        with span('aggregate'):
+            if cubes is None:
+                cubes = build_session_cubes(session_data)
+            kpis = session_kpis(cubes, selected_players)
+
+            # Calculate high-risk threshold using the 75th percentile
+            high_risk_threshold = trimp_threshold(cubes, selected_players, 0.75)
 
         # KPIs
         st.write("### Key Performance Indicators")
         kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
         
         with kpi_col1:
-            st.metric(label="Total Sessions", value=len(filtered_data))
+            st.metric(label="Total Sessions", value=kpis['total_sessions'])
         
         with kpi_col2:
-            avg_duration = filtered_data['durations'].mean()
+            avg_duration = kpis['avg_duration']
             st.metric(label="Avg Duration (mins)", value=f"{avg_duration:.1f}")
         
         with kpi_col3:
-            high_risk_sessions = len(filtered_data[filtered_data['trimp'] > high_risk_threshold])
+            with span('aggregate', chart='high_risk_sessions'):
+                high_risk_sessions = sessions_above(cubes, selected_players, high_risk_threshold)
             st.metric(label="High Risk Sessions", value=high_risk_sessions)
         
         with kpi_col4:
-            unique_players = filtered_data['name'].nunique()
+            unique_players = kpis['unique_players']
             st.metric(label="Unique Players", value=unique_players)
 
         # Visualizations
@@ -64,76 +139,54 @@ def render_sessions_tab(session_data, filter_col):
         row2_col1, row2_col2 = st.columns(2)
         row3_col1, row3_col2 = st.columns(2)
 
+        selection = selection_key(selected_players)
+
         # Sessions Over Time
         with row1_col1:
             st.subheader("Sessions Over Time")
-            sessions_over_time = filtered_data.set_index('session_date').groupby(pd.Grouper(freq='W')).size()
-            fig, ax = plt.subplots(figsize=(5, 3))
-            sessions_over_time.plot(kind='line', ax=ax, color=custom_palette[0])
-            ax.set_title("Sessions Over Time", fontsize=16, weight='bold')
-            ax.set_xlabel("Date", fontsize=13)
-            ax.set_ylabel("Number of Sessions", fontsize=13)
-            ax.tick_params(axis='x', rotation=45)
-            sns.despine(left=True, bottom=True)
-            st.pyplot(fig)
+            with span('aggregate', chart='sessions_over_time'):
+                weekly_sessions = sessions_over_time(cubes, selected_players)
+            show_figure('sessions', 'sessions_over_time', selection, data_version,
+                        lambda fig: draw_sessions_over_time(fig, weekly_sessions),
+                        vega=lambda: sessions_over_time_chart(weekly_sessions), style=CHART_STYLE)
 
         # Distribution of Durations
         with row1_col2:
             st.subheader("Duration Distribution")
-            fig, ax = plt.subplots(figsize=(5, 3))
-            sns.histplot(filtered_data['durations'], kde=True, ax=ax, color=custom_palette[1], edgecolor="black", alpha=0.8)
-            ax.set_title("Session Duration", fontsize=16, weight='bold')
-            ax.set_xlabel("Duration (mins)", fontsize=13)
-            ax.set_ylabel("Frequency", fontsize=13)
-            sns.despine(left=True, bottom=True)
-            st.pyplot(fig)
+            show_figure('sessions', 'duration_distribution', selection, data_version,
+                        lambda fig: draw_duration_distribution(fig, filtered_data),
+                        vega=lambda: duration_distribution_chart(filtered_data['durations']), style=CHART_STYLE)
 
         # High-Risk Sessions Over Time
         with row2_col1:
             st.subheader("High-Risk Sessions Over Time")
-            high_risk_sessions_over_time = filtered_data[filtered_data['trimp'] > high_risk_threshold].set_index('session_date').groupby(pd.Grouper(freq='W')).size()
-            fig, ax = plt.subplots(figsize=(5, 3))
-            high_risk_sessions_over_time.plot(kind='area', ax=ax, color=custom_palette[2], alpha=0.4)
-            ax.set_title("High-Risk Sessions Over Time", fontsize=16, weight='bold')
-            ax.set_xlabel("Date", fontsize=13)
-            ax.set_ylabel("High-Risk Sessions", fontsize=13)
-            ax.tick_params(axis='x', rotation=45)
-            sns.despine(left=True, bottom=True)
-            st.pyplot(fig)
+            with span('aggregate', chart='high_risk_over_time'):
+                high_risk_sessions_over_time = filtered_data[filtered_data['trimp'] > high_risk_threshold].set_index('session_date').groupby(pd.Grouper(freq='W')).size()
+            show_figure('sessions', 'high_risk_over_time', selection, data_version,
+                        lambda fig: draw_high_risk_over_time(fig, high_risk_sessions_over_time), style=CHART_STYLE)
 
         # Player Attendance Distribution
         with row2_col2:
             st.subheader("Player Attendance Distribution")
-            attendance_count = filtered_data['name'].value_counts()
-            fig, ax = plt.subplots(figsize=(5, 3))
-            sns.barplot(x=attendance_count.index, y=attendance_count.values, ax=ax, palette=custom_palette)
-            ax.set_title("Sessions per Player", fontsize=16, weight='bold')
-            ax.set_xlabel("Player", fontsize=13)
-            ax.set_ylabel("Sessions", fontsize=13)
-            ax.tick_params(axis='x', rotation=45)
-            sns.despine(left=True, bottom=True)
-            st.pyplot(fig)
+            with span('aggregate', chart='sessions_per_player'):
+                attendance_count = sessions_per_player(cubes, selected_players)
+            show_figure('sessions', 'sessions_per_player', selection, data_version,
+                        lambda fig: draw_sessions_per_player(fig, attendance_count), style=CHART_STYLE)
 
         # Sessions by Day of the Week
         with row3_col2:
             st.subheader("Sessions by Day of the Week")
-            filtered_data['Day_of_Week'] = filtered_data['session_date'].dt.day_name()
-            day_counts = filtered_data['Day_of_Week'].value_counts()
-            fig, ax = plt.subplots(figsize=(5, 3))
-            sns.barplot(x=day_counts.index, y=day_counts.values, ax=ax, palette=custom_palette)
-            ax.set_title("Sessions by Day of the Week", fontsize=16, weight='bold')
-            ax.set_xlabel("Day", fontsize=13)
-            ax.set_ylabel("Sessions", fontsize=13)
-            ax.tick_params(axis='x', rotation=45)
-            sns.despine(left=True, bottom=True)
-            st.pyplot(fig)
+            with span('aggregate', chart='sessions_by_day'):
+                day_counts = sessions_by_day(cubes, selected_players)
+            show_figure('sessions', 'sessions_by_day', selection, data_version,
+                        lambda fig: draw_sessions_by_day(fig, day_counts), style=CHART_STYLE)
             
         # Display session details table
         st.subheader("Session Details")
-        st.dataframe(
-            filtered_data[['name', 'session_date', 'durations', 'trimp']],
-            use_container_width=True
-        )
+        with span('table') as table:
+            details = filtered_data[['name', 'session_date', 'durations', 'trimp']]
+            table.count(details)
+            st.dataframe(details, use_container_width=True)
             
     except Exception as e:
         st.error(f"An error occurred in render_sessions_tab: {str(e)}")
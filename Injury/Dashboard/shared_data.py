@@ -0,0 +1,216 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from data_store import TABLES, STORE_FORMAT, read_table, source_fingerprint
+
+# One copy of the tables for every dashboard process on the machine. A loader process
+# (`python shared_data.py`, or with --watch to follow CSV changes) writes each table as an uncompressed Arrow IPC file,
+# normally under /dev/shm, and DASHBOARD_SHARED_DATA=<dir> makes dashboard processes
+# memory-map those files instead of reading the store. Numeric and date columns become
+# read-only pandas views of the mapped pages, so they are shared through the page cache
+# rather than copied per process; categorical codes and strings are still converted locally.
+# A table whose source CSV changed since it was published is read from the store instead.
+
+SHARED_DIR = os.environ.get('DASHBOARD_SHARED_DATA')
+DEFAULT_DIR = '/dev/shm/slamcuse' if os.path.isdir('/dev/shm') else 'Injury/Data/store/shared'
+MANIFEST_FILE = 'manifest.json'
+WATCH_SECONDS = 5.0
+
+def _arrow_table(df):
+    # Float NaN is kept as a value rather than an Arrow null, so float columns attach without a copy
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        if df[col].dtype.kind == 'f':
+            table = table.set_column(i, col, pa.array(df[col].to_numpy(), from_pandas=False))
+    return table
+
+def _write_atomic(path, write):
+    tmp_path = path + '.tmp'
+    write(tmp_path)
+    # Processes still mapping the old file keep reading it until they reattach
+    os.replace(tmp_path, path)
+
+def publish(root=DEFAULT_DIR, tables=None):
+    """Write `tables` (default all), lazy columns included, as Arrow files under `root`; returns the manifest"""
+    os.makedirs(root, exist_ok=True)
+    # Tables not republished keep their entries
+    previous = SharedTables(root).manifest()
+    manifest = {'format': STORE_FORMAT.decode(), 'published': time.time(), 'tables': {}}
+    if previous is not None and previous.get('format') == manifest['format']:
+        manifest['tables'].update(previous['tables'])
+    for table in tables or TABLES:
+        fingerprint = source_fingerprint(table)
+        arrow_table = _arrow_table(read_table(table, list(TABLES[table]['columns'])))
+        path = os.path.join(root, f"{table}.arrow")
+
+        def write(tmp_path):
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with ipc.new_file(sink, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+        _write_atomic(path, write)
+        manifest['tables'][table] = {'file': os.path.basename(path), 'fingerprint': fingerprint,
+                                     'rows': arrow_table.num_rows, 'bytes': os.path.getsize(path)}
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+    _write_atomic(os.path.join(root, MANIFEST_FILE), write_manifest)
+    return manifest
+
+def watch(root=DEFAULT_DIR, interval=WATCH_SECONDS, log=print):
+    """Publish, then republish whenever a source CSV changes, until interrupted"""
+    published = {}
+    while True:
+        current = {table: source_fingerprint(table) for table in TABLES}
+        changed = [table for table in TABLES if published.get(table) != current[table]]
+        if changed:
+            publish(root, changed)
+            published.update(current)
+            log(f"published {', '.join(changed)} to {root}")
+        time.sleep(interval)
+
+class SharedTables:
+    """Read-only, memory-mapped views of the tables a loader process published under `root`"""
+
+    def __init__(self, root):
+        self.root = root
+        self._mapped = {}
+
+    def manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_FILE), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def current(self, table):
+        """The published entry for `table` if it matches the source CSV, otherwise None"""
+        manifest = self.manifest()
+        if manifest is None or manifest.get('format') != STORE_FORMAT.decode():
+            return None
+        entry = manifest['tables'].get(table)
+        if entry is None or entry['fingerprint'] != source_fingerprint(table):
+            return None
+        return entry
+
+    def _arrow(self, table, entry):
+        # One mapping per published file; a republished file is mapped afresh
+        path = os.path.join(self.root, entry['file'])
+        key = (table, entry['fingerprint'], os.stat(path).st_ino)
+        if self._mapped.get(table, (None,))[0] != key:
+            self._mapped[table] = (key, ipc.open_file(pa.memory_map(path, 'r')).read_all())
+        return self._mapped[table][1]
+
+    def read(self, table, columns=None):
+        """The published table as pandas, sharing numeric buffers with the mapped file; None if not current"""
+        entry = self.current(table)
+        if entry is None:
+            return None
+        spec = TABLES[table]
+        if columns is None:
+            columns = [col for col in spec['columns'] if col not in spec['lazy']]
+        return self._arrow(table, entry).select(list(columns)).to_pandas(split_blocks=True)
+
+shared_tables = SharedTables(SHARED_DIR) if SHARED_DIR else None
+
+def load_table(table, columns=None):
+    """A table from the shared copy when one is published and current, otherwise from the store"""
+    if shared_tables is not None:
+        df = shared_tables.read(table, columns)
+        if df is not None:
+            return df
+    return read_table(table, columns)
+
+def _memory_kb():
+    # Proportional and private resident memory of this process, from smaps_rollup (Linux)
+    fields = {}
+    with open('/proc/self/smaps_rollup', 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'pss_kb': fields['Pss'], 'private_kb': fields['Private_Clean'] + fields['Private_Dirty']}
+
+def _sources(data_root):
+    # The synthetic CSVs under `data_root` when benchmarking at scale, else the real ones
+    if data_root is None:
+        return nullcontext()
+    from benchmarks import synthetic_sources
+    return synthetic_sources(data_root)
+
+def _worker(mode, root, data_root, ready, done):
+    # One stand-in dashboard process: load every table, report its memory, wait until all are measured
+    with _sources(data_root):
+        baseline = _memory_kb()
+        start = time.perf_counter()
+        if mode == 'shared':
+            tables = SharedTables(root)
+            frames = [tables.read(table) for table in TABLES]
+        else:
+            frames = [read_table(table) for table in TABLES]
+        seconds = time.perf_counter() - start
+        # Touch every numeric value, as the tabs' aggregations do
+        for frame in frames:
+            frame.select_dtypes('number').sum()
+        loaded = _memory_kb()
+    ready.put({'seconds': seconds, 'pss_kb': loaded['pss_kb'] - baseline['pss_kb'],
+               'private_kb': loaded['private_kb'] - baseline['private_kb']})
+    done.wait()
+
+def benchmark(workers=4, root=DEFAULT_DIR, scale=None):
+    """Load time and added memory per worker process: attaching the shared copy against reading the store"""
+    import multiprocessing
+    from data_store import parse_csv
+    data_root = None
+    if scale is not None:
+        from benchmarks import dataset_root
+        data_root = dataset_root(scale)
+    with _sources(data_root):
+        start = time.perf_counter()
+        for table in TABLES:
+            parse_csv(table)
+        parse_seconds = time.perf_counter() - start
+        publish(root)
+        for table in TABLES:
+            read_table(table)
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in ['store', 'shared']:
+        ready, done = context.Queue(), context.Event()
+        processes = [context.Process(target=_worker, args=(mode, root, data_root, ready, done)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        results[mode] = [ready.get() for _ in processes]
+        done.set()
+        for process in processes:
+            process.join()
+    return parse_seconds, results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Publish the tables as memory-mapped Arrow files shared by dashboard processes")
+    parser.add_argument('--dir', default=SHARED_DIR or DEFAULT_DIR, help=f"where to publish (default {DEFAULT_DIR})")
+    parser.add_argument('--watch', action='store_true', help="keep running and republish when a source CSV changes")
+    parser.add_argument('--benchmark', type=int, metavar='WORKERS',
+                        help="compare load time and memory of this many worker processes, shared against separate copies")
+    parser.add_argument('--scale', type=int, help="benchmark on the synthetic data at this multiple (see benchmarks.py)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        parse_seconds, results = benchmark(args.benchmark, args.dir, args.scale)
+        print(f"parsing the CSVs: {parse_seconds * 1000:.0f} ms")
+        for mode, rows in results.items():
+            summary = pd.DataFrame(rows)
+            print(f"{mode:>6}: load {summary['seconds'].median() * 1000:.1f} ms per worker, "
+                  f"{summary['private_kb'].mean() / 1024:.1f} MB private and {summary['pss_kb'].sum() / 1024:.1f} MB "
+                  f"proportional for {len(rows)} workers")
+    elif args.watch:
+        watch(args.dir)
+    else:
+        for table, entry in publish(args.dir)['tables'].items():
+            print(f"{table}: {entry['rows']} rows, {entry['bytes'] / 2**20:.2f} MB -> {os.path.join(args.dir, entry['file'])}")
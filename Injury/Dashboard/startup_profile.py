@@ -0,0 +1,159 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import streamlit as st
+
+# Cold-start instrumentation. Run this file to import the dashboard and draw its first page in
+# fresh interpreters, report per-module import time and first-paint time, and with --check fail
+# when either is slower than the committed baseline. With DASHBOARD_PROFILE_STARTUP=1 a running
+# dashboard also shows its own first paint and which heavy packages each tab pulled in.
+
+PROFILE_STARTUP = os.environ.get('DASHBOARD_PROFILE_STARTUP') == '1'
+
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(DASHBOARD_DIR))
+BASELINE_PATH = os.path.join(DASHBOARD_DIR, 'startup_baseline.json')
+
+# Packages that take a noticeable part of a second or more to import
+HEAVY_MODULES = ['pyarrow', 'matplotlib', 'seaborn', 'scipy', 'sklearn', 'imblearn', 'shap']
+
+# Slowdown over the baseline tolerated by --check; cold starts vary by several percent run to run
+TOLERANCE = 0.25
+
+def loaded_heavy_modules():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+class StartupTimer:
+    """First-paint time of this process and the heavy packages each tab's first run imported"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_paint_seconds = None
+        self.loaded = loaded_heavy_modules()
+        self.tab_imports = {}
+
+    def first_paint(self, filter_col):
+        if self.first_paint_seconds is None:
+            self.first_paint_seconds = time.perf_counter() - self.started
+        tab = st.session_state.get('active_tab', 0)
+        if tab not in self.tab_imports:
+            self.tab_imports[tab] = [name for name in loaded_heavy_modules() if name not in self.loaded]
+            self.loaded = loaded_heavy_modules()
+        if not PROFILE_STARTUP:
+            return
+        with filter_col:
+            with st.expander("Startup profile"):
+                st.caption(f"first paint: {self.first_paint_seconds * 1000:.0f} ms after the first import")
+                for tab, modules in self.tab_imports.items():
+                    st.caption(f"tab {tab} imported: {', '.join(modules) or 'nothing heavy'}")
+
+startup_timer = StartupTimer()
+
+def _python(*args):
+    # Fresh interpreter in the repo root, the working directory the dashboard's paths assume
+    env = {**os.environ, 'PYTHONPATH': DASHBOARD_DIR, 'PYTHONWARNINGS': 'ignore'}
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+
+def import_times(module='Dashboard'):
+    """Self and cumulative import seconds of every module `module` imports, from -X importtime"""
+    result = _python('-X', 'importtime', '-c', f'import {module}')
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_seconds': int(self_us) / 1e6,
+            'cumulative_seconds': int(cumulative_us) / 1e6,
+        })
+    return rows
+
+def _first_paint_worker():
+    import warnings
+    warnings.simplefilter('ignore')
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(DASHBOARD_DIR, 'Dashboard.py'), default_timeout=300)
+    start = time.perf_counter()
+    app.run()
+    seconds = time.perf_counter() - start
+    # What the run imported before painting; the model preload thread starts after it
+    timer = sys.modules['startup_profile'].startup_timer
+    result = {'first_paint_seconds': seconds, 'heavy_modules': timer.tab_imports.get(0, []),
+              'errors': [element.value for element in app.error] + [str(element.value) for element in app.exception]}
+    print(json.dumps(result))
+
+def first_paint():
+    """Seconds for a fresh process to run the dashboard script once, plus the heavy packages it imported"""
+    return json.loads(_python(os.path.abspath(__file__), '--first-paint-worker').stdout.strip().splitlines()[-1])
+
+def measure(repeats=3):
+    """Median cold import and first-paint time over `repeats` fresh processes"""
+    imports, paints = [], []
+    for _ in range(repeats):
+        times = import_times()
+        imports.append(next(row['cumulative_seconds'] for row in times if row['module'] == 'Dashboard'))
+        paints.append(first_paint())
+    if paints[-1]['errors']:
+        raise RuntimeError(f"The dashboard failed to render: {paints[-1]['errors']}")
+    imported = {row['module'] for row in times}
+    return {
+        'import_seconds': round(sorted(imports)[len(imports) // 2], 3),
+        'first_paint_seconds': round(sorted(paint['first_paint_seconds'] for paint in paints)[len(paints) // 2], 3),
+        # Loaded by `import Dashboard` itself, before the page header can be drawn
+        'import_heavy_modules': [name for name in HEAVY_MODULES if name in imported],
+        'heavy_modules': paints[-1]['heavy_modules'],
+    }, times
+
+def check(result, baseline, tolerance=TOLERANCE):
+    """Regressions of `result` against `baseline`, empty when cold start is no worse"""
+    failures = []
+    for key in ['import_seconds', 'first_paint_seconds']:
+        if result[key] > baseline[key] * (1 + tolerance):
+            failures.append(f"{key} {result[key]:.2f}s is over {baseline[key]:.2f}s + {tolerance:.0%}")
+    eager = [name for name in result['heavy_modules'] if name not in baseline['heavy_modules']]
+    if eager:
+        failures.append(f"now imported before the first paint: {', '.join(eager)}")
+    eager = [name for name in result['import_heavy_modules'] if name not in baseline.get('import_heavy_modules', [])]
+    if eager:
+        failures.append(f"now imported with the dashboard module: {', '.join(eager)}")
+    return failures
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Profile the dashboard's cold start")
+    parser.add_argument('--repeats', type=int, default=3, help="fresh processes per measurement (median is kept)")
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list")
+    parser.add_argument('--check', action='store_true', help="exit 1 if cold start is slower than the baseline")
+    parser.add_argument('--save-baseline', action='store_true', help=f"write the measurement to {BASELINE_PATH}")
+    parser.add_argument('--first-paint-worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.first_paint_worker:
+        _first_paint_worker()
+        sys.exit(0)
+
+    result, times = measure(args.repeats)
+    print(f"import Dashboard: {result['import_seconds']:.2f}s, first paint: {result['first_paint_seconds']:.2f}s")
+    print(f"heavy packages loaded by the import: {', '.join(result['import_heavy_modules']) or 'none'}, "
+          f"by the first paint: {', '.join(result['heavy_modules']) or 'none'}")
+    print("slowest imports (cumulative, self):")
+    # The dashboard's own modules and the packages they import directly
+    shallow = [row for row in times if 1 <= row['depth'] <= 2]
+    for row in sorted(shallow, key=lambda row: row['cumulative_seconds'], reverse=True)[:args.top]:
+        print(f"  {row['cumulative_seconds'] * 1000:7.0f} ms {row['self_seconds'] * 1000:6.0f} ms  "
+              f"{'  ' * row['depth']}{row['module']}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2)
+            file.write('\n')
+        print(f"baseline written to {BASELINE_PATH}")
+    if args.check:
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as file:
+            failures = check(result, json.load(file))
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,144 @@
+import os
+import numpy as np
+import pandas as pd
+from data_store import TABLES, parse_csv
+
+# Synthetic copies of the four source CSVs at a multiple of their real size, for benchmarking.
+# A table at scale N is N replicas of the real one: replica k keeps every row but gets its own
+# player/group/session/game ids and (from k=1 on) its own player names, so the roster, schema
+# and per-player structure stay as in the real data while the row count grows N-fold.
+# Measurements are jittered within each column's observed range and precision, so replicas
+# are not exact duplicates but keep the real distributions. Play-by-play replicas move to later
+# seasons instead, keeping every game intact; past SEASONS replicas the shooters are renamed.
+
+# Id columns shifted by replica * ID_STRIDE so every replica has its own players and sessions
+ID_COLUMNS = {
+    'injury_history': ['Player.ID', 'Group.Id'],
+    'muscle_imbalance': ['Player.ID', 'Session ID'],
+    'sessions': ['playerid', 'groupid', 'sessionid'],
+    'performance': [],
+}
+ID_STRIDE = 10_000
+
+# Player name columns, suffixed with the replica number from replica 1 on
+NAME_COLUMNS = {
+    'injury_history': ['Name'],
+    'muscle_imbalance': ['Player Name'],
+    'sessions': ['name'],
+    'performance': [],
+}
+
+# Numeric columns left exactly as they are (ids, constants, and play-by-play which stays whole)
+FIXED_COLUMNS = {
+    'injury_history': [],
+    'muscle_imbalance': [],
+    'sessions': ['leagueid'],
+    'performance': list(TABLES['performance']['columns']),
+}
+
+# Jitter standard deviation as a fraction of the column's standard deviation
+JITTER = 0.1
+
+# Play-by-play replicas shift forward a season at a time; two-digit years in the source
+# format stop parsing as 20xx after 2068, so past this many seasons shooters are renamed
+SEASONS = 40
+GAME_ID_STRIDE = 100_000
+SEASON_DAYS = 364
+
+SCALES = [10, 100, 1000]
+
+def _decimals(values):
+    # Digits after the point the real data is recorded with, at most 9
+    values = values.dropna().to_numpy(dtype=float)
+    for decimals in range(10):
+        if np.allclose(values, np.round(values, decimals), rtol=0, atol=1e-12):
+            return decimals
+    return 9
+
+def _jitter_columns(real, table):
+    spec = TABLES[table]['columns']
+    skip = set(ID_COLUMNS[table]) | set(FIXED_COLUMNS[table])
+    columns = {}
+    for col, dtype in spec.items():
+        if dtype not in ('int64', 'float64') or col in skip:
+            continue
+        values = real[col]
+        columns[col] = {
+            'scale': float(values.std(ddof=0)) * JITTER,
+            'min': values.min(),
+            'max': values.max(),
+            'decimals': 0 if dtype == 'int64' else _decimals(values),
+            'dtype': dtype,
+        }
+    return columns
+
+def replica(real, table, k, rng, jitter=None):
+    """Replica `k` of the parsed real table: own ids and names, jittered measurements"""
+    frame = real.copy()
+    if table == 'performance':
+        season, block = k % SEASONS, k // SEASONS
+        frame['game_id'] = frame['game_id'] + k * GAME_ID_STRIDE
+        frame['date'] = frame['date'] + pd.Timedelta(days=SEASON_DAYS * season)
+        if block:
+            frame['shooter'] = frame['shooter'].cat.rename_categories(lambda name: f"{name} #{block}")
+        return frame
+
+    for col in ID_COLUMNS[table]:
+        frame[col] = frame[col] + k * ID_STRIDE
+    if k:
+        for col in NAME_COLUMNS[table]:
+            frame[col] = frame[col].cat.rename_categories(lambda name: f"{name} #{k}")
+    for col, spec in (jitter if jitter is not None else _jitter_columns(real, table)).items():
+        noise = rng.normal(0, spec['scale'], len(frame))
+        values = np.clip(frame[col].to_numpy(dtype=float) + noise, spec['min'], spec['max']).round(spec['decimals'])
+        frame[col] = values.astype(spec['dtype'])
+    return frame
+
+def replicas(table, scale, seed=0):
+    """The `scale` replicas of `table`, one frame at a time"""
+    real = parse_csv(table)
+    jitter = _jitter_columns(real, table)
+    rng = np.random.default_rng(seed)
+    for k in range(scale):
+        yield replica(real, table, k, rng, jitter)
+
+def to_source_format(frame, table):
+    # Dates back in the CSV's own format, so the copy parses exactly like the original
+    frame = frame.copy()
+    for col, fmt in TABLES[table]['dates'].items():
+        frame[col] = frame[col].dt.strftime(fmt)
+    return frame
+
+def write_table(table, scale, path, seed=0):
+    """Write `table` at `scale` times its real size as a CSV in the source's format; returns the row count"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    rows = 0
+    tmp_path = path + '.tmp'
+    encoding = TABLES[table]['encoding']
+    for k, frame in enumerate(replicas(table, scale, seed)):
+        # Only the first chunk starts the file, so only it may carry a byte-order mark
+        to_source_format(frame, table).to_csv(tmp_path, mode='w' if k == 0 else 'a', header=k == 0, index=False,
+                                              na_rep='NA', encoding=encoding if k == 0 else encoding.replace('-sig', ''))
+        rows += len(frame)
+    os.replace(tmp_path, path)
+    return rows
+
+def write_dataset(root, scale, tables=None, seed=0):
+    """Every table at `scale` under `root`, with the source CSVs' file names; returns {table: (path, rows)}"""
+    written = {}
+    for table in tables or TABLES:
+        path = os.path.join(root, os.path.basename(TABLES[table]['source']))
+        written[table] = (path, write_table(table, scale, path, seed))
+    return written
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Write synthetic copies of the source CSVs at a multiple of their size")
+    parser.add_argument('scale', type=int, help="copies of each real table, e.g. 10, 100 or 1000")
+    parser.add_argument('--output-dir', default='Injury/Data/store/synthetic', help="where to write the CSVs")
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), help="tables to generate (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    root = os.path.join(args.output_dir, f"x{args.scale}")
+    for table, (path, rows) in write_dataset(root, args.scale, args.tables, args.seed).items():
+        print(f"{table}: {rows} rows -> {path}")
@@ -0,0 +1,12 @@
+import os
+import sys
+import pytest
+
+# The dashboard modules are imported by bare name and read data from paths relative to the repo root
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(os.path.dirname(DASHBOARD_DIR))
+sys.path.insert(0, DASHBOARD_DIR)
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+from clutch_features import SCALED_FEATURES, WINNING_SHOT_FEATURES, load_clutch_store
+
+def test_model_features_match_training_scale():
+    features = load_clutch_store().model_features()
+    assert np.allclose(features[SCALED_FEATURES].mean(), 0, atol=1e-9)
+    assert np.allclose(features[SCALED_FEATURES].std(ddof=0), 1)
+    # The notebook's scaled output, which winning_shot_model.pkl was trained on
+    training = pd.read_csv('Performance/syracuse_shots.csv')
+    for feature in WINNING_SHOT_FEATURES:
+        assert np.allclose(np.sort(features[feature]), np.sort(training[feature]))
+
+def test_roster_features_are_scaled():
+    store = load_clutch_store()
+    context = {'win_prob_gap': 0.1, 'possession_length': 30, 'time_remaining': 24, 'home_team_advantage': 1,
+               'high_pressure': 1, 'possession_change': 0}
+    roster = store.roster_features(context)
+    raw = store.player_features.assign(**context)[WINNING_SHOT_FEATURES]
+    expected = (raw[SCALED_FEATURES] - store.scaler.mean_) / store.scaler.scale_
+    assert np.allclose(roster[SCALED_FEATURES], expected)
+    assert roster['home_team_advantage'].eq(1).all()
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from data_store import read_table
+from muscle_dashboard import MUSCLE_COLUMNS, IMBALANCE_COLUMNS, calculate_risk_score, calculate_risk_scores
+
+def assert_matches_rowwise(frame):
+    expected = frame.apply(calculate_risk_score, axis=1).astype(float).to_numpy()
+    actual = calculate_risk_scores(frame)
+    assert actual.index.equals(frame.index)
+    # Exact equality, not approximate: the vectorized version must give the same floats
+    assert np.array_equal(actual.to_numpy(), expected)
+
+def test_shipped_table():
+    assert_matches_rowwise(read_table('muscle_imbalance', MUSCLE_COLUMNS))
+
+def test_nan_and_boundaries():
+    hq_ratios = [np.nan, 0.6, 0.8, 0.59, 0.81, 0.7, 0.0, 1.5]
+    imbalances = [np.nan, 5.0, -5.0, 5.01, -5.01, 0.0, 12.3, -12.3]
+    frame = pd.DataFrame({'Hamstring To Quad Ratio': hq_ratios})
+    for i, col in enumerate(IMBALANCE_COLUMNS):
+        # Shift the values per column so every row mixes different cases
+        frame[col] = np.roll(imbalances, i)
+    frame.index = frame.index * 10
+    assert_matches_rowwise(frame)
@@ -0,0 +1,223 @@
+import weakref
+import numpy as np
+from sklearn.preprocessing import RobustScaler, StandardScaler
+
+# Fitted random forests flattened into numpy arrays. All trees share one set of node arrays
+# (children as global node ids, leaves pointing at themselves), so scoring walks every tree
+# for every row at once with none of sklearn's per-call validation or joblib dispatch. Row/tree
+# pairs drop out as they reach a leaf, so the work follows the actual path lengths. Standard
+# and robust scaler steps of a pipeline are applied in numpy; resampling steps like SMOTETomek
+# only run at fit time and are skipped, as the pipeline itself does at predict. Pipelines with
+# any other step are left to sklearn.
+
+# Past this many rows sklearn's compiled traversal overtakes numpy's, so big batches go back to it
+SKLEARN_BATCH_ROWS = 500
+
+class FlatForest:
+    """predict/predict_proba for a fitted RandomForestClassifier (or a pipeline ending in one)"""
+
+    def __init__(self, forest, transforms=(), feature_names=None, model=None):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        self.classes_ = forest.classes_
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = forest.n_features_in_
+        self.transforms = list(transforms)
+        self.roots = offsets.astype(np.intp)
+        # Held weakly, so a cached FlatForest never keeps a model the registry has replaced alive
+        self._model = weakref.ref(forest if model is None else model)
+
+        features, thresholds, left, right, missing, values = [], [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)).astype(bool)
+            missing.append(np.where(missing_left | is_leaf, left[-1], right[-1]))
+            # Normalised class frequencies, as DecisionTreeClassifier.predict_proba returns them
+            value = tree.value[:, 0, :len(self.classes_)].astype(float)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0] = 1
+            values.append(value / normalizer)
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        # Left and right child side by side, so a step is one gather at 2 * node + went_right
+        self.children = np.stack([np.concatenate(left), np.concatenate(right)], axis=1).ravel().astype(np.intp)
+        self.missing = np.concatenate(missing).astype(np.intp)
+        self.is_leaf = self.children[0::2] == np.arange(len(self.feature))
+        # One contiguous row of leaf probabilities per class
+        self.value = np.ascontiguousarray(np.concatenate(values).T)
+
+    def _inputs(self, X):
+        if hasattr(X, 'columns') and self.feature_names_in_ is not None and list(X.columns) != list(self.feature_names_in_):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        for center, scale in self.transforms:
+            X = (X - center) / scale
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        return X.astype(np.float32).astype(float)
+
+    def apply(self, X):
+        """Leaf node id reached in every tree, shape (rows, trees)"""
+        X = self._inputs(X)
+        n_rows, n_trees = len(X), len(self.roots)
+        nodes = np.tile(self.roots, n_rows)
+        # Offset of each (row, tree) pair's row in the flattened inputs
+        row_offsets = np.repeat(np.arange(n_rows) * X.shape[1], n_trees)
+        X = X.ravel()
+        has_missing = np.isnan(X).any()
+        # Only pairs that have not reached a leaf take another step
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while len(active):
+            current = nodes[active]
+            x = X[row_offsets[active] + self.feature[current]]
+            next_nodes = self.children[2 * current + (x > self.threshold[current])]
+            if has_missing:
+                missing = np.isnan(x)
+                next_nodes[missing] = self.missing[current[missing]]
+            nodes[active] = next_nodes
+            active = active[~self.is_leaf[next_nodes]]
+        return nodes.reshape(n_rows, n_trees)
+
+    @property
+    def model(self):
+        return self._model()
+
+    def predict_proba(self, X):
+        model = self._model()
+        if len(X) > SKLEARN_BATCH_ROWS and model is not None:
+            return model.predict_proba(X)
+        leaves = self.apply(X)
+        return np.stack([value[leaves].mean(axis=1) for value in self.value], axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def _transforms(steps, n_features):
+    # Scalers computing (X - center) / scale become (center, scale) pairs; samplers only act during fit
+    transforms = []
+    for name, step in steps:
+        if hasattr(step, 'fit_resample') or step is None or step == 'passthrough':
+            continue
+        if type(step) is StandardScaler:
+            center = step.mean_ if step.with_mean else None
+            scale = step.scale_
+        elif type(step) is RobustScaler:
+            center, scale = step.center_, step.scale_
+        else:
+            # MinMaxScaler and others transform differently, so they stay with sklearn
+            raise TypeError(f"Pipeline step {name!r} ({type(step).__name__}) cannot be flattened")
+        center = np.zeros(n_features) if center is None else center
+        scale = np.ones(n_features) if scale is None else scale
+        transforms.append((np.asarray(center, dtype=float), np.asarray(scale, dtype=float)))
+    return transforms
+
+def compile_model(model):
+    """A FlatForest for a random forest or a scaler/sampler pipeline ending in one"""
+    steps = getattr(model, 'steps', [])
+    forest = steps[-1][1] if steps else model
+    if not hasattr(forest, 'estimators_') or not hasattr(forest.estimators_[0], 'tree_'):
+        raise TypeError(f"{type(forest).__name__} is not a tree ensemble")
+    if getattr(forest, 'n_outputs_', 1) != 1:
+        raise TypeError("Only single-output forests can be flattened")
+    return FlatForest(forest, _transforms(steps[:-1], forest.n_features_in_),
+                      getattr(model, 'feature_names_in_', None), model)
+
+# Flattened forests by model, or None for models that can't be flattened. Neither holds the
+# model, so an entry goes away with its model.
+_compiled = weakref.WeakKeyDictionary()
+
+def fast_model(model):
+    """The flattened form of `model` if it is a random forest, otherwise `model` itself"""
+    try:
+        compiled = _compiled[model]
+    except KeyError:
+        try:
+            compiled = compile_model(model)
+        except TypeError:
+            compiled = None
+        _compiled[model] = compiled
+    return model if compiled is None else compiled
+
+def benchmark(model, X, repeats=200, roster_rows=15, batch_rows=10_000, seed=0):
+    """Single-row p50/p99, roster and batch latency, sklearn against the flattened forest"""
+    import time
+    import warnings
+    flat = compile_model(model)
+    rng = np.random.default_rng(seed)
+    batch = X.iloc[rng.integers(0, len(X), batch_rows)] if hasattr(X, 'iloc') else X[rng.integers(0, len(X), batch_rows)]
+
+    def flat_chunks(rows):
+        # In chunks the flattened forest scores itself; one predict_proba call hands larger batches to sklearn
+        return np.concatenate([flat.predict_proba(rows[i:i + SKLEARN_BATCH_ROWS])
+                               for i in range(0, len(rows), SKLEARN_BATCH_ROWS)])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results = {'max_abs_diff': float(np.abs(flat_chunks(batch) - model.predict_proba(batch)).max())}
+        for label, predictor in [('sklearn', model), ('flat', flat)]:
+            latencies = []
+            for i in range(repeats):
+                row = batch[i:i + 1]
+                start = time.perf_counter()
+                predictor.predict_proba(row)
+                latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            predictor.predict_proba(batch[:roster_rows])
+            roster_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            if predictor is flat:
+                flat_chunks(batch)
+            else:
+                predictor.predict_proba(batch)
+            results[label] = {
+                'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                'p99_ms': float(np.percentile(latencies, 99) * 1000),
+                'roster_ms': roster_seconds * 1000,
+                'rows_per_second': batch_rows / (time.perf_counter() - start),
+            }
+        # What fast_model does with the whole batch in one call, sklearn above SKLEARN_BATCH_ROWS
+        start = time.perf_counter()
+        flat.predict_proba(batch)
+        results['flat']['fallback_rows_per_second'] = batch_rows / (time.perf_counter() - start)
+    return results
+
+if __name__ == "__main__":
+    import warnings
+    import pandas as pd
+    from model_registry import model_registry
+    from injury_risk import INJURY_FEATURES
+    from clutch_features import WINNING_SHOT_FEATURES
+
+    rng = np.random.default_rng(0)
+    inputs = {
+        # Slider ranges of the two prediction tabs
+        'rf': pd.DataFrame({
+            name: rng.uniform(low, high, 5000) for name, (low, high) in zip(
+                INJURY_FEATURES, [(0, 110), (0, 3), (0, 320), (0, 24), (0, 300), (-1, 250)])
+        }),
+        'winning_shot': pd.DataFrame({
+            name: rng.uniform(0, high, 5000) for name, high in zip(
+                WINNING_SHOT_FEATURES, [1, 1, 1, 100, 10, 300, 1, 1, 1, 1, 1, 1])
+        }),
+    }
+    for name, X in inputs.items():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            model = model_registry.get(name)
+        results = benchmark(model, X)
+        print(f"{name}: max |diff| {results['max_abs_diff']:.2e}")
+        for label in ['sklearn', 'flat']:
+            r = results[label]
+            print(f"  {label:>7}: p50 {r['p50_ms']:.3f} ms, p99 {r['p99_ms']:.3f} ms, "
+                  f"{r['roster_ms']:.2f} ms for 15 rows, {r['rows_per_second']:,.0f} rows/s batched")
+        print(f"  one 10,000-row call: {results['flat']['fallback_rows_per_second']:,.0f} rows/s "
+              f"(sklearn above {SKLEARN_BATCH_ROWS} rows)")
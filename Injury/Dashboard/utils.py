@@ -1,34 +1,168 @@
 import streamlit as st
-import pandas as pd
+import sys
+import threading
+import time
 from datetime import datetime
+from figure_cache import figure_cache
+from plotting import figure_pool
+from vega_charts import vega_stats
 
-@st.cache_data
-def load_data():
+# pandas (which imports pyarrow), the data store and the explanation service are imported
+# where they are first used, so importing the dashboard doesn't wait on them before the page
+# header is drawn.
+
+# Columns added after loading, keyed by the stored column they are derived from
+DERIVED_COLUMNS = {
+    'muscle_imbalance': {'Date Recorded': ['Month']},
+}
+
+def prepare_table(table, df):
+    # Dates and numeric types are already parsed by the store; keep Severity as plain strings
+    if table == 'injury_history' and 'Severity' in df.columns:
+        df['Severity'] = df['Severity'].astype(object).fillna('nan').astype(str)
+
+    # Add Month column for monthly analysis
+    if table == 'muscle_imbalance' and 'Date Recorded' in df.columns:
+        df['Month'] = df['Date Recorded'].dt.month
+    return df
+
+class DataRegistry:
+    """Process-wide cache that loads each table lazily, on first access"""
+
+    def __init__(self):
+        self._tables = {}
+        self._complete = set()
+        self._derived = {}
+        self._versions = {}
+        self._lock = threading.RLock()
+        self.timings = {}
+
+    def get(self, table, columns=None):
+        # Only the requested columns are read; columns missing from the cached frame are
+        # read on demand and joined on. The returned frame is shared, so treat it as read-only.
+        from data_store import source_fingerprint
+        with self._lock:
+            # A source CSV edited while the server runs is read again, with a new version
+            fingerprint = source_fingerprint(table)
+            if table in self._versions and self._versions[table] != fingerprint:
+                self._invalidate(table)
+            self._versions[table] = fingerprint
+            cached = self._tables.get(table)
+            if columns is None:
+                if table not in self._complete:
+                    self._load(table, None, None)
+                    self._complete.add(table)
+                return self._tables[table]
+
+            missing = [col for col in columns if cached is None or col not in cached.columns]
+            if missing:
+                self._load(table, missing, cached)
+            cached = self._tables[table]
+
+        derived = DERIVED_COLUMNS.get(table, {})
+        extra = [col for source in columns for col in derived.get(source, []) if col not in columns]
+        return cached[list(columns) + extra]
+
+    def derived(self, name, build, sources=()):
+        # Frames computed from the tables (e.g. precomputed scores) are built once per process,
+        # and again when the source CSV of any table in `sources` has changed since
+        from data_store import source_fingerprint
+        with self._lock:
+            fingerprints = tuple(source_fingerprint(table) for table in sources)
+            entry = self._derived.get(name)
+            if entry is None or entry[1] != fingerprints:
+                start = time.perf_counter()
+                value = build()
+                self._derived[name] = (tuple(sources), fingerprints, value)
+                self._record(name, time.perf_counter() - start, value)
+            return self._derived[name][2]
+
+    def version(self, table):
+        # Fingerprint of the source the cached table was loaded from, for keying caches built on it
+        with self._lock:
+            return self._versions.get(table)
+
+    def _invalidate(self, table):
+        self._tables.pop(table, None)
+        self._complete.discard(table)
+        # Entries built from the table are dropped; ones that name no sources may use any table
+        self._derived = {name: entry for name, entry in self._derived.items() if entry[0] and table not in entry[0]}
+
+    def _load(self, table, columns, cached):
+        import pandas as pd
+        from shared_data import load_table
+        start = time.perf_counter()
+        loaded = prepare_table(table, load_table(table, columns))
+        if cached is not None and columns is not None:
+            # Without a copy, so columns attached from a shared copy stay shared
+            loaded = pd.concat([cached, loaded], axis=1, copy=False)
+        self._tables[table] = loaded
+        self._record(table, time.perf_counter() - start, loaded)
+
+    def _record(self, name, seconds, data):
+        import pandas as pd
+        # Derived entries may be a dict of frames (e.g. aggregate cubes); count all of them
+        frames = list(data.values()) if isinstance(data, dict) else [data]
+        frames = [frame for frame in frames if isinstance(frame, pd.DataFrame)]
+        timing = self.timings.setdefault(name, {'loads': 0, 'seconds': 0.0})
+        timing['loads'] += 1
+        timing['seconds'] += seconds
+        timing['rows'] = sum(len(frame) for frame in frames)
+        timing['columns'] = sum(frame.shape[1] for frame in frames)
+        timing['bytes'] = int(sum(frame.memory_usage(index=True, deep=True).sum() for frame in frames))
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._complete.clear()
+            self._derived.clear()
+            self._versions.clear()
+            self.timings.clear()
+
+data_registry = DataRegistry()
+
+def load_data(columns=None):
+    # `columns` optionally maps a table name to the columns a tab needs, e.g.
+    # {'sessions': ['name', 'session_date', 'durations', 'trimp']}; other tables load in full
+    columns = columns or {}
     try:
-        # Try reading with a specific encoding and engine
-        injury_history = pd.read_csv('Injury/Data/injury_history(injury_history).csv', 
-                                   encoding='ISO-8859-1',
-                                   engine='python')
-        muscle_imbalance = pd.read_csv('Injury/Data/injury_history(muscle_imbalance_data).csv', 
-                                     encoding='ISO-8859-1',
-                                     engine='python')
-        sessions = pd.read_csv('Injury/Data/injury_history(player_sessions).csv', 
-                             encoding='ISO-8859-1',
-                             engine='python')
-        performance_data = pd.read_csv('Performance/Syracuse_Basketball.csv')  # Load performance data
-        
-        # Convert dates and ensure proper data types for injury_history
-        injury_history['Injury Date'] = pd.to_datetime(injury_history['Injury Date'])
-        injury_history['Recovery Time (days)'] = pd.to_numeric(injury_history['Recovery Time (days)'], errors='coerce')
-        injury_history['Severity'] = injury_history['Severity'].astype(str)
-        
-        # Convert Date Recorded to datetime for muscle_imbalance
-        muscle_imbalance['Date Recorded'] = pd.to_datetime(muscle_imbalance['Date Recorded'])
-        # Add Month column for monthly analysis
-        muscle_imbalance['Month'] = muscle_imbalance['Date Recorded'].dt.month
+        muscle_imbalance = data_registry.get('muscle_imbalance', columns.get('muscle_imbalance'))
+        sessions = data_registry.get('sessions', columns.get('sessions'))
+        injury_history = data_registry.get('injury_history', columns.get('injury_history'))
+        performance_data = data_registry.get('performance', columns.get('performance'))  # Load performance data
 
         return muscle_imbalance, sessions, injury_history, performance_data  # Return performance data as well
-        
+
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
-        return None, None, None, None
\ No newline at end of file
+        return None, None, None, None
+
+def render_load_timings(filter_col):
+    # Per-table load timings for this process, shown under the filters
+    if not data_registry.timings:
+        return
+    with filter_col:
+        with st.expander("Data load timings"):
+            for table, timing in data_registry.timings.items():
+                st.caption(f"{table}: {timing['seconds'] * 1000:.0f} ms over {timing['loads']} load(s), "
+                           f"{timing['rows']} rows x {timing['columns']} cols, {timing['bytes'] / 2**20:.2f} MB in memory")
+            st.caption(f"figure cache: {figure_cache.hits} hits, {figure_cache.misses} misses, "
+                       f"{figure_cache.bytes / 1024:.0f} KB")
+            figures = figure_pool.stats()
+            st.caption(f"figures: {figures['figures_created']} created, {figures['figures_alive']} alive, "
+                       f"{figures['renders']} renders in {figures['render_seconds'] * 1000:.0f} ms, "
+                       f"{figures['bytes_rendered'] / 1024:.0f} KB rendered")
+            if vega_stats.charts:
+                st.caption(f"vega charts: {vega_stats.charts} sent in {vega_stats.seconds * 1000:.0f} ms, "
+                           f"{vega_stats.payload_bytes / 1024:.0f} KB")
+            # Only once a prediction tab has imported the explanation service
+            module = sys.modules.get('explanations')
+            explanations = module.explanation_service.stats() if module else {'hits': 0, 'misses': 0}
+            if explanations['hits'] or explanations['misses']:
+                st.caption(f"explanations: {explanations['misses']} rows at {explanations['ms_per_row']:.1f} ms/row, "
+                           f"{explanations['hits']} cache hits, {explanations['memory_bytes'] / 1024:.0f} KB")
+
+def drop_unused_categories(df):
+    # Categorical columns keep every category after filtering; drop the unused ones so
+    # value_counts and seaborn only show what is actually in the selection
+    return df.assign(**{col: df[col].cat.remove_unused_categories() for col in df.select_dtypes('category').columns})
@@ -0,0 +1,113 @@
+import os
+import json
+import threading
+import time
+import streamlit as st
+
+# Browser-rendered alternatives to the matplotlib charts. Each builder returns a Vega-Lite
+# spec with the chart's data inlined, already aggregated on the server, so a rerun sends a
+# few hundred bytes of JSON instead of a PNG. Set DASHBOARD_CHART_BACKEND=vega to use them.
+# numpy and pandas are imported by the builders, so importing this module stays cheap.
+
+CHART_BACKENDS = ['matplotlib', 'vega']
+CHART_BACKEND = os.environ.get('DASHBOARD_CHART_BACKEND', 'matplotlib')
+if CHART_BACKEND not in CHART_BACKENDS:
+    raise ValueError(f"DASHBOARD_CHART_BACKEND must be one of {CHART_BACKENDS}, got {CHART_BACKEND!r}")
+
+# Same colours as the matplotlib charts
+SESSION_PALETTE = ["#E74C3C", "#D35400", "#2980B9", "#8E44AD", "#BDC3C7"]
+IDEAL_HQ_RATIO = [0.6, 0.8]
+
+class VegaStats:
+    """Charts sent, total JSON payload and time spent building specs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.charts = 0
+        self.payload_bytes = 0
+        self.seconds = 0.0
+
+    def record(self, payload_bytes, seconds):
+        with self._lock:
+            self.charts += 1
+            self.payload_bytes += payload_bytes
+            self.seconds += seconds
+
+vega_stats = VegaStats()
+
+def _values(frame):
+    # JSON records with ISO dates and NaN as null
+    return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+def _series_values(series, x, y):
+    import pandas as pd
+    return _values(pd.DataFrame({x: series.index, y: series.to_numpy()}))
+
+def _line(values, x, y, x_title, y_title, color=None, points=False, height=250):
+    mark = {'type': 'line', 'point': points}
+    if color:
+        mark['color'] = color
+    return {
+        'data': {'values': values},
+        'mark': mark,
+        'encoding': {
+            'x': {'field': x, 'type': 'temporal', 'title': x_title},
+            'y': {'field': y, 'type': 'quantitative', 'title': y_title},
+        },
+        'height': height,
+    }
+
+def sessions_over_time_chart(weekly_sessions):
+    return _line(_series_values(weekly_sessions, 'week', 'sessions'), 'week', 'sessions',
+                 "Date", "Number of Sessions", color=SESSION_PALETTE[0])
+
+def duration_distribution_chart(durations):
+    # Binned on the server with the same 'auto' rule seaborn uses, so only the counts are sent
+    import numpy as np
+    import pandas as pd
+    durations = durations.dropna().to_numpy(dtype=float)
+    counts, edges = np.histogram(durations, bins=np.histogram_bin_edges(durations, 'auto'))
+    values = _values(pd.DataFrame({'start': edges[:-1], 'end': edges[1:], 'count': counts}))
+    return {
+        'data': {'values': values},
+        'mark': {'type': 'bar', 'color': SESSION_PALETTE[1], 'stroke': 'black', 'opacity': 0.8},
+        'encoding': {
+            'x': {'field': 'start', 'type': 'quantitative', 'bin': {'binned': True}, 'title': "Duration (mins)"},
+            'x2': {'field': 'end'},
+            'y': {'field': 'count', 'type': 'quantitative', 'title': "Frequency"},
+        },
+        'height': 250,
+    }
+
+def hq_ratio_trends_chart(filtered_data):
+    # One point per player and date; repeated readings are averaged like seaborn's lineplot
+    trends = (filtered_data.groupby(['Player Name', 'Date Recorded'], observed=True)['Hamstring To Quad Ratio']
+              .mean().reset_index())
+    line = _line(None, 'Date Recorded', 'Hamstring To Quad Ratio', "Date", "H/Q Ratio")
+    line['encoding']['color'] = {'field': 'Player Name', 'type': 'nominal', 'title': None}
+    # The line layer uses the top-level data; the ideal-range rules bring their own
+    del line['data'], line['height']
+    ideal = {
+        'data': {'values': [{'ratio': ratio} for ratio in IDEAL_HQ_RATIO]},
+        'mark': {'type': 'rule', 'strokeDash': [6, 4], 'color': SESSION_PALETTE[3]},
+        'encoding': {'y': {'field': 'ratio', 'type': 'quantitative'}},
+    }
+    return {'data': {'values': _values(trends)}, 'layer': [line, ideal], 'height': 300}
+
+def injury_frequency_chart(injury_freq):
+    return _line(_series_values(injury_freq, 'month', 'injuries'), 'month', 'injuries',
+                 "Date", "Number of Injuries", points=True)
+
+def accuracy_over_time_chart(daily_accuracy):
+    chart = _line(_series_values(daily_accuracy, 'date', 'accuracy'), 'date', 'accuracy',
+                  "Date", "Average Shot Accuracy", points=True)
+    chart['title'] = "Shot Accuracy Over Time"
+    return chart
+
+def show_vega_chart(build):
+    """Build a spec with `build()` and send it to the browser, recording payload size and build time"""
+    start = time.perf_counter()
+    spec = build()
+    payload_bytes = len(json.dumps(spec))
+    vega_stats.record(payload_bytes, time.perf_counter() - start)
+    st.vega_lite_chart(spec=spec, use_container_width=True)